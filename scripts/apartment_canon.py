@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+import argparse
+import dataclasses
+import hashlib
+import os
+import pickle
+import time
+from itertools import combinations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from shapely import affinity
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.geometry.base import BaseGeometry
+
+import tracing
+from compute_iou_isFabricable import hull_dimensions
+from floorplan_io import Design, find_design_files, load_design
+from modify_plan import Apartment, Room
+
+
+# Bump when a memoized function changes its result so old cache entries are ignored.
+MEMO_VERSION = 1
+
+DEFAULT_MEMO_DIR = os.environ.get(
+    "APARTMENT_MEMO_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "aec-hackathon", "apartments"),
+)
+
+HULL_ROOM_TYPES = ("bathroom", "corridor", "kitchen")
+
+
+class CanonicalApartment:
+    """
+    An apartment's rooms in a canonical frame, with the transform back to the instance.
+
+    The frame turns the longest wall along x and puts the lower left corner
+    of the bounds at the origin; of the four quarter turns, with and without mirroring, the
+    one whose snapped outlines sort first is used. Identical apartments,
+    wherever they are placed, rotated or mirrored, therefore get the same
+    snapped outlines and the same `key`.
+
+    Attributes:
+        key (str): Hash of the snapped outlines and room types.
+        outlines (list): (n, 2) outlines moved into the canonical frame (not snapped).
+        room_types (list): Room type of each canonical outline.
+        order (list): Index of the instance room each canonical room comes from.
+        to_instance (np.ndarray): 3x3 transform from the canonical frame to the instance.
+    """
+
+    __slots__ = ("key", "outlines", "room_types", "order", "to_instance")
+
+    def __init__(self, key, outlines, room_types, order, to_instance):
+        self.key = key
+        self.outlines = outlines
+        self.room_types = room_types
+        self.order = order
+        self.to_instance = to_instance
+
+    def project(self, geometry):
+        """Map a geometry from the canonical frame into the instance's frame."""
+        m = self.to_instance
+        return affinity.affine_transform(geometry, [m[0, 0], m[0, 1], m[1, 0], m[1, 1], m[0, 2], m[1, 2]])
+
+
+def _ring_key(cells: np.ndarray) -> tuple:
+    """Snapped ring as a tuple independent of its start vertex and direction."""
+    if len(cells) > 1 and (cells[0] == cells[-1]).all():
+        cells = cells[:-1]
+    following = np.concatenate([cells[1:], cells[:1]])
+    if (cells[:, 0] * following[:, 1] - following[:, 0] * cells[:, 1]).sum() < 0:
+        cells = cells[::-1]
+    start = np.lexsort((cells[:, 1], cells[:, 0]))[0]
+    return tuple(map(tuple, np.concatenate([cells[start:], cells[:start]]).tolist()))
+
+
+@tracing.traced("canon.canonicalize")
+def canonicalize(outlines: List[np.ndarray], room_types: List[str], snap: float = 0.01) -> CanonicalApartment:
+    """
+    Canonicalize the rooms of one apartment.
+
+    Args:
+        outlines (list): (n, 2) room outlines in the instance frame.
+        room_types (list): Room type of each outline.
+        snap (float): Grid the canonical coordinates are snapped to, in metres.
+
+    Returns:
+        CanonicalApartment: Canonical outlines, hash key and transform back.
+    """
+    outlines = [np.asarray(o, dtype=float) for o in outlines]
+    edges = np.concatenate([np.roll(o, -1, axis=0) - o for o in outlines])
+    longest = edges[np.argmax(np.hypot(edges[:, 0], edges[:, 1]))]
+    theta = np.arctan2(longest[1], longest[0]) % (np.pi / 2)
+
+    points = np.concatenate(outlines)
+    splits = np.cumsum([len(o) for o in outlines])[:-1]
+    codes = {t: k for k, t in enumerate(sorted(set(room_types)))}
+    point_codes = np.repeat([codes[t] for t in room_types], [len(o) for o in outlines])
+
+    # Cheap pass: the sorted (type, x, y) multiset of snapped vertices picks the
+    # candidate; only candidates that tie on it are told apart by their rings.
+    candidates = []
+    for turn in range(4):
+        angle = -(theta + turn * np.pi / 2)
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        for mirror in (1.0, -1.0):
+            linear = np.diag([mirror, 1.0]) @ rotation
+            # Snapped from the corner of the bounds rather than the centroid, so
+            # coordinates that were on a grid relative to each other stay on it.
+            moved = points @ linear.T
+            corner = moved.min(axis=0)
+            cells = np.rint((moved - corner) / snap).astype(np.int64)
+            typed = np.column_stack([point_codes, cells])
+            signature = typed[np.lexsort(typed.T[::-1])].tobytes()
+            candidates.append((signature, linear, corner, cells))
+    lowest = min(signature for signature, _, _, _ in candidates)
+
+    best = None
+    for signature, linear, corner, cells in candidates:
+        if signature != lowest:
+            continue
+        rooms = sorted((room_type, _ring_key(ring), i)
+                       for i, (ring, room_type) in enumerate(zip(np.split(cells, splits), room_types)))
+        form = [(room_type, ring) for room_type, ring, _ in rooms]
+        if best is None or form < best[0]:
+            best = (form, [i for _, _, i in rooms], linear, corner)
+
+    form, order, linear, corner = best
+    to_canonical = np.eye(3)
+    to_canonical[:2, :2] = linear
+    to_canonical[:2, 2] = -corner
+    key = hashlib.sha256(repr((snap, form)).encode()).hexdigest()[:32]
+    canonical = [outlines[i] @ linear.T - corner for i in order]
+    return CanonicalApartment(key, canonical, [room_type for room_type, _ in form], order,
+                              np.linalg.inv(to_canonical))
+
+
+class ApartmentMemo:
+    """
+    Memo of per-apartment results keyed by canonical apartment, in memory and on disk.
+
+    Entries are keyed by the function name, MEMO_VERSION, the canonical key
+    and the parameters, so the same apartment in another position, file or
+    run reuses the result. Results are computed in the canonical frame;
+    callers project geometries back with CanonicalApartment.project.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_MEMO_DIR):
+        self.cache_dir = cache_dir
+        self.entries: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, canon: CanonicalApartment, func: Callable[[], Any], *params) -> Any:
+        key = hashlib.sha256(repr((name, MEMO_VERSION, canon.key, params)).encode()).hexdigest()
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+
+        path = os.path.join(self.cache_dir, f"{key}.pkl") if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self.entries[key] = pickle.load(f)
+                self.hits += 1
+                return self.entries[key]
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                print(f"Ignoring unreadable memo entry {path}: {e}")
+
+        self.misses += 1
+        with tracing.span(f"canon.{name}"):
+            value = self.entries[key] = func()
+        if path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Could not write memo entry {path}: {e}")
+        return value
+
+
+def _apartment_rooms(design: Design, room_types=None) -> Dict[str, List[int]]:
+    """Space indices per apartment (None -> 'Unknown'), optionally only of the given room types."""
+    table = design.spaces
+    valid = table.vertex_counts() >= 3
+    groups: Dict[str, List[int]] = {}
+    for i in range(len(table)):
+        room_type = table.room_type(i).lower()
+        if valid[i] and (room_types is None or room_type in room_types):
+            apartment = table.apartment(i)
+            groups.setdefault(apartment if apartment is not None else "Unknown", []).append(i)
+    return groups
+
+
+def _canonical(design: Design, indices: List[int], snap: float) -> CanonicalApartment:
+    table = design.spaces
+    return canonicalize([table.outline(i) for i in indices],
+                        [table.room_type(i).lower() for i in indices], snap)
+
+
+def _hull_areas(canon: CanonicalApartment) -> Dict[str, Tuple[float, float]]:
+    """(hull_area, total_area) of every combination of the hull room types present."""
+    polygons = {rt: [Polygon(o) for o, t in zip(canon.outlines, canon.room_types) if t == rt]
+                for rt in HULL_ROOM_TYPES}
+    active = [rt for rt in HULL_ROOM_TYPES if polygons[rt]]
+    areas = {}
+    for r in range(1, len(active) + 1):
+        for combo in combinations(active, r):
+            combo_polygons = [p for rt in combo for p in polygons[rt]]
+            total_area = sum(p.area for p in combo_polygons)
+            hull_area = total_area if len(combo_polygons) == 1 else MultiPolygon(combo_polygons).convex_hull.area
+            areas[",".join(sorted(combo))] = (hull_area, total_area)
+    return areas
+
+
+def hull_ratios_by_apartment(design: Design, memo: ApartmentMemo, weight_flag: bool = False,
+                             snap: float = 0.01) -> Dict[str, dict]:
+    """
+    Memoized compute_iou.compute_space_combinations_ratios_by_apartment.
+
+    Hull and room areas are computed once per canonical apartment (on its
+    bathrooms, corridors and kitchens only); the weight, which depends on
+    the room count of the whole design, is applied per instance. Areas are
+    invariant under the canonical transform, so nothing is projected back.
+    """
+    total_rooms = len(design.spaces)
+    results = {}
+    for apartment, indices in _apartment_rooms(design, HULL_ROOM_TYPES).items():
+        canon = _canonical(design, indices, snap)
+        areas = memo.get("hull_areas", canon, lambda: _hull_areas(canon))
+        apt_results = {}
+        for combo_key, (hull_area, total_area) in areas.items():
+            weight = 1 / (((total_rooms + 1) / 2) - len(combo_key.split(","))) if weight_flag else 1
+            ratio = (total_area / hull_area) * weight if hull_area != 0 else 0.0
+            apt_results[combo_key] = (ratio, total_rooms, hull_area, total_area)
+        results[apartment] = apt_results
+    return results
+
+
+def _hull_ratio(canon: CanonicalApartment) -> Tuple[float, float]:
+    """(ratio, hull_area) of the apartment's hull rooms; both are invariant under the canonical transform."""
+    polygons = [Polygon(o) for o in canon.outlines]
+    hull_area = MultiPolygon(polygons).convex_hull.area
+    if hull_area == 0:
+        return 0.0, 0.0
+    return sum(p.area for p in polygons) / hull_area, hull_area
+
+
+def transportability_by_apartment(design: Design, memo: ApartmentMemo, snap: float = 0.01,
+                                  transport_thresholds=(3.2, 13.6)) -> Dict[str, Tuple[float, float, bool]]:
+    """
+    compute_iou_isFabricable.compute_spaces_convex_hull_ratio per apartment, memoized.
+
+    The ratio and hull area are memoized per canonical apartment. The
+    transport check measures the hull along its own sides (hull_dimensions),
+    which depends on the orientation, so it is evaluated on each instance.
+    """
+    table = design.spaces
+    results = {}
+    for apartment, indices in _apartment_rooms(design, HULL_ROOM_TYPES).items():
+        canon = _canonical(design, indices, snap)
+        ratio, hull_area = memo.get("hull_ratio", canon, lambda: _hull_ratio(canon))
+        transportable = False
+        if hull_area:
+            hull = MultiPolygon([Polygon(table.outline(i)) for i in indices]).convex_hull
+            dimensions = hull_dimensions(hull)
+            transportable = (min(dimensions) <= transport_thresholds[0]
+                             and max(dimensions) <= transport_thresholds[1])
+        results[apartment] = (float(ratio), float(hull_area), bool(transportable))
+    return results
+
+
+def _prefab_key(prefab) -> Optional[tuple]:
+    """Memo key of a prefab: its attributes, with the geometry as WKB so equal shapes share a key."""
+    if prefab is None:
+        return None
+    return tuple(sorted((name, value.wkb if isinstance(value, BaseGeometry) else value)
+                        for name, value in vars(prefab).items()))
+
+
+def _prefabs_key(prefabs) -> Optional[tuple]:
+    # Attribute values of different parts need not be comparable (e.g. sku None vs str).
+    return None if prefabs is None else tuple(sorted(map(_prefab_key, prefabs), key=repr))
+
+
+def optimize_apartments(search, apartments: List[Apartment], memo: ApartmentMemo,
+                        snap: float = 0.01, **kwargs) -> list:
+    """
+    Run floorplan_search.AnnealingOptimizer once per distinct apartment.
+
+    The search runs on a canonical copy of the apartment. Its resulting
+    geometries are projected into every instance and written, with the
+    prefabs, through the optimizer's edit log, as optimize_apartment would.
+
+    Args:
+        search (AnnealingOptimizer): Configured search.
+        apartments (list): Apartments from PrefabOptimizer.load_from_design.
+        memo (ApartmentMemo): Memo shared across apartments, files and runs.
+        snap (float): Canonical grid in metres.
+        **kwargs: Passed to AnnealingOptimizer.optimize_apartment (e.g. iterations).
+
+    Returns:
+        list: SearchResult per apartment, with instance room ids in the assignments.
+    """
+    from floorplan_search import SearchResult
+
+    log = search.optimizer.edit_log
+    results = []
+    for apartment in apartments:
+        geometries = [room.geometry for room in apartment.rooms]
+        if not all(isinstance(g, Polygon) for g in geometries):
+            # buffer(0) split a self-intersecting room; there is no single outline to canonicalize.
+            results.append(search.optimize_apartment(apartment, **kwargs))
+            continue
+        canon = canonicalize([np.asarray(g.exterior.coords) for g in geometries],
+                             [room.type for room in apartment.rooms], snap)
+        # Prefabs assigned beforehand are tried first by the search, so they are part of the key.
+        assigned = [apartment.rooms[j].prefab for j in canon.order]
+
+        def run():
+            rooms = []
+            for i, (outline, j, prefab) in enumerate(zip(canon.outlines, canon.order, assigned)):
+                room = Room(str(i), {"room_type": apartment.rooms[j].type, "apartment": apartment.name,
+                                     "coordinates": [{"x": x, "y": y} for x, y in outline]})
+                room.prefab = prefab
+                rooms.append(room)
+            # The canonical rooms are throwaway; their edits are taken off the log again.
+            savepoint = log.savepoint()
+            result = search.optimize_apartment(Apartment(apartment.name, rooms), **kwargs)
+            best = [(room.geometry, room.prefab) for room in rooms]
+            log.rollback(savepoint)
+            return best, dataclasses.asdict(result)
+
+        best, result = memo.get("anneal", canon, run, tuple(sorted(kwargs.items())),
+                                search.seed, search.step, search.max_scale,
+                                tuple(sorted(search.objective_kwargs.items())),
+                                _prefabs_key(search.catalog.parts() if search.catalog is not None else None),
+                                _prefabs_key(search.optimizer.prefabs.values()),
+                                tuple(_prefab_key(p) for p in assigned))
+        assignments = {}
+        for (geometry, prefab), j in zip(best, canon.order):
+            room = apartment.rooms[j]
+            log.set(room, "geometry", canon.project(geometry))
+            log.set(room, "prefab", prefab)
+            assignments[room.id] = getattr(prefab, "sku", None) or (prefab.type if prefab else None)
+        apartment.refresh_floorplan()
+        results.append(SearchResult(**dict(result, apartment=apartment.name, assignments=assignments)))
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Group repeated (moved, rotated or mirrored) apartments and memoize their analysis."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--snap", type=float, default=0.01, help="Canonical grid in metres")
+    parser.add_argument("--optimize", action="store_true", help="Also run the memoized annealing search")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true", help="Keep the memo in memory only")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    memo = ApartmentMemo(None if args.no_cache else DEFAULT_MEMO_DIR)
+    paths = find_design_files(args.base_folder)
+
+    start = time.perf_counter()
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        design = load_design(path)
+        for apartment, indices in _apartment_rooms(design).items():
+            canon = _canonical(design, indices, args.snap)
+            groups.setdefault(canon.key, []).append(f"{os.path.basename(path)}:{apartment}")
+        hull_ratios_by_apartment(design, memo, snap=args.snap)
+        transportability_by_apartment(design, memo, snap=args.snap)
+        if args.optimize:
+            from floorplan_search import AnnealingOptimizer, default_prefabs
+            from modify_plan import PrefabOptimizer
+
+            optimizer = PrefabOptimizer(default_prefabs())
+            search = AnnealingOptimizer(optimizer, seed=args.seed)
+            optimize_apartments(search, optimizer.load_from_design(design), memo,
+                                snap=args.snap, iterations=args.iterations)
+    elapsed = time.perf_counter() - start
+
+    for key, members in sorted(groups.items(), key=lambda item: -len(item[1])):
+        if len(members) > 1:
+            print(f"{key[:12]}  {len(members)} copies: {', '.join(members[:6])}{' ...' if len(members) > 6 else ''}")
+    print(f"{sum(map(len, groups.values()))} apartments, {len(groups)} distinct; "
+          f"memo {memo.hits} hits, {memo.misses} misses, {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import netlsd
+import networkx as nx
+import numpy as np
+
+from compare_graphs import node_simrank_scores
+from compute_iou import compute_space_combinations_ratios_by_apartment
+from compute_iou_isFabricable import compute_spaces_convex_hull_ratio
+from connect_graphs import add_similar_wall_connections, extract_dimension_from_panel
+from csr_graph import CSRGraph
+from floorplan_io import Design, find_design_files, load_design
+from floorplan_search import default_prefabs
+from modify_plan import PrefabOptimizer
+from synthetic_plans import PlanSpec, generate_design, generate_graph
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "findAdjanencies_readandParseJson_EP"))
+from findAdj01a import compute_room_adjacency  # noqa: E402
+
+
+# A stage is flagged when its median time grows by more than this fraction.
+DEFAULT_THRESHOLD = 0.25
+# Smaller absolute changes are timer/allocator noise on these tiny inputs.
+MIN_TIME_DELTA = 1e-3
+MIN_PEAK_DELTA = 64 * 1024
+DEFAULT_OUTPUT = os.path.join("..", "SimilarityAnalysis_results", "benchmarks.json")
+
+
+class Case(NamedTuple):
+    """One benchmark input: a design, optionally tiled, with its graph if any."""
+    name: str
+    scale: int
+    design: Design
+    graph: Optional[nx.MultiGraph]
+    reference: Optional[nx.MultiGraph]
+
+
+def tile_design(data: dict, copies: int, spacing: float = 100.0) -> dict:
+    """
+    Repeat a floorplan JSON side by side to build a larger input.
+
+    Copy k is shifted by k * spacing along x, and its spaces, panels and
+    apartments are renamed so the copies stay independent.
+    """
+    if copies <= 1:
+        return data
+    items, spaces = {}, {}
+    panels = data.get("panels", {}).get("items", {})
+    for k in range(copies):
+        dx = k * spacing
+
+        def rename(value):
+            return value if k == 0 or value in (None, "UNASSIGNED") else f"{value} #{k}"
+
+        for panel_id, panel in panels.items():
+            panel = dict(panel)
+            for key in ("start_point", "end_point"):
+                if panel.get(key):
+                    panel[key] = [panel[key][0] + dx] + list(panel[key][1:])
+            panel["apartment"] = rename(panel.get("apartment"))
+            items[rename(panel_id)] = panel
+        for space_id, space in data.get("spaces", {}).items():
+            space = dict(space)
+            space["coordinates"] = [dict(c, x=c["x"] + dx) for c in space.get("coordinates", [])]
+            if "apartment" in space:
+                space["apartment"] = rename(space["apartment"])
+            spaces[rename(space_id)] = space
+    return {"panels": {"attributes": {}, "items": items}, "spaces": spaces}
+
+
+def tile_graph(G, copies: int):
+    """
+    Repeat a floorplan graph as disjoint copies.
+
+    Numeric panel ids are offset so panel i of copy k keeps a numeric id, as
+    connect_graphs expects; other nodes and apartments get a ' #k' suffix.
+    """
+    if copies <= 1:
+        return G
+    numeric = [n for n in G if str(n).isdigit()]
+    offset = max((int(n) for n in numeric), default=-1) + 1
+    tiled = nx.MultiGraph()
+    for k in range(copies):
+        def rename(node):
+            if k == 0:
+                return node
+            return str(int(node) + k * offset) if str(node).isdigit() else f"{node} #{k}"
+
+        for node, data in G.nodes(data=True):
+            data = dict(data)
+            if k and data.get("apartment"):
+                data["apartment"] = f"{data['apartment']} #{k}"
+            tiled.add_node(rename(node), **data)
+        for u, v, data in G.edges(data=True):
+            tiled.add_edge(rename(u), rename(v), **data)
+    return tiled
+
+
+def _panel_dimensions(G):
+    return np.array([
+        (extract_dimension_from_panel(d) or 0) if "start_point" in d and "end_point" in d else 0
+        for _, d in G.nodes(data=True)
+    ])
+
+
+def stage_adjacency(case: Case) -> int:
+    compute_room_adjacency(case.design)
+    return len(case.design.panels)
+
+
+def stage_connect(case: Case) -> int:
+    G = case.graph.copy()
+    add_similar_wall_connections(G, _panel_dimensions(G))
+    return G.number_of_nodes()
+
+
+def stage_compare(case: Case) -> int:
+    csr, reference = CSRGraph.from_networkx(case.graph), CSRGraph.from_networkx(case.reference)
+    node_simrank_scores(csr)
+    netlsd.compare(netlsd.heat(csr.sparse_adjacency()), netlsd.heat(reference.sparse_adjacency()))
+    return len(csr)
+
+
+def stage_hull_ratios(case: Case) -> int:
+    compute_space_combinations_ratios_by_apartment(case.design)
+    return len(case.design.spaces)
+
+
+def stage_transportability(case: Case) -> int:
+    compute_spaces_convex_hull_ratio(case.design)
+    return len(case.design.spaces)
+
+
+def stage_optimize(case: Case) -> int:
+    optimizer = PrefabOptimizer(default_prefabs())
+    optimizer.optimize(optimizer.load_from_design(case.design))
+    return len(case.design.spaces)
+
+
+# name -> (function, needs a graph)
+STAGES: Dict[str, tuple] = {
+    "adjacency": (stage_adjacency, False),
+    "connect": (stage_connect, True),
+    "compare": (stage_compare, True),
+    "hull_ratios": (stage_hull_ratios, False),
+    "transportability": (stage_transportability, False),
+    "optimize": (stage_optimize, False),
+}
+
+
+def _find_graph(design_path: str) -> Optional[str]:
+    folder = os.path.dirname(design_path)
+    graphs = sorted(f for f in os.listdir(folder) if f.endswith("_bom_updated.graphml"))
+    return os.path.join(folder, graphs[0]) if graphs else None
+
+
+def build_cases(base_folder: str, scales: List[int], reference_graph: Optional[str]) -> List[Case]:
+    """Load every design under base_folder once per scale, with its GraphML when present."""
+    reference = nx.read_graphml(reference_graph, force_multigraph=True) if reference_graph else None
+    cases = []
+    for path in find_design_files(base_folder):
+        data = load_design(path).to_dict()
+        graph_path = _find_graph(path)
+        graph = nx.read_graphml(graph_path, force_multigraph=True) if graph_path else None
+        name = os.path.relpath(path, base_folder)
+        for scale in scales:
+            design = Design.from_dict(tile_design(data, scale), source=path)
+            cases.append(Case(name, scale, design,
+                              tile_graph(graph, scale) if graph is not None else None,
+                              reference if reference is not None else graph))
+    return cases
+
+
+def build_synthetic_cases(apartment_counts: List[int], seed: int = 0) -> List[Case]:
+    """One generated single-floor building (JSON and graph) per apartment count."""
+    cases = []
+    for count in apartment_counts:
+        spec = PlanSpec(apartments_per_floor=count, seed=seed)
+        graph = generate_graph(spec)
+        cases.append(Case(f"synthetic_{count}", 1, Design.from_dict(generate_design(spec)), graph, graph))
+    return cases
+
+
+def measure(func: Callable[[Case], int], case: Case, repeat: int) -> dict:
+    """
+    Time a stage on one case.
+
+    Timing runs are done without tracemalloc; one extra run measures the
+    peak traced allocation. Stage output is silenced.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = func(case)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func(case)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        "median_s": median,
+        "min_s": min(times),
+        "peak_bytes": peak,
+        "items": items,
+        "items_per_s": items / median if median > 0 else float("inf"),
+    }
+
+
+def run_benchmarks(cases: List[Case], stages: List[str], repeat: int = 3) -> List[dict]:
+    results = []
+    for case in cases:
+        for stage in stages:
+            func, needs_graph = STAGES[stage]
+            if needs_graph and (case.graph is None or case.reference is None):
+                continue
+            record = {"stage": stage, "design": case.name, "scale": case.scale}
+            try:
+                record.update(measure(func, case, repeat))
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            results.append(record)
+            print(_format_record(record))
+    return results
+
+
+def _key(record: dict) -> tuple:
+    return record["stage"], record["design"], record["scale"]
+
+
+def find_regressions(results: List[dict], baseline: List[dict],
+                     threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compare median times and peak memory with a stored baseline.
+
+    Changes below MIN_TIME_DELTA / MIN_PEAK_DELTA are ignored as noise.
+
+    Returns:
+        list: One message per (stage, design, scale) slower or larger than
+              the baseline by more than threshold.
+    """
+    previous = {_key(r): r for r in baseline if "error" not in r}
+    messages = []
+    for record in results:
+        old = previous.get(_key(record))
+        if old is None or "error" in record:
+            continue
+        label = "{}/{} x{}".format(*_key(record))
+        slower = record["median_s"] - old["median_s"]
+        larger = record["peak_bytes"] - old["peak_bytes"]
+        if slower > MIN_TIME_DELTA and record["median_s"] > old["median_s"] * (1 + threshold):
+            messages.append(f"{label}: {old['median_s'] * 1e3:.2f} ms -> {record['median_s'] * 1e3:.2f} ms")
+        if larger > MIN_PEAK_DELTA and record["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            messages.append(f"{label}: peak {old['peak_bytes'] / 1e6:.2f} MB -> "
+                            f"{record['peak_bytes'] / 1e6:.2f} MB")
+    return messages
+
+
+def _format_record(record: dict) -> str:
+    label = f"{record['stage']:<16} {record['design']:<48} x{record['scale']:<4}"
+    if "error" in record:
+        return f"{label} {record['error']}"
+    return (f"{label} {record['median_s'] * 1e3:10.2f} ms {record['peak_bytes'] / 1e6:8.2f} MB "
+            f"{record['items_per_s']:12.0f} items/s")
+
+
+def save_results(results: List[dict], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str) -> List[dict]:
+    with open(path, "r") as f:
+        return json.load(f)["results"]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Time each pipeline stage on every design and flag regressions against a baseline."
+    )
+    parser.add_argument("base_folder", type=str, nargs="?", default=os.path.join("..", "json"),
+                        help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--stages", nargs="*", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--scales", nargs="*", type=int, default=[1],
+                        help="Also run on each design tiled this many times, e.g. 1 4 16")
+    parser.add_argument("--synthetic", nargs="*", type=int, default=[],
+                        help="Also run on generated buildings with this many apartments, e.g. 10 100 1000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-graph", type=str, default=None,
+                        help="GraphML the compare stage compares against (default: the design's own graph)")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help="Results JSON to write")
+    parser.add_argument("--baseline", type=str, default=None, help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative slowdown before a stage is flagged")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    cases = build_cases(args.base_folder, args.scales, args.reference_graph)
+    cases += build_synthetic_cases(args.synthetic)
+    results = run_benchmarks(cases, args.stages, args.repeat)
+    save_results(results, args.output)
+    print(f"Saved {len(results)} measurements to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+import tracing
+from floorplan_io import Design, find_design_files, load_design
+
+
+GROUP_COLUMNS = ("file", "apartment", "room", "panel_type", "thickness", "height")
+
+# Apartment label of panels without one, as in compute_iou's ratio records.
+UNKNOWN_APARTMENT = "Unknown"
+
+
+class _Dictionary:
+    """Label <-> code mapping shared by every design of a table."""
+
+    __slots__ = ("labels", "codes")
+
+    def __init__(self):
+        self.labels: List = []
+        self.codes: Dict = {}
+
+    def encode(self, labels: Sequence) -> np.ndarray:
+        """Global codes of a design's local labels (index with the local codes)."""
+        out = np.empty(len(labels), dtype=np.int32)
+        for i, label in enumerate(labels):
+            code = self.codes.get(label)
+            if code is None:
+                code = self.codes[label] = len(self.labels)
+                self.labels.append(label)
+            out[i] = code
+        return out
+
+
+class BomTable:
+    """
+    Columnar table of the panels of many designs.
+
+    File, apartment, room and panel type are dictionary-encoded across all
+    designs; thickness and height are kept in millimetres as integers so they
+    group exactly. Composite panel types such as "WAL_21 WAL_33" are further
+    split into their component types (`components`), so they can be counted
+    either as themselves or towards each layer they are made of.
+
+    Attributes:
+        file, apartment, room, panel_type (np.ndarray): int32 codes into the dictionaries.
+        thickness, height (np.ndarray): int64 millimetres.
+        length (np.ndarray): Plan length in metres (NaN endpoints give 0).
+        dictionaries (dict): Column name -> list of labels.
+        components (list): For each panel_type code, the component codes.
+        component_labels (list): Labels of the component codes.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, list],
+                 components: List[np.ndarray], component_labels: List[str]):
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.components = components
+        self.component_labels = component_labels
+
+    def __len__(self) -> int:
+        return len(self.columns["length"])
+
+    @classmethod
+    @tracing.traced("bom.build")
+    def from_designs(cls, designs: Iterable[Tuple[str, Design]]) -> "BomTable":
+        """
+        Build the table from (file name, Design) pairs.
+
+        Only each design's label lists are visited in Python; the per-panel
+        columns are remapped and concatenated with NumPy.
+        """
+        dictionaries = {name: _Dictionary() for name in ("file", "apartment", "room", "panel_type")}
+        parts: Dict[str, list] = {name: [] for name in ("file", "apartment", "room", "panel_type",
+                                                        "thickness", "height", "length")}
+        for file, design in designs:
+            panels = design.panels
+            n = len(panels)
+            parts["file"].append(np.full(n, dictionaries["file"].encode([file])[0], dtype=np.int32))
+            parts["apartment"].append(dictionaries["apartment"].encode(
+                [a if a is not None else UNKNOWN_APARTMENT for a in panels.apartments])[panels.apartment_codes])
+            parts["room"].append(dictionaries["room"].encode(
+                [r if r is not None else "" for r in panels.rooms])[panels.room_codes])
+            parts["panel_type"].append(dictionaries["panel_type"].encode(
+                [(t or "").strip() for t in panels.panel_types])[panels.panel_type_codes])
+            parts["thickness"].append(np.rint(panels.thickness * 1000).astype(np.int64))
+            parts["height"].append(np.rint(panels.height * 1000).astype(np.int64))
+            parts["length"].append(np.nan_to_num(panels.lengths(), nan=0.0))
+
+        columns = {name: np.concatenate(arrays) if arrays else np.zeros(0)
+                   for name, arrays in parts.items()}
+        component_dictionary = _Dictionary()
+        components = [component_dictionary.encode(label.split() or [label])
+                      for label in dictionaries["panel_type"].labels]
+        return cls(columns, {name: d.labels for name, d in dictionaries.items()},
+                   components, component_dictionary.labels)
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str]) -> "BomTable":
+        """Build the table from design JSON files (parsed through the floorplan_io cache)."""
+        return cls.from_designs((os.path.basename(path), load_design(path)) for path in paths)
+
+    def _exploded(self) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Columns with one row per (panel, component type); panel_type holds component codes."""
+        counts = np.array([len(c) for c in self.components], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        flat = np.concatenate(self.components) if self.components else np.zeros(0, dtype=np.int32)
+        per_panel = counts[self.columns["panel_type"]]
+        rows = np.repeat(np.arange(len(self)), per_panel)
+        within = np.arange(len(rows)) - np.repeat(np.cumsum(per_panel) - per_panel, per_panel)
+        columns = {name: values[rows] for name, values in self.columns.items()}
+        columns["panel_type"] = flat[offsets[self.columns["panel_type"]][rows] + within]
+        return columns, self.component_labels
+
+    @tracing.traced("bom.aggregate")
+    def aggregate(self, by: Sequence[str] = ("panel_type", "thickness", "apartment"),
+                  explode: bool = False) -> List[dict]:
+        """
+        Panel count, total length (m) and wall area (m², length x height) per group.
+
+        Args:
+            by (sequence): Columns of GROUP_COLUMNS to group by, in output order.
+            explode (bool): Count composite panel types towards each component type
+                instead of as a type of their own.
+
+        Returns:
+            list: One dict per group with the `by` columns, 'panels', 'length' and 'area',
+                  sorted by the group keys. Thickness and height are in metres.
+        """
+        unknown = [name for name in by if name not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown group columns {unknown}; expected some of {GROUP_COLUMNS}")
+        columns, type_labels = self._exploded() if explode else (self.columns, self.dictionaries["panel_type"])
+        length = columns["length"]
+        area = length * columns["height"] / 1000.0
+        if not len(length):
+            return []
+
+        keys = [columns[name].astype(np.int64) for name in by]
+        if keys:
+            # Mixed-radix key in one int64 when the cardinalities allow it, else rows of a 2D array.
+            sizes = [int(k.max()) + 1 for k in keys]
+            if np.prod([float(s) for s in sizes]) < 2 ** 62:
+                combined = np.zeros(len(length), dtype=np.int64)
+                for k, size in zip(keys, sizes):
+                    combined = combined * size + k
+                unique, inverse = np.unique(combined, return_inverse=True)
+                decoded, rest = [], unique
+                for size in reversed(sizes):
+                    rest, value = np.divmod(rest, size)
+                    decoded.append(value)
+                groups = np.column_stack(decoded[::-1])
+            else:
+                groups, inverse = np.unique(np.column_stack(keys), axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            groups, inverse = np.zeros((1, 0), dtype=np.int64), np.zeros(len(length), dtype=np.int64)
+
+        panels = np.bincount(inverse, minlength=len(groups))
+        lengths = np.bincount(inverse, weights=length, minlength=len(groups))
+        areas = np.bincount(inverse, weights=area, minlength=len(groups))
+
+        labels = dict(self.dictionaries, panel_type=type_labels)
+        rows = []
+        for g, key in enumerate(groups.tolist()):
+            row = {}
+            for name, value in zip(by, key):
+                row[name] = value / 1000.0 if name in ("thickness", "height") else labels[name][value]
+            row.update(panels=int(panels[g]), length=float(lengths[g]), area=float(areas[g]))
+            rows.append(row)
+        return rows
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Total wall length and area by panel type, thickness, apartment, ... across designs."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--by", nargs="+", choices=GROUP_COLUMNS, default=["panel_type", "thickness"],
+                        help="Columns to group by (add 'file apartment' to join with the hull ratio CSVs)")
+    parser.add_argument("--explode", action="store_true",
+                        help="Count composite panel types (e.g. 'WAL_21 WAL_33') towards each component type")
+    parser.add_argument("--output", type=str, default=None, help="CSV file for the aggregated rows")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    table = BomTable.from_paths(find_design_files(args.base_folder))
+    loaded = time.perf_counter() - start
+    rows = table.aggregate(args.by, args.explode)
+    aggregated = time.perf_counter() - start - loaded
+
+    for row in rows:
+        keys = "  ".join(f"{row[name]:g}" if isinstance(row[name], float) else f"{row[name]:<16}" for name in args.by)
+        print(f"{keys}  {row['panels']:7d} panels  {row['length']:10.2f} m  {row['area']:10.2f} m²")
+    print(f"{len(table)} panels from {len(table.dictionaries['file'])} designs loaded in {loaded:.2f} s, "
+          f"{len(rows)} groups in {aggregated * 1e3:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(args.by) + ["panels", "length", "area"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
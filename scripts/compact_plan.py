@@ -0,0 +1,112 @@
+import json
+from typing import Dict, List, Sequence
+
+import numpy as np
+from shapely.geometry import Polygon
+
+
+def encode_labels(values: Sequence) -> tuple:
+    """
+    Dictionary-encode a sequence of labels.
+
+    Args:
+        values (Sequence): Labels, e.g. room types or apartment names.
+
+    Returns:
+        tuple: (codes, categories) where categories[codes[i]] == values[i].
+    """
+    categories: Dict = {}
+    codes = np.fromiter((categories.setdefault(v, len(categories)) for v in values),
+                        dtype=np.int32, count=len(values))
+    return codes, list(categories)
+
+
+class SpaceTable:
+    """
+    Struct-of-arrays view of the 'spaces' of a floorplan.
+
+    All outlines share one (m, 2) float64 coordinate buffer; space i owns the
+    rows offsets[i]:offsets[i + 1]. Room types and apartments are stored as
+    integer codes into small category lists. No shapely objects are created
+    until polygon() is called.
+    """
+
+    __slots__ = ("ids", "coords", "offsets", "room_type_codes", "room_types",
+                 "apartment_codes", "apartments")
+
+    def __init__(self, ids: List[str], coords: np.ndarray, offsets: np.ndarray,
+                 room_type_codes: np.ndarray, room_types: List[str],
+                 apartment_codes: np.ndarray, apartments: List):
+        self.ids = ids
+        self.coords = coords
+        self.offsets = offsets
+        self.room_type_codes = room_type_codes
+        self.room_types = room_types
+        self.apartment_codes = apartment_codes
+        self.apartments = apartments
+
+    @classmethod
+    def from_spaces(cls, spaces: Dict[str, dict]) -> "SpaceTable":
+        """
+        Build a table from the 'spaces' mapping of a floorplan JSON.
+
+        Args:
+            spaces (dict): Mapping of space id -> {"room_type", "apartment", "coordinates"}.
+
+        Returns:
+            SpaceTable: The compact table.
+        """
+        ids = list(spaces)
+        counts = np.fromiter((len(s.get("coordinates", [])) for s in spaces.values()),
+                             dtype=np.int64, count=len(ids))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        flat = np.fromiter(
+            (v for s in spaces.values() for pt in s.get("coordinates", []) for v in (pt["x"], pt["y"])),
+            dtype=np.float64, count=2 * int(offsets[-1]),
+        )
+        room_type_codes, room_types = encode_labels([s.get("room_type", "") for s in spaces.values()])
+        apartment_codes, apartments = encode_labels([s.get("apartment") for s in spaces.values()])
+        return cls(ids, flat.reshape(-1, 2), offsets, room_type_codes, room_types,
+                   apartment_codes, apartments)
+
+    @classmethod
+    def from_json(cls, json_path: str) -> "SpaceTable":
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_spaces(data.get("spaces", {}))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def room_type(self, i: int) -> str:
+        return self.room_types[self.room_type_codes[i]]
+
+    def apartment(self, i: int):
+        return self.apartments[self.apartment_codes[i]]
+
+    def vertex_counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def outline(self, i: int) -> np.ndarray:
+        """Return the outline of space i as a view into the shared buffer."""
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def polygon(self, i: int) -> Polygon:
+        return Polygon(self.outline(i))
+
+    def areas(self) -> np.ndarray:
+        """Shoelace areas of all spaces, computed on the shared buffer in one pass."""
+        x, y = self.coords[:, 0], self.coords[:, 1]
+        # Pair every vertex with the next one of the same outline (wrapping around).
+        # Empty outlines own no vertices, so only non-empty ones get a wrap index and a segment.
+        nonempty = self.vertex_counts() > 0
+        starts, ends = self.offsets[:-1][nonempty], self.offsets[1:][nonempty]
+        nxt = np.arange(1, len(x) + 1)
+        nxt[ends - 1] = starts
+        cross = x * y[nxt] - x[nxt] * y
+        sums = np.zeros(len(self))
+        if len(starts):
+            sums[nonempty] = np.add.reduceat(cross, starts)
+        return np.abs(sums) / 2
@@ -2,12 +2,9 @@
 import argparse
 import networkx as nx
 import numpy as np
-import random
-import netlsd
-import sys
-import matplotlib.pyplot as plt
-from sklearn.manifold import SpectralEmbedding
 from itertools import product  # Required for the simrank function below
+import tracing
+from csr_graph import CSRGraph, simrank_matrix
 
 def parse_arguments():
     """
@@ -24,6 +21,7 @@ def parse_arguments():
     return parser.parse_args()
 
 
+@tracing.traced("compare.simrank")
 def node_simrank_scores(G):
     """
     Compute SimRank scores for all node pairs in graph G.
@@ -32,19 +30,21 @@ def node_simrank_scores(G):
     computed as the average similarity to all other nodes.
 
     Args:
-        G (networkx.Graph): The input graph.
+        G (networkx.Graph or CSRGraph): The input graph.
 
     Returns:
         dict: Mapping of node -> average SimRank score.
     """
-    # Compute pairwise SimRank similarity (returns a dict-of-dicts)
-    sim = nx.simrank_similarity(G)
-    scores = {}
-    for u in G.nodes():
-        # Exclude self-similarity and compute average similarity for node u.
-        similarities = [sim[u][v] for v in sim[u] if v != u]
-        scores[u] = np.mean(similarities) if similarities else 0.0
-    return scores
+    # Compute pairwise SimRank similarity as a dense matrix on the CSR graph
+    # (same iteration as nx.simrank_similarity, without the dict-of-dicts).
+    graph = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    sim = simrank_matrix(graph)
+    n = len(graph)
+    if n < 2:
+        return {u: 0.0 for u in graph.node_ids}
+    # Exclude self-similarity and compute average similarity for each node.
+    averages = (sim.sum(axis=1) - np.diag(sim)) / (n - 1)
+    return dict(zip(graph.node_ids, averages.tolist()))
 
 
 def simrank(G, u, v, C=0.8):
@@ -74,7 +74,7 @@ def simrank(G, u, v, C=0.8):
     )
 
 
-def draw_graph_with_simrank(G, ax, title="Graph (SimRank Coloring)", cmap=plt.cm.Blues):
+def draw_graph_with_simrank(G, ax, title="Graph (SimRank Coloring)", cmap=None):
     """
     Draw graph G on a given matplotlib Axes (ax), coloring nodes by their average SimRank score.
 
@@ -82,8 +82,13 @@ def draw_graph_with_simrank(G, ax, title="Graph (SimRank Coloring)", cmap=plt.cm
         G (networkx.Graph): The input graph.
         ax (matplotlib.axes.Axes): The axes to draw the graph.
         title (str): Title for the plot.
-        cmap: Colormap to use for node coloring.
+        cmap: Colormap to use for node coloring (default: Blues).
     """
+    import matplotlib.pyplot as plt
+    from render_batch import node_positions
+
+    cmap = cmap if cmap is not None else plt.cm.Blues
+
     # 1) Compute aggregated SimRank scores.
     scores_dict = node_simrank_scores(G)
     
@@ -95,8 +100,11 @@ def draw_graph_with_simrank(G, ax, title="Graph (SimRank Coloring)", cmap=plt.cm
     max_score = max(scores) if scores else 1
     node_colors = [score / max_score for score in scores]
     
-    # 4) Compute node layout (using a spring layout here)
-    pos = nx.spring_layout(G, seed=42)
+    # 4) Place nodes at their floorplan coordinates; fall back to a spring
+    #    layout for graphs without geometry.
+    pos = node_positions(G)
+    if len(pos) < G.number_of_nodes():
+        pos = nx.spring_layout(G, seed=42)
     
     # 5) Draw the graph with the chosen colormap.
     nx.draw(
@@ -111,6 +119,7 @@ def draw_graph_with_simrank(G, ax, title="Graph (SimRank Coloring)", cmap=plt.cm
     ax.set_title(title)
 
 
+@tracing.traced("compare.netlsd_distance")
 def netlsd_distance(G1, G2):
     """
     Compute the netLSD distance between two graphs G1 and G2.
@@ -120,14 +129,16 @@ def netlsd_distance(G1, G2):
     Euclidean distance between the signatures.
 
     Args:
-        G1 (networkx.Graph): First graph.
-        G2 (networkx.Graph): Second graph.
+        G1 (networkx.Graph or CSRGraph): First graph.
+        G2 (networkx.Graph or CSRGraph): Second graph.
 
     Returns:
         float: The Euclidean distance between the netLSD signatures.
     """
-    A1 = nx.to_numpy_array(G1)
-    A2 = nx.to_numpy_array(G2)
+    import netlsd
+
+    A1 = G1.adjacency_matrix() if isinstance(G1, CSRGraph) else nx.to_numpy_array(G1)
+    A2 = G2.adjacency_matrix() if isinstance(G2, CSRGraph) else nx.to_numpy_array(G2)
     
     sig1 = netlsd.signature(A1, timescales=250)
     sig2 = netlsd.signature(A2, timescales=250)
@@ -136,6 +147,11 @@ def netlsd_distance(G1, G2):
 
 
 def main():
+    # netlsd and matplotlib are imported lazily so that importing this module
+    # for its metrics (benchmark, pipeline) does not pay for them.
+    import matplotlib.pyplot as plt
+    import netlsd
+
     # Parse command-line arguments.
     args = parse_arguments()
 
@@ -144,11 +160,15 @@ def main():
     G_2 = nx.read_graphml(args.file_path_2, force_multigraph=True)
     
     # Compute and print the graph edit distance between G_1 and G_2.
-    ged = nx.graph_edit_distance(G_1, G_2)
+    with tracing.span("compare.graph_edit_distance",
+                      nodes=G_1.number_of_nodes() + G_2.number_of_nodes()):
+        ged = nx.graph_edit_distance(G_1, G_2)
     print(f"Graph Edit Distance: {ged}")
     
-    # Compute netLSD signature for the first graph and print it.
-    descriptor = netlsd.heat(G_1)
+    # Compute netLSD signature for the first graph (from its CSR adjacency) and print it.
+    csr_1 = CSRGraph.from_networkx(G_1)
+    with tracing.span("compare.netlsd_heat"):
+        descriptor = netlsd.heat(csr_1.sparse_adjacency())
     print("netLSD Signature for Graph 1:")
     print(descriptor)
     
@@ -164,8 +184,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
-descriptor = netlsd.heat(G_1) # compute the signature
-print(descriptor)
-
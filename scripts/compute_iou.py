@@ -1,9 +1,11 @@
-import json
+import argparse
 import re
 import os
 import csv
 from shapely.geometry import Polygon, MultiPolygon
 from itertools import combinations
+import tracing
+from floorplan_io import find_design_files, load_design, space_records
 
 
 def polygon_from_coords(coords):
@@ -12,6 +14,7 @@ def polygon_from_coords(coords):
     return Polygon(points_2d)
 
 
+@tracing.traced("hull_ratios.design")
 def compute_spaces_convex_hull_ratio(data):
     """
     Compute the ratio of the sum of areas of selected spaces to the area of their convex hull.
@@ -29,11 +32,10 @@ def compute_spaces_convex_hull_ratio(data):
     total_area = 0.0
     individual_areas = []
 
-    for space_info in data.get("spaces", {}).values():
-        room_type = space_info.get("room_type", "").lower()
+    for _, room_type, _, outline in space_records(data):
+        room_type = room_type.lower()
         if room_type in relevant_room_types:
-            coords = space_info.get("coordinates", [])
-            poly = Polygon([(c["x"], c["y"]) for c in coords])
+            poly = Polygon(outline)
             polygons.append(poly)
             total_area += poly.area
             individual_areas.append({room_type: poly.area})
@@ -66,13 +68,11 @@ def compute_space_combinations_ratios(data):
     polygons_by_type = {rt: [] for rt in relevant_room_types}
     total_rooms = 0
 
-    for space_info in data.get("spaces", {}).values():
-        room_type = space_info.get("room_type", "").lower()
+    for _, room_type, _, outline in space_records(data):
+        room_type = room_type.lower()
         total_rooms += 1
         if room_type in relevant_room_types:
-            coords = space_info.get("coordinates", [])
-            poly = Polygon([(c["x"], c["y"]) for c in coords])
-            polygons_by_type[room_type].append(poly)
+            polygons_by_type[room_type].append(Polygon(outline))
 
     active_room_types = [rt for rt in ["bathroom", "corridor", "kitchen"] if polygons_by_type[rt]]
     if not active_room_types:
@@ -103,6 +103,7 @@ def compute_space_combinations_ratios(data):
     return results
 
 
+@tracing.traced("hull_ratios.by_apartment")
 def compute_space_combinations_ratios_by_apartment(data, weight_flag=False):
     """
     Compute area ratios by apartment for every combination of room types (bathroom, corridor, kitchen).
@@ -111,7 +112,7 @@ def compute_space_combinations_ratios_by_apartment(data, weight_flag=False):
     one polygon, the convex hull area is forced to equal the polygon's area.
     
     Args:
-        data (dict): JSON data containing spaces with their coordinates, room type, and apartment name.
+        data (dict or Design): Floorplan JSON data or a Design from floorplan_io.load_design.
         weight_flag (bool): Whether to adjust the ratio by a computed weight.
     
     Returns:
@@ -122,14 +123,14 @@ def compute_space_combinations_ratios_by_apartment(data, weight_flag=False):
     apartments = {}
     total_rooms = 0
 
-    for space_info in data.get("spaces", {}).values():
-        room_type = space_info.get("room_type", "").lower()
+    for _, room_type, apartment, outline in space_records(data):
+        room_type = room_type.lower()
         total_rooms += 1
         if room_type not in relevant_room_types:
             continue
 
-        apartment = space_info.get("apartment", "Unknown")
-        poly = polygon_from_coords(space_info.get("coordinates", []))
+        apartment = apartment if apartment is not None else "Unknown"
+        poly = Polygon(outline)
 
         if apartment not in apartments:
             apartments[apartment] = {rt: [] for rt in relevant_room_types}
@@ -173,19 +174,19 @@ def compute_space_combinations_ratios_by_apartment(data, weight_flag=False):
     return results
 
 
-def process_json_file(file_path):
+def process_json_file(file_path, weight_flag=False):
     """
     Process a JSON file to compute apartment-level ratios.
     
     Args:
         file_path (str): Path to the JSON file.
+        weight_flag (bool): Whether to adjust the ratios by the room count weight.
     
     Returns:
         list: A list of dictionaries representing computed records.
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    apartment_results = compute_space_combinations_ratios_by_apartment(data, weight_flag=False)
+    data = load_design(file_path)
+    apartment_results = compute_space_combinations_ratios_by_apartment(data, weight_flag=weight_flag)
 
     records = []
     for apt, combos in apartment_results.items():
@@ -202,26 +203,24 @@ def process_json_file(file_path):
     return records
 
 
-def process_all_jsons(base_folder):
+def process_all_jsons(base_folder, weight_flag=False):
     """
     Recursively process all .json files in the specified base folder.
     
     Args:
         base_folder (str): The directory to search for JSON files.
+        weight_flag (bool): Whether to adjust the ratios by the room count weight.
     
     Returns:
         list: A list of records aggregated from all JSON files.
     """
     all_records = []
-    for root, _, files in os.walk(base_folder):
-        for file in files:
-            if file.endswith('.json'):
-                file_path = os.path.join(root, file)
-                try:
-                    records = process_json_file(file_path)
-                    all_records.extend(records)
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}")
+    for file_path in find_design_files(base_folder):
+        try:
+            records = process_json_file(file_path, weight_flag)
+            all_records.extend(records)
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
     return all_records
 
 
@@ -247,9 +246,8 @@ def load_jsons_and_compute_ratios(base_json_folder):
                 if json_filename_pattern.match(file_name):
                     file_path = os.path.join(folder_path, file_name)
                     try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                    except (json.JSONDecodeError, OSError) as e:
+                        data = load_design(file_path)
+                    except (ValueError, OSError) as e:
                         print(f"Error loading {file_path}: {e}")
                         continue
 
@@ -279,29 +277,63 @@ def save_records_to_csv(records, csv_path):
             writer.writerow(record)
 
 
-if __name__ == "__main__":
-    # Define paths for JSON files and CSV output.
-    json_folder_path = "/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/2025-AEC-Hackathon/json"
-    csv_output_path = "/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/2025-AEC-Hackathon/results/naive_ratios.csv"
+def parse_arguments():
+    """
+    Parse command-line arguments.
 
-    # Process all JSON files and save the results to CSV.
-    records = process_all_jsons(json_folder_path)
-    save_records_to_csv(records, csv_output_path)
-    print(f"Saved results for {len(records)} records to {csv_output_path}")
+    Returns:
+        argparse.Namespace: Parsed arguments with the JSON folder, CSV output path and reference JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute convex hull ratios for every floorplan JSON in a folder."
+    )
+    parser.add_argument("json_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("csv_output", type=str, help="Path of the CSV file to write")
+    parser.add_argument("--weighted-output", type=str, default=None,
+                        help="Also write the weighted ratios (e.g. weighted_ratios.csv) to this CSV")
+    parser.add_argument("--db", type=str, default=None,
+                        help="SQLite results database to upsert the naive and weighted ratios into")
+    parser.add_argument("--reference", type=str, default=None,
+                        help="Reference design JSON to print apartment ratios for")
+    return parser.parse_args()
 
-    # Example usage for additional computations.
-    reference_json_path = "/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/2025-AEC-Hackathon/json/ReferenceDesign_02/Reference02.json"
-    with open(reference_json_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
 
-    iou = compute_space_combinations_ratios(data)
-    apartment_ratios = compute_space_combinations_ratios_by_apartment(data)
+if __name__ == "__main__":
+    args = parse_arguments()
 
-    for apartment, combos in apartment_ratios.items():
-        print(f"Apartment: {apartment}")
-        for combo, (ratio, rooms_number, hull_area, total_area) in combos.items():
-            print(f"  Combination: {combo}")
-            print(f"    Ratio:      {ratio:.3f}")
-            print(f"    Hull Area:  {hull_area:.2f}")
-            print(f"    Total Area: {total_area:.2f}")
-        print()
+    # Process all JSON files and save the results to CSV.
+    records = process_all_jsons(args.json_folder)
+    save_records_to_csv(records, args.csv_output)
+    print(f"Saved results for {len(records)} records to {args.csv_output}")
+
+    weighted_records = None
+    if args.weighted_output or args.db:
+        weighted_records = process_all_jsons(args.json_folder, weight_flag=True)
+    if args.weighted_output:
+        save_records_to_csv(weighted_records, args.weighted_output)
+        print(f"Saved weighted results for {len(weighted_records)} records to {args.weighted_output}")
+    if args.db:
+        from results_store import ResultsStore
+
+        with ResultsStore(args.db) as store:
+            for path in find_design_files(args.json_folder):
+                store.design_id(os.path.basename(path), path)
+            store.add_ratio_records(records)
+            store.add_ratio_records(weighted_records, weighted=True)
+        print(f"Stored {len(records)} naive and {len(weighted_records)} weighted records in {args.db}")
+
+    if args.reference:
+        # Example usage for additional computations.
+        data = load_design(args.reference)
+
+        iou = compute_space_combinations_ratios(data)
+        apartment_ratios = compute_space_combinations_ratios_by_apartment(data)
+
+        for apartment, combos in apartment_ratios.items():
+            print(f"Apartment: {apartment}")
+            for combo, (ratio, rooms_number, hull_area, total_area) in combos.items():
+                print(f"  Combination: {combo}")
+                print(f"    Ratio:      {ratio:.3f}")
+                print(f"    Hull Area:  {hull_area:.2f}")
+                print(f"    Total Area: {total_area:.2f}")
+            print()
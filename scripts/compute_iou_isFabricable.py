@@ -1,54 +1,17 @@
-import json
+import argparse
 from shapely.geometry import Polygon, MultiPolygon
 from shapely.ops import unary_union
 import re
 import os
 import numpy as np
+import tracing
+from floorplan_io import load_design, space_records
 
-def compute_spaces_convex_hull_ratio(data, transport_thresholds = [3.2 , 13.6]):
+def hull_dimensions(hull):
     """
-    Given a JSON dictionary 'data' that contains 'spaces' with their coordinates and room types,
-    compute the ratio of the sum of areas of [bathroom, corridor, bedroom, kitchen]
-    to the total area of their convex hull.
+    Return the [short, long] sides of a convex hull's bounding box, measured
+    along its longest mostly X-oriented side (used for the transport check).
     """
-
-    # Room types we care about
-    #relevant_room_types = {"bathroom", "corridor", "kitchen"}
-    relevant_room_types = {"bathroom","corridor", "kitchen"}
-
-    polygons = []
-    total_area = 0.0
-
-
-    # Loop through the 'spaces' entry in the JSON
-    for space_id, space_info in data.get("spaces", {}).items():
-        room_type = space_info.get("room_type", "").lower()
-        
-        # Only process if it's one of the desired room types
-        if room_type in relevant_room_types:
-            coords = space_info.get("coordinates", [])
-            
-            # Convert list of {x, y, z} to a list of (x, y) tuples
-            polygon_coords = [(c["x"], c["y"]) for c in coords]
-            
-            # Create the polygon (Shapely auto-closes it)
-            poly = Polygon(polygon_coords)
-
-            # Add to list of polygons
-            polygons.append(poly)
-            
-            # Accumulate its area
-            total_area += poly.area
-
-    # If we have no polygons, avoid errors
-    if not polygons:
-        return 0.0
-
-    # Combine polygons into a single MultiPolygon and get its convex hull
-    multi_poly = MultiPolygon(polygons)
-    hull = multi_poly.convex_hull
-    hull_area = hull.area
-    
     #compute the rotation of the hull points against the longest X-oriented hull side
     hull_pts = hull.exterior.coords
     hull_vecs = [
@@ -86,7 +49,49 @@ def compute_spaces_convex_hull_ratio(data, transport_thresholds = [3.2 , 13.6]):
     ys = [pt[1] for pt in newPts]
     hull_x = max(xs) - min(xs)
     hull_y = max(ys) - min(ys)
-    hull_dim = sorted([hull_x,hull_y])
+    return sorted([hull_x,hull_y])
+
+@tracing.traced("transportability")
+def compute_spaces_convex_hull_ratio(data, transport_thresholds = [3.2 , 13.6]):
+    """
+    Given a JSON dictionary 'data' that contains 'spaces' with their coordinates and room types,
+    compute the ratio of the sum of areas of [bathroom, corridor, bedroom, kitchen]
+    to the total area of their convex hull.
+    """
+
+    # Room types we care about
+    #relevant_room_types = {"bathroom", "corridor", "kitchen"}
+    relevant_room_types = {"bathroom","corridor", "kitchen"}
+
+    polygons = []
+    total_area = 0.0
+
+
+    # Loop through the spaces (raw JSON dict or a loaded Design)
+    for space_id, room_type, _, outline in space_records(data):
+        room_type = room_type.lower()
+        
+        # Only process if it's one of the desired room types
+        if room_type in relevant_room_types:
+            # Create the polygon from the (n, 2) outline (Shapely auto-closes it)
+            poly = Polygon(outline)
+
+            # Add to list of polygons
+            polygons.append(poly)
+            
+            # Accumulate its area
+            total_area += poly.area
+
+    # If we have no polygons, avoid errors
+    if not polygons:
+        return 0.0
+
+    # Combine polygons into a single MultiPolygon and get its convex hull
+    multi_poly = MultiPolygon(polygons)
+    hull = multi_poly.convex_hull
+    hull_area = hull.area
+    
+    hull_dim = hull_dimensions(hull)
     isTransportable = min(hull_dim) <= transport_thresholds[0] and max(hull_dim) <= transport_thresholds[1]
 
     # Compute the ratio, guarding against division by zero
@@ -120,11 +125,10 @@ def load_jsons_and_compute_ratios(base_json_folder):
                 if json_filename_pattern.match(file_name):
                     file_path = os.path.join(folder_path, file_name)
                     
-                    # Load the JSON
+                    # Load the JSON (through the shared design cache)
                     try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                    except (json.JSONDecodeError, OSError) as e:
+                        data = load_design(file_path)
+                    except (ValueError, OSError) as e:
                         print(f"Error loading {file_path}: {e}")
                         continue
 
@@ -144,15 +148,27 @@ def load_jsons_and_compute_ratios(base_json_folder):
 
     return results
 
-if __name__ == "__main__":
+def parse_arguments():
+    """
+    Parse command-line arguments.
 
+    Returns:
+        argparse.Namespace: Parsed arguments with attribute 'json_path'.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute the convex hull ratio and transportability of a floorplan."
+    )
+    parser.add_argument("json_path", type=str, help="Path to the floorplan JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
 
     #possible code to get if iou is fabricable
-    with open('C:\\Users\\MarcoMondello\\OneDrive - GROPYUS\\Documents\\AEC Hackaton 2025\\json\\12009.json', 'r') as file:
-        data = json.load(file) 
+    data = load_design(args.json_path)
 
     iou = compute_spaces_convex_hull_ratio(data)
 
 
     print(iou)
-    
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 import networkx as nx
-import matplotlib.pyplot as plt
 import json
 import numpy as np
 import re
 import argparse
-from pyvis.network import Network
+import tracing
+from csr_graph import CSRGraph
 
 
 def parse_arguments():
@@ -30,6 +30,8 @@ def visualize_graph_pyvis(G, output_html):
         G (networkx.Graph): The graph to visualize.
         output_html (str): The output HTML file name.
     """
+    from pyvis.network import Network
+
     net = Network(
         notebook=False,
         height="750px",
@@ -49,6 +51,8 @@ def visualize_graph_matplotlib(G):
     Args:
         G (networkx.Graph): The graph to visualize.
     """
+    import matplotlib.pyplot as plt
+
     nx.draw(
         G,
         with_labels=True,
@@ -89,48 +93,63 @@ def extract_dimension_from_panel(panel):
     return np.linalg.norm(vector)
 
 
-def add_similar_wall_connections(G, dimensions):
+@tracing.traced("connect.similar_walls")
+def find_similar_wall_connections(graph, dimensions):
     """
-    Add new connections between panels (walls) that are very similar in dimension and alignment.
+    Find room pairs to connect because their panels (walls) are very similar in dimension and alignment.
     
     For each panel, the function looks for other panels with identical dimensions. It then
     checks if the panels belong to the same apartment and have aligned start/end points (in the
-    same or reversed order). If so, it finds room nodes connected to these panels and, if not
-    already connected, adds an edge between the room nodes.
+    same or reversed order). If so, it finds the room nodes connected to these panels. Each room
+    is connected at most once, as the first of the pair.
+    
+    The lookups run on a CSRGraph: panels with equal dimensions are grouped once instead of
+    scanning the whole array per panel, and neighbours are read from the CSR index arrays.
     
     Args:
-        G (networkx.Graph): The input graph containing panel nodes.
+        graph (CSRGraph): The input graph containing panel nodes.
         dimensions (np.array): Array of computed dimensions for each panel. The index order is
                                assumed to match the order of nodes when iterating over G.nodes().
+    
+    Returns:
+        list: (room_node_i, room_node_k) pairs to connect, in discovery order.
     """
     new_connections = {}
 
-    # Iterate over each panel using its index (converted to string as node identifier)
-    for i, dim in enumerate(dimensions):
-        # Find indices of panels with the same dimension
-        similar_indices = np.where(dimensions == dim)[0]
+    # Group panel indices by dimension (ascending, like np.where(dimensions == dim)).
+    groups = {}
+    for k, dim in enumerate(dimensions.tolist()):
+        groups.setdefault(dim, []).append(k)
+
+    is_room = np.array(["room" in str(n).lower() for n in graph.node_ids], dtype=bool)
 
+    def room_neighbor(index):
+        rooms = [j for j in graph.neighbors(index) if is_room[j]]
+        return graph.node_ids[rooms[0]] if rooms else None
+
+    # Iterate over each panel using its index (converted to string as node identifier)
+    for i, dim in enumerate(dimensions.tolist()):
         node_i = str(i)
-        if node_i not in G.nodes:
+        if node_i not in graph:
             continue
 
-        panel_i = G.nodes[node_i]
-        start_point_i = panel_i.get("start_point")
-        end_point_i = panel_i.get("end_point")
-        apartment_i = panel_i.get("apartment")
+        index_i = graph.index(node_i)
+        start_point_i = graph.node_attr("start_point", index_i)
+        end_point_i = graph.node_attr("end_point", index_i)
+        apartment_i = graph.node_attr("apartment", index_i)
 
-        for k in similar_indices:
+        for k in groups.get(dim, []):
             if k == i:
                 continue  # Skip self-comparison
 
             node_k = str(k)
-            if node_k not in G.nodes:
+            if node_k not in graph:
                 continue
 
-            panel_k = G.nodes[node_k]
-            start_point_k = panel_k.get("start_point")
-            end_point_k = panel_k.get("end_point")
-            apartment_k = panel_k.get("apartment")
+            index_k = graph.index(node_k)
+            start_point_k = graph.node_attr("start_point", index_k)
+            end_point_k = graph.node_attr("end_point", index_k)
+            apartment_k = graph.node_attr("apartment", index_k)
 
             # Ensure both panels are from the same apartment.
             if apartment_i != apartment_k:
@@ -145,11 +164,8 @@ def add_similar_wall_connections(G, dimensions):
                 continue
 
             # Get neighboring nodes assumed to be room nodes.
-            neighbors_i = list(G.neighbors(node_i))
-            neighbors_k = list(G.neighbors(node_k))
-
-            room_neighbor_i = next((n for n in neighbors_i if "room" in n.lower()), None)
-            room_neighbor_k = next((n for n in neighbors_k if "room" in n.lower()), None)
+            room_neighbor_i = room_neighbor(index_i)
+            room_neighbor_k = room_neighbor(index_k)
             if not room_neighbor_i or not room_neighbor_k:
                 continue  # Skip if valid room neighbors are not found
 
@@ -158,9 +174,27 @@ def add_similar_wall_connections(G, dimensions):
                 print("Already connected")
                 continue
 
-            G.add_edge(room_neighbor_i, room_neighbor_k)
             new_connections[room_neighbor_i] = room_neighbor_k
 
+    return list(new_connections.items())
+
+
+def add_similar_wall_connections(G, dimensions):
+    """
+    Add new connections between panels (walls) that are very similar in dimension and alignment.
+    
+    See find_similar_wall_connections for the matching rules; the matching runs on a
+    CSRGraph built from G and the resulting room-to-room edges are added to G.
+    
+    Args:
+        G (networkx.Graph): The input graph containing panel nodes.
+        dimensions (np.array): Array of computed dimensions for each panel. The index order is
+                               assumed to match the order of nodes when iterating over G.nodes().
+    """
+    graph = CSRGraph.from_networkx(G)
+    for room_i, room_k in find_similar_wall_connections(graph, dimensions):
+        G.add_edge(room_i, room_k)
+
 
 def main():
     # -------------------------------------------------------------------------
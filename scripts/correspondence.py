@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import argparse
+import json
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional
+
+import networkx as nx
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+
+import tracing
+from floorplan_io import Design, load_design
+from modify_plan import PrefabOptimizer, PrefabPart
+from plan_graph import PlanGraph
+
+
+@dataclass
+class MatchWeights:
+    """Weights of the terms of the room-to-room matching cost."""
+
+    room_type: float = 10.0  # added when the room types differ
+    area: float = 1.0        # |log(area ratio)|
+    centroid: float = 1.0    # distance between centroids normalized to the building extent
+    degree: float = 0.5      # difference in number of neighbouring rooms, over the largest degree
+    spectral: float = 0.5    # distance between spectral embeddings of the room contact graph
+
+
+class RoomFeatures(NamedTuple):
+    ids: List[str]
+    room_types: List[str]
+    areas: np.ndarray       # (n,)
+    centroids: np.ndarray   # (n, 2), in [0, 1] over the building extent
+    degrees: np.ndarray     # (n,)
+    spectral: np.ndarray    # (n, components)
+
+
+class RoomMatch(NamedTuple):
+    generic_id: str
+    reference_id: str
+    cost: float
+    same_type: bool
+
+
+def spectral_features(contacts: nx.Graph, nodes: List[str], components: int = 4) -> np.ndarray:
+    """
+    Spectral embedding of the rooms in the contact graph, weighted by shared wall length.
+
+    Eigenvectors are only defined up to sign and scale, so absolute values
+    scaled to [0, 1] per component are returned to make designs comparable.
+    Graphs too small or without edges give zeros.
+    """
+    out = np.zeros((len(nodes), components))
+    if len(nodes) < components + 2 or contacts.number_of_edges() == 0:
+        return out
+    # Only needed here; keep the scikit-learn import off the module import path.
+    from sklearn.manifold import SpectralEmbedding
+
+    adjacency = nx.to_numpy_array(contacts, nodelist=nodes, weight="shared_length")
+    embedding = SpectralEmbedding(n_components=components, affinity="precomputed",
+                                  random_state=0).fit_transform(adjacency)
+    embedding = np.abs(embedding)
+    scale = embedding.max(axis=0)
+    out[:, :embedding.shape[1]] = embedding / np.where(scale > 0, scale, 1.0)
+    return out
+
+
+def room_features(design: Design, components: int = 4) -> RoomFeatures:
+    """Per-room features of every space with a valid outline (at least 3 vertices)."""
+    table = design.spaces
+    rooms = np.flatnonzero(table.vertex_counts() >= 3)
+    contacts = PlanGraph(design).contacts
+    nodes = [f"room_{table.ids[i]}" for i in rooms]
+
+    areas = table.areas()[rooms] if len(rooms) else np.zeros(0)
+    centroids = np.array([np.asarray(table.polygon(i).centroid.coords[0]) for i in rooms]).reshape(-1, 2)
+    if len(rooms):
+        coords = np.concatenate([table.outline(i) for i in rooms])
+        extent = np.ptp(coords, axis=0).max()
+        centroids = (centroids - coords.min(axis=0)) / (extent if extent > 0 else 1.0)
+
+    return RoomFeatures(
+        ids=[table.ids[i] for i in rooms],
+        room_types=[table.room_type(i) for i in rooms],
+        areas=np.abs(areas),
+        centroids=centroids,
+        degrees=np.array([contacts.degree(n) if n in contacts else 0 for n in nodes], dtype=float),
+        spectral=spectral_features(contacts, nodes, components),
+    )
+
+
+def cost_matrix(generic: RoomFeatures, reference: RoomFeatures,
+                weights: Optional[MatchWeights] = None) -> np.ndarray:
+    """(n_generic, n_reference) matching cost, built with broadcasting in one pass."""
+    weights = weights or MatchWeights()
+    types = {t: k for k, t in enumerate(dict.fromkeys(generic.room_types + reference.room_types))}
+    type_g = np.array([types[t] for t in generic.room_types], dtype=np.int32)
+    type_r = np.array([types[t] for t in reference.room_types], dtype=np.int32)
+
+    log_g = np.log(np.maximum(generic.areas, 1e-9))
+    log_r = np.log(np.maximum(reference.areas, 1e-9))
+    max_degree = max(1.0, generic.degrees.max(initial=0), reference.degrees.max(initial=0))
+
+    return (weights.room_type * (type_g[:, None] != type_r[None, :])
+            + weights.area * np.abs(log_g[:, None] - log_r[None, :])
+            + weights.centroid * cdist(generic.centroids, reference.centroids)
+            + weights.degree * np.abs(generic.degrees[:, None] - reference.degrees[None, :]) / max_degree
+            + weights.spectral * cdist(generic.spectral, reference.spectral))
+
+
+@tracing.traced("correspondence.match")
+def match_rooms(generic: Design, reference: Design, weights: Optional[MatchWeights] = None,
+                components: int = 4, max_cost: Optional[float] = None) -> List[RoomMatch]:
+    """
+    Pair every room of the generic design with at most one room of the reference design.
+
+    Solves the linear assignment problem (Hungarian method, scipy's
+    linear_sum_assignment) on cost_matrix. With different room counts, the
+    rooms left over on the larger side stay unmatched.
+
+    Args:
+        generic (Design): Design to populate.
+        reference (Design): Reference design.
+        weights (MatchWeights): Cost weights (default: MatchWeights()).
+        components (int): Dimensions of the spectral embedding.
+        max_cost (float): Drop pairs costing more than this.
+
+    Returns:
+        list: RoomMatch per matched pair, in generic room order.
+    """
+    features_g = room_features(generic, components)
+    features_r = room_features(reference, components)
+    if not features_g.ids or not features_r.ids:
+        return []
+    cost = cost_matrix(features_g, features_r, weights)
+    rows, cols = linear_sum_assignment(cost)
+    return [RoomMatch(features_g.ids[i], features_r.ids[j], float(cost[i, j]),
+                      features_g.room_types[i] == features_r.room_types[j])
+            for i, j in zip(rows, cols) if max_cost is None or cost[i, j] <= max_cost]
+
+
+def reference_prefabs(matches: List[RoomMatch], reference: Design) -> Dict[str, PrefabPart]:
+    """
+    Turn matched reference rooms into prefabs for PrefabOptimizer.assign_prefabs.
+
+    Returns:
+        dict: Generic room id -> PrefabPart with the reference room's type and outline.
+    """
+    table = reference.spaces
+    index = {space_id: i for i, space_id in enumerate(table.ids)}
+    prefabs = {}
+    for match in matches:
+        i = index[match.reference_id]
+        polygon = table.polygon(i)
+        prefabs[match.generic_id] = PrefabPart(table.room_type(i), polygon, max_area=polygon.area)
+    return prefabs
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Match the rooms of a generic design to the rooms of a reference design."
+    )
+    parser.add_argument("generic_json", type=str, help="Path to the generic design JSON")
+    parser.add_argument("reference_json", type=str, help="Path to the reference design JSON")
+    parser.add_argument("--components", type=int, default=4, help="Spectral embedding dimensions")
+    parser.add_argument("--max-cost", type=float, default=None, help="Drop pairs above this cost")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for the matches")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    generic, reference = load_design(args.generic_json), load_design(args.reference_json)
+    matches = match_rooms(generic, reference, components=args.components, max_cost=args.max_cost)
+
+    g_types = dict(zip(generic.spaces.ids, (generic.spaces.room_type(i) for i in range(len(generic.spaces)))))
+    r_types = dict(zip(reference.spaces.ids, (reference.spaces.room_type(i) for i in range(len(reference.spaces)))))
+    for match in matches:
+        print(f"{match.generic_id:>6} {g_types[match.generic_id]:<14} -> "
+              f"{match.reference_id:>6} {r_types[match.reference_id]:<14} cost {match.cost:.3f}")
+    print(f"{len(matches)} rooms matched, {sum(m.same_type for m in matches)} with the same type")
+
+    optimizer = PrefabOptimizer([])
+    apartments = optimizer.load_from_design(generic)
+    assigned = optimizer.assign_prefabs(apartments, reference_prefabs(matches, reference))
+    print(f"{assigned} rooms given their reference room as prefab")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([m._asdict() for m in matches], f, indent=2)
+        print(f"Matches saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+_MISSING = -1
+
+
+class _NoneSentinel:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<missing>"
+
+
+# Marks an attribute a node or edge does not have (None is a valid value).
+_NONE = _NoneSentinel()
+
+
+def encode_column(values: List[Any]) -> tuple:
+    """
+    Dictionary-encode a column of attribute values without losing their types.
+
+    Values are keyed by (type, value), so 3 and 3.0 stay distinct. Missing
+    entries are passed as _NONE and encoded as -1.
+    Columns holding unhashable values (e.g. lists) are kept as an object array.
+
+    Returns:
+        tuple: (codes, categories) or (object ndarray, None).
+    """
+    categories: List[Any] = []
+    lookup: Dict[tuple, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    try:
+        for i, value in enumerate(values):
+            if value is _NONE:
+                codes[i] = _MISSING
+                continue
+            key = (type(value), value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(categories)
+                categories.append(value)
+            codes[i] = code
+    except TypeError:
+        return _object_column(values)
+    return codes, categories
+
+
+def _without_none(codes: np.ndarray, categories: List[Any]) -> tuple:
+    """Re-encode a column whose categories use None for missing values."""
+    kept = [c for c in categories if c is not None]
+    position = {id(c): i for i, c in enumerate(kept)}
+    mapping = np.array([_MISSING if c is None else position[id(c)] for c in categories] or [0],
+                       dtype=np.int32)
+    return mapping[codes] if len(codes) else codes.astype(np.int32), kept
+
+
+def _object_column(values: List[Any]) -> tuple:
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column, None
+
+
+def _decode(column: tuple, i: int):
+    codes, categories = column
+    if categories is None:
+        return codes[i]
+    code = codes[i]
+    return _NONE if code == _MISSING else categories[code]
+
+
+class CSRGraph:
+    """
+    Compact graph with integer node ids and CSR adjacency.
+
+    Node i is node_ids[i]. The neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], in the same order networkx iterates
+    G.neighbors(node), and weights holds the summed edge weight (the number of
+    parallel edges for multigraphs without a 'weight' attribute). Node and
+    edge attributes are stored as dictionary-encoded columns, and the edge
+    table keeps the original edge order and multigraph keys, so
+    from_networkx/to_networkx round-trips without loss.
+    """
+
+    def __init__(self, node_ids: List[Hashable], indptr: np.ndarray, indices: np.ndarray,
+                 weights: np.ndarray, node_columns: Dict[str, tuple],
+                 edge_src: np.ndarray, edge_dst: np.ndarray, edge_keys: Optional[List],
+                 edge_columns: Dict[str, tuple], directed: bool = False,
+                 multigraph: bool = False, graph_attrs: Optional[dict] = None):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_columns = node_columns
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_keys = edge_keys
+        self.edge_columns = edge_columns
+        self.directed = directed
+        self.multigraph = multigraph
+        self.graph_attrs = graph_attrs or {}
+        self._index = {node: i for i, node in enumerate(node_ids)}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_networkx(cls, G, weight: str = "weight") -> "CSRGraph":
+        """Build a CSRGraph from any networkx graph."""
+        node_ids = list(G.nodes())
+        index = {node: i for i, node in enumerate(node_ids)}
+        n = len(node_ids)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        indices, weights = [], []
+        for i, node in enumerate(node_ids):
+            for neighbor, data in G.adj[node].items():
+                indices.append(index[neighbor])
+                if G.is_multigraph():
+                    weights.append(sum(d.get(weight, 1) for d in data.values()))
+                else:
+                    weights.append(data.get(weight, 1))
+            indptr[i + 1] = len(indices)
+
+        node_names = list(dict.fromkeys(k for _, d in G.nodes(data=True) for k in d))
+        node_columns = {
+            name: encode_column([d.get(name, _NONE) for _, d in G.nodes(data=True)])
+            for name in node_names
+        }
+
+        if G.is_multigraph():
+            edges = list(G.edges(keys=True, data=True))
+            edge_keys = [k for _, _, k, _ in edges]
+            edge_data = [d for _, _, _, d in edges]
+        else:
+            edges = list(G.edges(data=True))
+            edge_keys = None
+            edge_data = [d for _, _, d in edges]
+        edge_src = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        edge_dst = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+        edge_names = list(dict.fromkeys(k for d in edge_data for k in d))
+        edge_columns = {name: encode_column([d.get(name, _NONE) for d in edge_data])
+                        for name in edge_names}
+
+        return cls(node_ids, indptr, np.array(indices, dtype=np.int64),
+                   np.array(weights, dtype=np.float64), node_columns, edge_src, edge_dst,
+                   edge_keys, edge_columns, directed=G.is_directed(),
+                   multigraph=G.is_multigraph(), graph_attrs=dict(G.graph))
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "CSRGraph":
+        """
+        Build a CSRGraph from graphml_stream.GraphArrays without going through networkx.
+
+        Attribute values are the parsed ones (floats for numbers, lists for
+        points and outlines), as in GraphArrays.to_networkx().
+        """
+        n = arrays.num_nodes
+        src, dst = arrays.edge_src.tolist(), arrays.edge_dst.tolist()
+
+        # Neighbour order follows first appearance in the edge list, as in networkx.
+        adjacency: List[Dict[int, float]] = [{} for _ in range(n)]
+        edge_keys, seen = [], {}
+        for u, v in zip(src, dst):
+            adjacency[u][v] = adjacency[u].get(v, 0) + 1
+            if not arrays.directed and u != v:
+                adjacency[v][u] = adjacency[v].get(u, 0) + 1
+            pair = (u, v) if arrays.directed else (min(u, v), max(u, v))
+            edge_keys.append(seen.get(pair, 0))
+            seen[pair] = edge_keys[-1] + 1
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in adjacency], out=indptr[1:])
+        indices = np.fromiter((v for a in adjacency for v in a), dtype=np.int64, count=int(indptr[-1]))
+        weights = np.fromiter((w for a in adjacency for w in a.values()), dtype=np.float64,
+                              count=int(indptr[-1]))
+
+        node_columns = {name: _without_none(codes, categories)
+                        for name, (codes, categories) in arrays.labels.items()}
+        for name, values in arrays.numbers.items():
+            node_columns[name] = encode_column([_NONE if np.isnan(v) else float(v) for v in values])
+        for name, values in arrays.points.items():
+            node_columns[name] = _object_column(
+                [_NONE if np.isnan(v).all() else v.tolist() for v in values])
+        node_columns["coordinates"] = _object_column(
+            [arrays.outline(i).tolist() if len(arrays.outline(i)) else _NONE for i in range(n)])
+        edge_columns = {name: _without_none(codes, categories)
+                        for name, (codes, categories) in arrays.edge_labels.items()}
+
+        return cls(list(arrays.node_ids), indptr, indices, weights, node_columns,
+                   arrays.edge_src.copy(), arrays.edge_dst.copy(), edge_keys, edge_columns,
+                   directed=arrays.directed, multigraph=True)
+
+    def to_networkx(self):
+        """Rebuild the networkx graph this CSRGraph was created from."""
+        import networkx as nx
+
+        if self.multigraph:
+            G = nx.MultiDiGraph() if self.directed else nx.MultiGraph()
+        else:
+            G = nx.DiGraph() if self.directed else nx.Graph()
+        G.graph.update(self.graph_attrs)
+
+        for i, node in enumerate(self.node_ids):
+            attrs = {}
+            for name, column in self.node_columns.items():
+                value = _decode(column, i)
+                if value is not _NONE:
+                    attrs[name] = value
+            G.add_node(node, **attrs)
+
+        for e in range(len(self.edge_src)):
+            attrs = {}
+            for name, column in self.edge_columns.items():
+                value = _decode(column, e)
+                if value is not _NONE:
+                    attrs[name] = value
+            u, v = self.node_ids[self.edge_src[e]], self.node_ids[self.edge_dst[e]]
+            if self.multigraph:
+                G.add_edge(u, v, key=self.edge_keys[e], **attrs)
+            else:
+                G.add_edge(u, v, **attrs)
+        return G
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def index(self, node: Hashable) -> int:
+        return self._index[node]
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self._index
+
+    def neighbors(self, i: int) -> np.ndarray:
+        """Neighbour indices of node index i."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def node_attr(self, name: str, i: int, default=None):
+        column = self.node_columns.get(name)
+        if column is None:
+            return default
+        value = _decode(column, i)
+        return default if value is _NONE else value
+
+    def node_labels(self, name: str) -> tuple:
+        """(codes, categories) of a dictionary-encoded node attribute."""
+        return self.node_columns[name]
+
+    def adjacency_matrix(self) -> np.ndarray:
+        """Dense adjacency matrix, identical to networkx.to_numpy_array(G)."""
+        n = len(self.node_ids)
+        A = np.zeros((n, n), dtype=np.float64)
+        rows = np.repeat(np.arange(n), self.degrees())
+        A[rows, self.indices] = self.weights
+        return A
+
+    def sparse_adjacency(self):
+        """scipy.sparse CSR adjacency sharing this graph's index arrays."""
+        from scipy.sparse import csr_matrix
+
+        n = len(self.node_ids)
+        return csr_matrix((self.weights, self.indices, self.indptr), shape=(n, n))
+
+
+def simrank_matrix(graph: CSRGraph, importance_factor: float = 0.9,
+                   max_iterations: int = 1000, tolerance: float = 1e-4) -> np.ndarray:
+    """
+    All-pairs SimRank on a CSRGraph.
+
+    Same fixed-point iteration as networkx.simrank_similarity
+    (S = max{C * A.T S A, I} with A column-normalised), returned as a dense
+    matrix indexed like graph.node_ids instead of a dict-of-dicts.
+    """
+    A = graph.adjacency_matrix()
+    s = A.sum(axis=0)
+    s[s == 0] = 1
+    A /= s
+
+    sim = np.eye(len(graph), dtype=np.float64)
+    for _ in range(max_iterations):
+        prev = sim
+        sim = importance_factor * ((A.T @ prev) @ A)
+        np.fill_diagonal(sim, 1.0)
+        if np.allclose(prev, sim, atol=tolerance):
+            return sim
+    raise RuntimeError(f"simrank did not converge after {max_iterations} iterations.")
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from typing import Any, List, NamedTuple
+
+
+_MISSING = object()
+
+
+class Edit(NamedTuple):
+    target: Any
+    attribute: str
+    old: Any
+    new: Any
+
+
+class EditLog:
+    """
+    Undo/redo log of attribute edits on rooms and apartments.
+
+    Search code records every change through set() instead of assigning the
+    attribute directly. Only the replaced values are kept (shapely geometries
+    are immutable, so no copies are needed), which lets a search branch by
+    taking a savepoint and backtrack with rollback() without deep-copying the
+    floorplan.
+    """
+
+    def __init__(self):
+        self._undo: List[Edit] = []
+        self._redo: List[Edit] = []
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def set(self, target: Any, attribute: str, value: Any):
+        """Assign target.attribute = value and record the previous value."""
+        old = getattr(target, attribute, _MISSING)
+        if old is value:
+            return
+        setattr(target, attribute, value)
+        self._undo.append(Edit(target, attribute, old, value))
+        self._redo.clear()
+
+    @staticmethod
+    def _assign(target: Any, attribute: str, value: Any):
+        if value is _MISSING:
+            delattr(target, attribute)
+        else:
+            setattr(target, attribute, value)
+
+    def undo(self) -> bool:
+        """Revert the most recent edit. Returns False if there is nothing to undo."""
+        if not self._undo:
+            return False
+        edit = self._undo.pop()
+        self._assign(edit.target, edit.attribute, edit.old)
+        self._redo.append(edit)
+        return True
+
+    def redo(self) -> bool:
+        """Re-apply the most recently undone edit. Returns False if there is nothing to redo."""
+        if not self._redo:
+            return False
+        edit = self._redo.pop()
+        self._assign(edit.target, edit.attribute, edit.new)
+        self._undo.append(edit)
+        return True
+
+    def savepoint(self) -> int:
+        """Return a marker for the current state that rollback() can return to."""
+        return len(self._undo)
+
+    def rollback(self, savepoint: int = 0):
+        """
+        Undo every edit made after the savepoint.
+
+        Rolled-back edits stay available to redo() until a new edit is recorded.
+        """
+        if savepoint > len(self._undo):
+            raise ValueError(f"Savepoint {savepoint} is ahead of the log ({len(self._undo)} edits)")
+        while len(self._undo) > savepoint:
+            self.undo()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    @contextmanager
+    def transaction(self):
+        """Roll back all edits made inside the block if it raises."""
+        savepoint = self.savepoint()
+        try:
+            yield savepoint
+        except BaseException:
+            self.rollback(savepoint)
+            raise
@@ -1,95 +1,106 @@
+import argparse
 import json
+import os
+import sys
 from collections import defaultdict
 
-# json file path
-file_path = 'C:/Users/panz/Documents/GitHub/2025-AEC-Hackathon/json/GenericDesign_21004/21004.json'  # Adjust the path to your file
+import numpy as np
 
-# Load the JSON data from the file
-try:
-    with open(file_path, 'r') as f:  # Open the file in read mode
-        data = json.load(f)  # Parse the JSON content into a Python dictionary
+# The shared floorplan loader lives one folder up, next to the other scripts.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tracing
+from floorplan_io import load_design
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Find adjacent rooms from shared panel endpoints and store them in the JSON."
+    )
+    parser.add_argument("file_path", type=str, help="Path to the floorplan JSON file")
+    parser.add_argument("--output", type=str, default="updated_floorplan.json",
+                        help="Path of the JSON file with the added 'room_adjacency' key")
+    return parser.parse_args()
+
+
+@tracing.traced("adjacency")
+def compute_room_adjacency(design):
+    """
+    Find rooms whose panels share a start point or an end point within the same apartment.
+
+    Panels are grouped by (apartment, start point) and (apartment, end point);
+    every pair of different rooms inside a group is adjacent. This gives the
+    same result as comparing every panel with every other panel, in linear time.
+
+    Args:
+        design (Design): Floorplan loaded with floorplan_io.load_design.
+
+    Returns:
+        defaultdict: Mapping room -> set of adjacent rooms.
+    """
+    panels = design.panels
+    room_adjacency = defaultdict(set)
+
+    # Panels without a room or either endpoint are skipped entirely, reported once each.
+    valid = ~(np.isnan(panels.start).any(axis=1) | np.isnan(panels.end).any(axis=1))
+    for i in range(len(panels)):
+        if valid[i] and panels.room(i) is None:
+            valid[i] = False
+        if not valid[i]:
+            print(f"Missing room or endpoint in panel {panels.ids[i]}")
+
+    for points in (panels.start, panels.end):
+        groups = defaultdict(set)
+        for i in np.flatnonzero(valid):
+            groups[(panels.apartment_codes[i], tuple(points[i]))].add(panels.room(i))
+
+        for rooms in groups.values():
+            if len(rooms) < 2:
+                continue
+            for room in rooms:
+                room_adjacency[room].update(rooms - {room})
+    return room_adjacency
+
+
+def main():
+    args = parse_arguments()
+
+    # Load the floorplan through the shared loader (binary cache keyed by file hash);
+    # the raw JSON is kept so the output is the input plus 'room_adjacency'.
+    try:
+        with open(args.file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        design = load_design(args.file_path)
         print("JSON data loaded successfully!")
-except Exception as e:
-    print(f"Error loading JSON file: {e}")
-    exit(1)  # Exit if the file loading fails
+    except Exception as e:
+        print(f"Error loading JSON file: {e}")
+        sys.exit(1)  # Exit if the file loading fails
+
+    room_adjacency = compute_room_adjacency(design)
 
-# Initialize a dictionary to store adjacency relations
-room_adjacency = defaultdict(set)
-#initialize a counter for the apartments
-aptCount = 0
+    # Extract apartments from the spaces
+    apartments = {name for name in design.spaces.apartments if name not in (None, "UNASSIGNED")}
+    print(apartments)
+    # Count unique apartments
+    apartment_count = len(apartments)
+    print(f"There are {apartment_count} apartments in the floorplan.")
 
+    # Convert sets to lists before saving to JSON
+    for room, adjacent_rooms in room_adjacency.items():
+        room_adjacency[room] = list(adjacent_rooms)
+        print(f"{room} is adjacent to: {', '.join(adjacent_rooms)}")
 
+    # Now, we'll add the adjacency information to the JSON data
+    # Creating a new key "room_adjacency" to store the adjacency information
+    data['room_adjacency'] = room_adjacency
 
-# Loop through all panels and add adjacency edges
-for panel_id, panel_data in data.get("panels", {}).get("items", {}).items():
-    apartment = panel_data.get("apartment")
-    #print (apartment)
-    
+    # Save the updated data to a new JSON file
     try:
-        room = panel_data["room"]  # Get the room associated with the wall
-        start_point = panel_data["start_point"]
-        end_point = panel_data["end_point"]
-    except KeyError as e:
-        print(f"Missing key in panel {panel_id}: {e}")
-        continue  # Skip this panel if it has missing data
-
-
-    # Iterate through other panels to find shared walls
-    for other_panel_id, other_panel_data in data["panels"]["items"].items():
-        other_apartment = other_panel_data.get("apartment")
-        if apartment == other_apartment:
-            if panel_id != other_panel_id:
-                try:
-                    other_room = other_panel_data["room"]
-                    other_start_point = other_panel_data["start_point"]
-                    other_end_point = other_panel_data["end_point"]
-                except KeyError as e:
-                    print(f"Missing key in panel {other_panel_id}: {e}")
-                    continue  # Skip this panel if it has missing data
-
-                # Check if both panels share the same room
-                if other_room != room and (
-                    start_point == other_start_point or 
-                    end_point == other_end_point
-                ):
-                    # If they share a common point, they are adjacent
-                    room_adjacency[room].add(other_room)
-                    room_adjacency[other_room].add(room)
-    
-#loop through all the spaces
-# Extract apartments from the panels and spaces
-apartments = set()
-
-
-    
-# Check apartments in spaces
-for space in data["spaces"].values():
-    spaceType = space.get("apartment")
-    if spaceType =="Apartment 1" or spaceType =="Apartment 2" or spaceType =="Apartment 3":
-        apartments.add(space.get("apartment"))
-print (apartments)
-# Count unique apartments
-apartment_count = len(apartments)
-print(f"There are {apartment_count} apartments in the floorplan.")
-
-
-
-# Convert sets to lists before saving to JSON
-for room, adjacent_rooms in room_adjacency.items():
-    room_adjacency[room] = list(adjacent_rooms)
-    print(f"{room} is adjacent to: {', '.join(adjacent_rooms)}")
-
-    
-# Now, we'll add the adjacency information to the JSON data
-# Creating a new key "room_adjacency" to store the adjacency information
-data['room_adjacency'] = room_adjacency
-
-
-# Save the updated data to a new JSON file
-output_file = 'C:/Users/panz/Documents/updated_floorplan.json'
-try:
-    with open(output_file, 'w') as f:
-        json.dump(data, f, indent=4)
-    print(f"Updated adjacency information saved to {output_file}")
-except Exception as e:
-    print(f"Error saving JSON file: {e}")
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"Updated adjacency information saved to {args.output}")
+    except Exception as e:
+        print(f"Error saving JSON file: {e}")
+
+
+if __name__ == "__main__":
+    main()
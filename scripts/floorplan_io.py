@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import tracing
+from compact_plan import SpaceTable, encode_labels
+
+
+# Bump whenever Design, SpaceTable or PanelTable change shape so stale cache
+# entries are ignored instead of unpickled into the wrong layout.
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "FLOORPLAN_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "aec-hackathon", "designs"),
+)
+
+
+class PanelTable:
+    """
+    Struct-of-arrays view of the 'panels.items' of a floorplan.
+
+    Start and end points are (n, 3) float64 arrays; panel types, rooms and
+    apartments are dictionary-encoded like the columns of SpaceTable.
+    """
+
+    __slots__ = ("ids", "start", "end", "height", "thickness",
+                 "panel_type_codes", "panel_types", "room_codes", "rooms",
+                 "apartment_codes", "apartments")
+
+    def __init__(self, ids, start, end, height, thickness, panel_type_codes, panel_types,
+                 room_codes, rooms, apartment_codes, apartments):
+        self.ids = ids
+        self.start = start
+        self.end = end
+        self.height = height
+        self.thickness = thickness
+        self.panel_type_codes = panel_type_codes
+        self.panel_types = panel_types
+        self.room_codes = room_codes
+        self.rooms = rooms
+        self.apartment_codes = apartment_codes
+        self.apartments = apartments
+
+    @classmethod
+    def from_items(cls, items: Dict[str, dict]) -> "PanelTable":
+        """
+        Build a table from the 'panels.items' mapping of a floorplan JSON.
+
+        Missing points are stored as NaN and missing heights/thicknesses as 0.
+        """
+        values = list(items.values())
+        n = len(values)
+
+        def points(key):
+            out = np.full((n, 3), np.nan)
+            for i, panel in enumerate(values):
+                point = panel.get(key)
+                if point:
+                    out[i, :len(point)] = point[:3]
+            return out
+
+        def column(key):
+            return np.fromiter((float(p.get(key) or 0.0) for p in values), dtype=np.float64, count=n)
+
+        panel_type_codes, panel_types = encode_labels([p.get("panel_type", "") for p in values])
+        room_codes, rooms = encode_labels([p.get("room") for p in values])
+        apartment_codes, apartments = encode_labels([p.get("apartment") for p in values])
+        return cls(list(items), points("start_point"), points("end_point"),
+                   column("height"), column("thickness"), panel_type_codes, panel_types,
+                   room_codes, rooms, apartment_codes, apartments)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def panel_type(self, i: int) -> str:
+        return self.panel_types[self.panel_type_codes[i]]
+
+    def room(self, i: int):
+        return self.rooms[self.room_codes[i]]
+
+    def apartment(self, i: int):
+        return self.apartments[self.apartment_codes[i]]
+
+    def lengths(self) -> np.ndarray:
+        """Plan length of every panel (distance between start and end in x/y)."""
+        delta = self.end[:, :2] - self.start[:, :2]
+        return np.hypot(delta[:, 0], delta[:, 1])
+
+
+class Design:
+    """
+    Normalized in-memory model of one floorplan JSON.
+
+    Attributes:
+        source (str): Path the design was loaded from.
+        digest (str): SHA-256 of the source file.
+        spaces (SpaceTable): Room outlines, types and apartments.
+        panels (PanelTable): Wall panels with endpoints, sizes, rooms and apartments.
+    """
+
+    __slots__ = ("source", "digest", "spaces", "panels")
+
+    def __init__(self, source: str, digest: str, spaces: SpaceTable, panels: PanelTable):
+        self.source = source
+        self.digest = digest
+        self.spaces = spaces
+        self.panels = panels
+
+    @classmethod
+    def from_dict(cls, data: dict, source: str = "", digest: str = "") -> "Design":
+        return cls(source, digest,
+                   SpaceTable.from_spaces(data.get("spaces", {})),
+                   PanelTable.from_items(data.get("panels", {}).get("items", {})))
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.source)
+
+    @property
+    def apartments(self) -> List[str]:
+        """Apartment names used by spaces or panels, in order of first appearance."""
+        names = dict.fromkeys(self.spaces.apartments + self.panels.apartments)
+        return [n for n in names if n not in (None, "UNASSIGNED")]
+
+    def apartment_spaces(self) -> Dict[str, np.ndarray]:
+        """Mapping apartment name -> indices of its spaces."""
+        return {name: np.flatnonzero(self.spaces.apartment_codes == code)
+                for code, name in enumerate(self.spaces.apartments)}
+
+    def to_dict(self) -> dict:
+        """Rebuild the floorplan JSON structure ('panels' and 'spaces') from the model."""
+        spaces = {}
+        for i, space_id in enumerate(self.spaces.ids):
+            space = {"room_type": self.spaces.room_type(i)}
+            if self.spaces.apartment(i) is not None:
+                space["apartment"] = self.spaces.apartment(i)
+            space["coordinates"] = [{"x": float(x), "y": float(y), "z": 0}
+                                    for x, y in self.spaces.outline(i)]
+            spaces[space_id] = space
+
+        p = self.panels
+        items = {}
+        for i, panel_id in enumerate(p.ids):
+            items[panel_id] = {
+                "panel_type": p.panel_type(i),
+                "start_point": [float(v) for v in p.start[i]],
+                "end_point": [float(v) for v in p.end[i]],
+                "height": float(p.height[i]),
+                "thickness": float(p.thickness[i]),
+                "room": p.room(i),
+                "apartment": p.apartment(i),
+            }
+        return {"panels": {"attributes": {}, "items": items}, "spaces": spaces}
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, f"{digest}.v{CACHE_VERSION}.pkl")
+
+
+def load_design(path: str, use_cache: bool = True, cache_dir: Optional[str] = None) -> Design:
+    """
+    Load a floorplan JSON as a Design, reusing a binary cache when possible.
+
+    The cache entry is keyed by the SHA-256 of the file contents, so it stays
+    valid when the file is moved and is bypassed as soon as the file changes.
+
+    Args:
+        path (str): Path to the floorplan JSON.
+        use_cache (bool): Read and write the binary cache.
+        cache_dir (str): Cache folder; defaults to $FLOORPLAN_CACHE_DIR or ~/.cache.
+
+    Returns:
+        Design: The parsed design.
+    """
+    with tracing.span("load", file=os.path.basename(path)):
+        return _load_design(path, use_cache, cache_dir)
+
+
+def _load_design(path: str, use_cache: bool, cache_dir: Optional[str]) -> Design:
+    digest = file_digest(path)
+    cache_file = _cache_path(cache_dir or DEFAULT_CACHE_DIR, digest)
+
+    if use_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                design = pickle.load(f)
+            design.source = path
+            tracing.count("load.cache_hits")
+            return design
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"Ignoring unreadable cache entry {cache_file}: {e}")
+
+    with tracing.span("load.parse"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    with tracing.span("load.build"):
+        design = Design.from_dict(data, source=path, digest=digest)
+
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(design, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"Could not write cache entry {cache_file}: {e}")
+    return design
+
+
+def space_records(data) -> Iterator[Tuple[str, str, Optional[str], np.ndarray]]:
+    """
+    Yield (space_id, room_type, apartment, outline) for every space.
+
+    Accepts either a Design or a raw floorplan dict, so the analysis functions
+    work on both. The outline is an (n, 2) array of x/y coordinates.
+    """
+    if isinstance(data, Design):
+        table = data.spaces
+        for i, space_id in enumerate(table.ids):
+            yield space_id, table.room_type(i), table.apartment(i), table.outline(i)
+        return
+
+    for space_id, space in data.get("spaces", {}).items():
+        outline = np.array([(c["x"], c["y"]) for c in space.get("coordinates", [])], dtype=float)
+        yield space_id, space.get("room_type", ""), space.get("apartment"), outline.reshape(-1, 2)
+
+
+def find_design_files(base_folder: str) -> List[str]:
+    """
+    Recursively collect floorplan JSON files under base_folder.
+
+    Files are recognised by a 'panels' or 'spaces' key near the top, which
+    skips other JSON such as prefab catalogs.
+    """
+    paths = []
+    for root, _, files in os.walk(base_folder):
+        for file in sorted(files):
+            if not file.endswith(".json"):
+                continue
+            path = os.path.join(root, file)
+            with open(path, "r", encoding="utf-8") as f:
+                head = f.read(4096)
+            if '"spaces"' in head or '"panels"' in head:
+                paths.append(path)
+    return paths
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import Polygon
+
+import tracing
+from modify_plan import Apartment, CorridorPrefab, PrefabOptimizer, PrefabPart, Room
+
+
+def _hull_points(geom: Polygon) -> np.ndarray:
+    """Return the convex hull vertices of a geometry as an (n, 2) array."""
+    hull = geom.convex_hull
+    if hull.geom_type != "Polygon":
+        return np.asarray(hull.coords, dtype=float).reshape(-1, 2)
+    return np.asarray(hull.exterior.coords, dtype=float)[:-1]
+
+
+def _iou(a: Polygon, b: Polygon) -> float:
+    inter = a.intersection(b).area
+    union = a.area + b.area - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class SearchResult:
+    """Outcome of a floorplan search on one apartment."""
+    apartment: str
+    initial_score: float
+    best_score: float
+    iterations: int
+    accepted: int
+    elapsed: float
+    assignments: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class IncrementalObjective:
+    """
+    Apartment objective that is updated one room at a time.
+
+    The objective combines the convex hull ratio of the relevant rooms, the IoU
+    between each room and its assigned prefab, and a penalty for rooms that
+    overlap each other. Per-room areas, hull vertices, bounds, IoUs and the
+    pairwise overlap matrix are cached, so a move only recomputes the terms of
+    the room it touches instead of rebuilding unary_union and the hull.
+    """
+
+    def __init__(self, rooms: List[Room], relevant_types: set,
+                 hull_weight: float = 1.0, iou_weight: float = 1.0,
+                 overlap_weight: float = 5.0):
+        self.rooms = rooms
+        self.relevant = np.array([r.type in relevant_types for r in rooms], dtype=bool)
+        self.hull_weight = hull_weight
+        self.iou_weight = iou_weight
+        self.overlap_weight = overlap_weight
+
+        n = len(rooms)
+        self.geometries = [r.geometry for r in rooms]
+        self.placements: List[Optional[Polygon]] = [None] * n
+        self.areas = np.array([g.area for g in self.geometries], dtype=float)
+        self.bounds = np.array([g.bounds for g in self.geometries], dtype=float).reshape(n, 4)
+        self.hulls = [_hull_points(g) for g in self.geometries]
+        self.ious = np.zeros(n, dtype=float)
+        self.overlaps = np.zeros((n, n), dtype=float)
+        for i in range(n):
+            self.overlaps[i] = self._overlap_row(i, self.geometries[i], self.bounds[i])
+        # Pairwise overlap total, kept up to date by commit() from the changed row.
+        self.overlap_sum = float(np.triu(self.overlaps, 1).sum())
+        self.hull = self._hull(self.hulls)
+
+    def _hull(self, hulls: List[np.ndarray]):
+        points = [h for h, rel in zip(hulls, self.relevant) if rel and len(h)]
+        if not points:
+            return Polygon()
+        return shapely.convex_hull(shapely.multipoints(np.vstack(points)))
+
+    def _overlap_row(self, i: int, geom: Polygon, bounds: np.ndarray) -> np.ndarray:
+        b = self.bounds
+        candidates = np.flatnonzero(
+            (b[:, 0] < bounds[2]) & (b[:, 2] > bounds[0]) &
+            (b[:, 1] < bounds[3]) & (b[:, 3] > bounds[1])
+        )
+        row = np.zeros(len(self.rooms), dtype=float)
+        for j in candidates:
+            if j != i:
+                row[j] = geom.intersection(self.geometries[j]).area
+        return row
+
+    def _score(self, total_area: float, hull_area: float, iou_sum: float,
+               overlap_sum: float) -> float:
+        hull_ratio = total_area / hull_area if hull_area > 0 else 0.0
+        assigned = max(1, sum(p is not None for p in self.placements))
+        overlap = overlap_sum / total_area if total_area > 0 else 0.0
+        return (self.hull_weight * hull_ratio
+                + self.iou_weight * iou_sum / assigned
+                - self.overlap_weight * overlap)
+
+    @property
+    def hull_area(self) -> float:
+        return self.hull.area
+
+    @property
+    def total_area(self) -> float:
+        return float(self.areas[self.relevant].sum())
+
+    @property
+    def hull_ratio(self) -> float:
+        return self.total_area / self.hull_area if self.hull_area > 0 else 0.0
+
+    def score(self) -> float:
+        return self._score(self.total_area, self.hull_area, float(self.ious.sum()), self.overlap_sum)
+
+    def evaluate(self, i: int, geom: Polygon, placement: Optional[Polygon]) -> dict:
+        """
+        Evaluate replacing room i's geometry and prefab placement without committing.
+
+        Returns:
+            dict: The updated per-room terms and the resulting objective score.
+        """
+        area = geom.area
+        bounds = np.array(geom.bounds, dtype=float)
+        hull = _hull_points(geom)
+
+        hull_geom = self._hull_after(i, hull) if self.relevant[i] else self.hull
+        hull_area = hull_geom.area
+
+        iou = _iou(geom, placement) if placement is not None else 0.0
+        row = self._overlap_row(i, geom, bounds)
+
+        total_area = self.total_area
+        if self.relevant[i]:
+            total_area += area - self.areas[i]
+        iou_sum = float(self.ious.sum()) - self.ious[i] + iou
+        overlap_sum = self.overlap_sum - self.overlaps[i].sum() + row.sum()
+
+        previous = self.placements[i]
+        self.placements[i] = placement
+        score = self._score(total_area, hull_area, iou_sum, overlap_sum)
+        self.placements[i] = previous
+
+        return {"index": i, "geometry": geom, "placement": placement, "area": area,
+                "bounds": bounds, "hull": hull, "hull_geom": hull_geom, "iou": iou,
+                "row": row, "score": score}
+
+    def _hull_after(self, i: int, hull: np.ndarray):
+        # When both the old and the new outline lie strictly inside the current
+        # hull, the room never contributed a hull vertex and the hull is unchanged.
+        old = self.hulls[i]
+        if (not self.hull.is_empty
+                and shapely.contains_xy(self.hull, old[:, 0], old[:, 1]).all()
+                and shapely.contains_xy(self.hull, hull[:, 0], hull[:, 1]).all()):
+            return self.hull
+        hulls = list(self.hulls)
+        hulls[i] = hull
+        return self._hull(hulls)
+
+    def commit(self, move: dict):
+        i = move["index"]
+        self.geometries[i] = move["geometry"]
+        self.placements[i] = move["placement"]
+        self.areas[i] = move["area"]
+        self.bounds[i] = move["bounds"]
+        self.hulls[i] = move["hull"]
+        self.hull = move["hull_geom"]
+        self.ious[i] = move["iou"]
+        self.overlap_sum += float(move["row"].sum() - self.overlaps[i].sum())
+        self.overlaps[i, :] = move["row"]
+        self.overlaps[:, i] = move["row"]
+
+
+class AnnealingOptimizer:
+    """
+    Simulated annealing over room geometries and prefab assignments.
+
+    Each iteration picks a relevant room and either scales it along one axis,
+    translates it, or reassigns its prefab from the available candidates. Moves
+    are scored with IncrementalObjective and accepted with the Metropolis rule
+    under a geometric cooling schedule. The best state seen is written back to
+    the rooms at the end.
+    """
+
+    def __init__(self, optimizer: PrefabOptimizer, catalog=None, seed: Optional[int] = None,
+                 step: float = 0.1, max_scale: float = 0.1, **objective_kwargs):
+        self.optimizer = optimizer
+        self.catalog = catalog
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.step = step
+        self.max_scale = max_scale
+        self.objective_kwargs = objective_kwargs
+
+    def _candidates(self, room: Room) -> List[PrefabPart]:
+        if self.catalog is not None:
+            parts = self.catalog.parts(room.type)
+        else:
+            prefab = self.optimizer.prefabs.get(room.type)
+            parts = [prefab] if prefab is not None else []
+        # A prefab assigned beforehand (e.g. the matched reference room) is tried first.
+        if room.prefab is not None and room.prefab not in parts:
+            parts = [room.prefab] + parts
+        return parts
+
+    def _place(self, geom: Polygon, prefab: Optional[PrefabPart]) -> Optional[Polygon]:
+        if prefab is None:
+            return None
+        return self.optimizer._aligned_prefab(geom, prefab.geometry)
+
+    def _propose(self, room: Room, geom: Polygon, prefab: Optional[PrefabPart]):
+        move = self.random.random()
+        if move < 0.4:
+            factor = 1 + self.random.uniform(-self.max_scale, self.max_scale)
+            if self.random.random() < 0.5:
+                geom = affinity.scale(geom, xfact=factor, yfact=1, origin="centroid")
+            else:
+                geom = affinity.scale(geom, xfact=1, yfact=factor, origin="centroid")
+        elif move < 0.8:
+            geom = affinity.translate(geom, self.random.uniform(-self.step, self.step),
+                                      self.random.uniform(-self.step, self.step))
+        else:
+            candidates = self._candidates(room)
+            prefab = self.random.choice(candidates + [None])
+        return geom, prefab
+
+    @tracing.traced("search.anneal")
+    def optimize_apartment(self, apartment: Apartment, iterations: int = 2000,
+                           start_temperature: float = 0.05,
+                           end_temperature: float = 1e-4) -> SearchResult:
+        """
+        Search one apartment and write the best room geometries back in place.
+
+        Args:
+            apartment (Apartment): Apartment to adapt.
+            iterations (int): Number of proposed moves.
+            start_temperature (float): Initial annealing temperature.
+            end_temperature (float): Final annealing temperature.
+
+        Returns:
+            SearchResult: Scores, acceptance counts and throughput of the run.
+        """
+        rooms = apartment.rooms
+        objective = IncrementalObjective(rooms, self.optimizer.relevant_types,
+                                         **self.objective_kwargs)
+        prefabs: List[Optional[PrefabPart]] = []
+        for i, room in enumerate(rooms):
+            candidates = self._candidates(room)
+            prefab = candidates[0] if candidates else None
+            prefabs.append(prefab)
+            objective.commit(objective.evaluate(i, room.geometry, self._place(room.geometry, prefab)))
+
+        movable = [i for i, room in enumerate(rooms) if room.type in self.optimizer.relevant_types]
+        current = initial = objective.score()
+        best, best_geometries, best_prefabs = current, list(objective.geometries), list(prefabs)
+        accepted = 0
+
+        cooling = (end_temperature / start_temperature) ** (1 / max(1, iterations))
+        temperature = start_temperature
+        start = time.perf_counter()
+        for _ in range(iterations if movable else 0):
+            i = self.random.choice(movable)
+            geom, prefab = self._propose(rooms[i], objective.geometries[i], prefabs[i])
+            move = objective.evaluate(i, geom, self._place(geom, prefab))
+
+            delta = move["score"] - current
+            if delta >= 0 or self.random.random() < math.exp(delta / temperature):
+                objective.commit(move)
+                prefabs[i] = prefab
+                current = move["score"]
+                accepted += 1
+                if current > best:
+                    best, best_geometries, best_prefabs = current, list(objective.geometries), list(prefabs)
+            temperature *= cooling
+        elapsed = time.perf_counter() - start
+        tracing.count("search.iterations", iterations if movable else 0)
+        tracing.count("search.accepted", accepted)
+
+        # Written through the optimizer's edit log so the whole search result can
+        # be rolled back to the savepoint taken before it.
+        log = self.optimizer.edit_log
+        for room, geom, prefab in zip(rooms, best_geometries, best_prefabs):
+            log.set(room, "geometry", geom)
+            log.set(room, "prefab", prefab)
+        apartment.refresh_floorplan()
+
+        return SearchResult(
+            apartment=apartment.name,
+            initial_score=initial,
+            best_score=best,
+            iterations=iterations if movable else 0,
+            accepted=accepted,
+            elapsed=elapsed,
+            assignments={room.id: getattr(prefab, "sku", None) or (prefab.type if prefab else None)
+                         for room, prefab in zip(rooms, best_prefabs)},
+        )
+
+    def optimize(self, apartments: List[Apartment], **kwargs) -> List[SearchResult]:
+        results = []
+        for apartment in apartments:
+            result = self.optimize_apartment(apartment, **kwargs)
+            print(f"{result.apartment}: score {result.initial_score:.3f} -> {result.best_score:.3f} "
+                  f"({result.accepted}/{result.iterations} accepted, "
+                  f"{result.iterations_per_second:.0f} it/s)")
+            results.append(result)
+        return results
+
+
+def default_prefabs() -> List[PrefabPart]:
+    """Return the sample prefabs used by modify_plan.py."""
+    return [
+        PrefabPart("bathroom", Polygon([(0, 0), (0, 2), (3, 2), (3, 0)]), max_area=8),
+        PrefabPart("kitchen", Polygon([(0, 0), (0, 3), (4, 3), (4, 0)]), max_area=12),
+        CorridorPrefab(geometry=Polygon([(0, 0), (0, 1.2), (4, 1.2), (4, 0)]),
+                       max_area=15, max_length=5, max_width=1.5),
+    ]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Adapt a floorplan to kit-of-parts prefabs with simulated annealing."
+    )
+    parser.add_argument("json_path", type=str, help="Path to the floorplan JSON")
+    parser.add_argument("--catalog", type=str, default=None, help="Prefab catalog JSON")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    catalog = None
+    if args.catalog:
+        from prefab_catalog import PrefabCatalog
+        catalog = PrefabCatalog.load(args.catalog)
+        optimizer = PrefabOptimizer(catalog.parts())
+    else:
+        optimizer = PrefabOptimizer(default_prefabs())
+
+    apartments = optimizer.load_from_json(args.json_path)
+    search = AnnealingOptimizer(optimizer, catalog=catalog, seed=args.seed)
+    search.optimize(apartments, iterations=args.iterations)
+
+
+if __name__ == "__main__":
+    main()
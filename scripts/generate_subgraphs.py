@@ -1,9 +1,9 @@
 import networkx as nx
-import matplotlib.pyplot as plt
-import argparse  # Included if you later want to add command-line arguments.
-import json
+import argparse
 import numpy as np
 import math
+import tracing
+from floorplan_io import load_design, space_records
 
 
 def get_room_or_apartment_nodes(G):
@@ -28,7 +28,9 @@ def compute_centroid(points):
     Compute the centroid of a list of points.
 
     Each point is a dict with keys 'x', 'y', and 'z'. The centroid is computed
-    as the average of all x, y, and z coordinates.
+    as the average of all x, y, and z coordinates. An (n, 2) or (n, 3) array
+    of outline coordinates (as yielded by floorplan_io.space_records) is also
+    accepted; a missing z is taken as 0.
 
     Args:
         points (list): List of dicts representing points, e.g.:
@@ -40,9 +42,14 @@ def compute_centroid(points):
     Raises:
         ValueError: If the input list is empty.
     """
-    if not points:
+    if len(points) == 0:
         raise ValueError("The list of points is empty.")
 
+    if isinstance(points, np.ndarray):
+        centroid = points.mean(axis=0)
+        return [float(centroid[0]), float(centroid[1]),
+                float(centroid[2]) if len(centroid) > 2 else 0.0]
+
     n = len(points)
     centroid_x = sum(p['x'] for p in points) / n
     centroid_y = sum(p['y'] for p in points) / n
@@ -90,99 +97,113 @@ def get_distances(G_target):
     return G_target
 
 
-# =============================================================================
-# Load JSON data for both the reference and generic designs.
-# =============================================================================
-
-# Load the reference design JSON.
-with open('/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/hackathon/2025-AEC-Hackathon/json/ReferenceDesign_01/Reference01.json', 'r') as file:
-    data = json.load(file)
-spaces = data["spaces"]
-
-# Load the generic design JSON.
-with open('/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/hackathon/2025-AEC-Hackathon/json/GenericDesign_11001/11001.json', 'r') as file:
-    data_generic = json.load(file)
-spaces_generic = data_generic["spaces"]
-
-# =============================================================================
-# Create Graphs for the Reference Design and the Generic Design.
-# =============================================================================
-
-# Create a graph for the reference design.
-G_target_1 = nx.Graph()
-# Create a graph for the generic design.
-G_target_g = nx.Graph()
-
-# Define room types of interest for the reference design.
-ref_room_types = ["bathroom", "corridor", "kitchen"]
-
-# Add nodes to the reference graph based on the spaces.
-# Each node is identified by its room type and stores the centroid of its coordinates.
-for key in spaces:
-    space = spaces[key]
-    space_type = space["room_type"]
-    coordinates = space["coordinates"]
-    centroid = compute_centroid(coordinates)
-    if space_type in ref_room_types:
-        G_target_1.add_node(space_type, coordinates=centroid)
-
-# Add edges between the rooms in the reference design.
-G_target_1.add_edge("bathroom", "corridor")
-G_target_1.add_edge("corridor", "kitchen")
-G_target_1.add_edge("kitchen", "bathroom")
-
-# Compute and store distances for each edge in the reference graph.
-for u, v in G_target_1.edges():
-    coord_u = G_target_1.nodes[u]["coordinates"]
-    coord_v = G_target_1.nodes[v]["coordinates"]
-    dist = euclidean_distance(coord_u, coord_v)
-    G_target_1[u][v]["distance"] = dist
-
-# Visualize the reference design graph.
-nx.draw(G_target_1, with_labels=True, node_color='lightblue',
-        edge_color='gray', node_size=2500, font_size=10)
-plt.show()
-
-# Define room types of interest for the generic design.
-gen_room_types = ["bathroom", "corridor", "kitchen", "living room", "bedroom"]
-
-# Add nodes to the generic graph based on the spaces.
-for key in spaces_generic:
-    space = spaces_generic[key]
-    space_type = space["room_type"]
-    coordinates = space["coordinates"]
-    centroid = compute_centroid(coordinates)
-    if space_type in gen_room_types:
-        G_target_g.add_node(space_type, coordinates=centroid)
-
-# Add edges between selected rooms in the generic design.
-G_target_g.add_edge("bathroom", "corridor")
-G_target_g.add_edge("corridor", "kitchen")
-G_target_g.add_edge("kitchen", "bathroom")
-
-# Compute and store distances for each edge in the generic graph.
-for u, v in G_target_g.edges():
-    coord_u = G_target_g.nodes[u].get("coordinates")
-    coord_v = G_target_g.nodes[v].get("coordinates")
-    if coord_u is not None and coord_v is not None:
+def parse_arguments():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments with the reference JSON, generic JSON and output path.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build room subgraphs of a reference and a generic design and compare them."
+    )
+    parser.add_argument("reference_json", type=str, help="Path to the reference design JSON")
+    parser.add_argument("generic_json", type=str, help="Path to the generic design JSON")
+    parser.add_argument("--output", type=str, default="target01.graphml",
+                        help="Path of the GraphML file for the reference subgraph")
+    return parser.parse_args()
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    # -------------------------------------------------------------------------
+    # Load JSON data for both the reference and generic designs.
+    # -------------------------------------------------------------------------
+
+    args = parse_arguments()
+
+    # Load the reference design JSON.
+    data = load_design(args.reference_json)
+
+    # Load the generic design JSON.
+    data_generic = load_design(args.generic_json)
+
+    # -------------------------------------------------------------------------
+    # Create Graphs for the Reference Design and the Generic Design.
+    # -------------------------------------------------------------------------
+
+    # Create a graph for the reference design.
+    G_target_1 = nx.Graph()
+    # Create a graph for the generic design.
+    G_target_g = nx.Graph()
+
+    # Define room types of interest for the reference design.
+    ref_room_types = ["bathroom", "corridor", "kitchen"]
+
+    # Add nodes to the reference graph based on the spaces.
+    # Each node is identified by its room type and stores the centroid of its coordinates.
+    for _, space_type, _, coordinates in space_records(data):
+        centroid = compute_centroid(coordinates)
+        if space_type in ref_room_types:
+            G_target_1.add_node(space_type, coordinates=centroid)
+
+    # Add edges between the rooms in the reference design.
+    G_target_1.add_edge("bathroom", "corridor")
+    G_target_1.add_edge("corridor", "kitchen")
+    G_target_1.add_edge("kitchen", "bathroom")
+
+    # Compute and store distances for each edge in the reference graph.
+    for u, v in G_target_1.edges():
+        coord_u = G_target_1.nodes[u]["coordinates"]
+        coord_v = G_target_1.nodes[v]["coordinates"]
         dist = euclidean_distance(coord_u, coord_v)
-        G_target_g[u][v]["distance"] = dist
-
-# Visualize the generic design graph.
-nx.draw(G_target_g, with_labels=True, node_color='lightblue',
-        edge_color='gray', node_size=2500, font_size=10)
-plt.show()
-
-# =============================================================================
-# Compare the two graphs and save one of them.
-# =============================================================================
-
-# Compute the graph edit distance between the two graphs.
-ged = nx.graph_edit_distance(G_target_1, G_target_g)
-print("Graph edit distance between reference and generic designs:", ged)
-
-# Save the reference design graph as a GraphML file.
-nx.write_graphml(
-    G_target_1,
-    '/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/hackathon/2025-AEC-Hackathon/json/ReferenceDesign_01/target01.graphml'
-)
+        G_target_1[u][v]["distance"] = dist
+
+    # Visualize the reference design graph.
+    nx.draw(G_target_1, with_labels=True, node_color='lightblue',
+            edge_color='gray', node_size=2500, font_size=10)
+    plt.show()
+
+    # Define room types of interest for the generic design.
+    gen_room_types = ["bathroom", "corridor", "kitchen", "living room", "bedroom"]
+
+    # Add nodes to the generic graph based on the spaces.
+    for _, space_type, _, coordinates in space_records(data_generic):
+        centroid = compute_centroid(coordinates)
+        if space_type in gen_room_types:
+            G_target_g.add_node(space_type, coordinates=centroid)
+
+    # Add edges between selected rooms in the generic design.
+    G_target_g.add_edge("bathroom", "corridor")
+    G_target_g.add_edge("corridor", "kitchen")
+    G_target_g.add_edge("kitchen", "bathroom")
+
+    # Compute and store distances for each edge in the generic graph.
+    for u, v in G_target_g.edges():
+        coord_u = G_target_g.nodes[u].get("coordinates")
+        coord_v = G_target_g.nodes[v].get("coordinates")
+        if coord_u is not None and coord_v is not None:
+            dist = euclidean_distance(coord_u, coord_v)
+            G_target_g[u][v]["distance"] = dist
+
+    # Visualize the generic design graph.
+    nx.draw(G_target_g, with_labels=True, node_color='lightblue',
+            edge_color='gray', node_size=2500, font_size=10)
+    plt.show()
+
+    # -------------------------------------------------------------------------
+    # Compare the two graphs and save one of them.
+    # -------------------------------------------------------------------------
+
+    # Compute the graph edit distance between the two graphs.
+    with tracing.span("compare.graph_edit_distance"):
+        ged = nx.graph_edit_distance(G_target_1, G_target_g)
+    print("Graph edit distance between reference and generic designs:", ged)
+
+    # Save the reference design graph as a GraphML file.
+    nx.write_graphml(G_target_1, args.output)
+
+
+if __name__ == "__main__":
+    main()
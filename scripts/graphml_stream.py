@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from compact_plan import encode_labels
+
+
+GRAPHML_NS = "{http://graphml.graphdrawing.org/xmlns}"
+
+# Attributes of the *_bom_updated.graphml schema that are parsed into numeric
+# arrays instead of being kept as strings.
+POINT_KEYS = ("start_point", "end_point")
+OUTLINE_KEY = "coordinates"
+NUMERIC_TYPES = {"double", "float", "long", "int"}
+
+
+def parse_point(value) -> np.ndarray:
+    """
+    Parse a point into a length-3 array, NaN where a coordinate is missing or malformed.
+
+    Accepts the GraphML form "[x, y, z]" and the floorplan JSON form [x, y, z].
+    """
+    out = np.full(3, np.nan)
+    if value is None or (isinstance(value, str) and not value.strip("[] ")):
+        return out
+    parts = value.strip("[] ").split(",") if isinstance(value, str) else value
+    for k, part in enumerate(list(parts)[:3]):
+        try:
+            out[k] = float(part)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def parse_outline(value) -> np.ndarray:
+    """
+    Parse a room outline into an (n, 2) array, empty when missing or malformed.
+
+    Accepts the GraphML form "x,y;x,y;..." and the floorplan JSON form
+    [{"x": x, "y": y, ...}, ...].
+    """
+    if not value:
+        return np.zeros((0, 2))
+    try:
+        if isinstance(value, str):
+            points = [[float(c) for c in pt.split(",")[:2]] for pt in value.split(";") if pt]
+        else:
+            points = [[float(pt["x"]), float(pt["y"])] for pt in value]
+        return np.array(points, dtype=float).reshape(-1, 2)
+    except (KeyError, TypeError, ValueError):
+        return np.zeros((0, 2))
+
+
+class GraphArrays:
+    """
+    Typed, column-oriented graph read from a GraphML file.
+
+    Attributes:
+        node_ids (list): GraphML node ids; node i is node_ids[i].
+        labels (dict): Node string attribute -> (codes, categories); missing values are None.
+        numbers (dict): Node numeric attribute -> float64 array; missing values are NaN.
+        points (dict): "start_point"/"end_point" -> (n, 3) float64 array.
+        outline_offsets, outline_coords: Room outlines, node i owning
+            outline_coords[outline_offsets[i]:outline_offsets[i + 1]].
+        edge_src, edge_dst (np.ndarray): Node indices of each edge.
+        edge_labels (dict): Edge string attribute -> (codes, categories).
+        directed (bool): Whether the GraphML edgedefault is directed.
+    """
+
+    def __init__(self, node_ids, labels, numbers, points, outline_offsets, outline_coords,
+                 edge_src, edge_dst, edge_labels, directed=False):
+        self.node_ids = node_ids
+        self.labels = labels
+        self.numbers = numbers
+        self.points = points
+        self.outline_offsets = outline_offsets
+        self.outline_coords = outline_coords
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_labels = edge_labels
+        self.directed = directed
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def label(self, name: str, i: int):
+        codes, categories = self.labels[name]
+        return categories[codes[i]]
+
+    def nodes_where(self, name: str, value) -> np.ndarray:
+        """Indices of nodes whose string attribute `name` equals value."""
+        if name not in self.labels:
+            return np.zeros(0, dtype=np.int64)
+        codes, categories = self.labels[name]
+        if value not in categories:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(codes == categories.index(value))
+
+    def outline(self, i: int) -> np.ndarray:
+        return self.outline_coords[self.outline_offsets[i]:self.outline_offsets[i + 1]]
+
+    def to_networkx(self):
+        """
+        Build a networkx MultiGraph with the parsed attribute values.
+
+        Points and outlines are returned as lists of floats rather than the
+        original strings.
+        """
+        import networkx as nx
+
+        G = nx.MultiDiGraph() if self.directed else nx.MultiGraph()
+        for i, node in enumerate(self.node_ids):
+            attrs = {}
+            for name, (codes, categories) in self.labels.items():
+                if categories[codes[i]] is not None:
+                    attrs[name] = categories[codes[i]]
+            for name, values in self.numbers.items():
+                if not np.isnan(values[i]):
+                    attrs[name] = float(values[i])
+            for name, values in self.points.items():
+                if not np.isnan(values[i]).all():
+                    attrs[name] = values[i].tolist()
+            outline = self.outline(i)
+            if len(outline):
+                attrs[OUTLINE_KEY] = outline.tolist()
+            G.add_node(node, **attrs)
+
+        for e, (u, v) in enumerate(zip(self.edge_src, self.edge_dst)):
+            attrs = {}
+            for name, (codes, categories) in self.edge_labels.items():
+                if categories[codes[e]] is not None:
+                    attrs[name] = categories[codes[e]]
+            G.add_edge(self.node_ids[u], self.node_ids[v], **attrs)
+        return G
+
+
+def node_filter(types: Optional[Iterable[str]] = None,
+                apartment: Optional[str] = None) -> Optional[Callable[[dict], bool]]:
+    """
+    Build a node predicate for read_graphml_arrays.
+
+    Args:
+        types (Iterable[str]): Keep only nodes whose 'type' is in this set, e.g. {"room"}.
+        apartment (str): Keep only nodes of this apartment (their 'apartment'
+            attribute, or the 'name' of an apartment node).
+
+    Returns:
+        callable: Predicate on the raw attribute dict of a node, or None for no filter.
+    """
+    if types is None and apartment is None:
+        return None
+    types = set(types) if types is not None else None
+
+    def accept(attrs: dict) -> bool:
+        if types is not None and attrs.get("type") not in types:
+            return False
+        if apartment is not None:
+            name = attrs.get("name") if attrs.get("type") == "apartment" else attrs.get("apartment")
+            if name != apartment:
+                return False
+        return True
+
+    return accept
+
+
+def read_graphml_arrays(path: str, keep: Optional[Callable[[dict], bool]] = None) -> GraphArrays:
+    """
+    Stream a GraphML file into GraphArrays without building the DOM.
+
+    Elements are parsed with ElementTree.iterparse and discarded as soon as
+    they are consumed, so memory grows with the typed output arrays only.
+
+    Args:
+        path (str): GraphML file.
+        keep (callable): Optional node predicate (see node_filter). Edges are
+            kept only when both endpoints are kept.
+
+    Returns:
+        GraphArrays: The filtered graph.
+    """
+    keys: Dict[str, tuple] = {}
+    directed = False
+    graph_elem = None
+
+    index: Dict[str, int] = {}
+    rejected = set()
+    node_attrs: List[dict] = []
+    edges: List[tuple] = []
+    pending: List[tuple] = []
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag[len(GRAPHML_NS):] if elem.tag.startswith(GRAPHML_NS) else elem.tag
+        if event == "start":
+            if tag == "graph":
+                graph_elem = elem
+                directed = elem.get("edgedefault") == "directed"
+            continue
+
+        if tag == "key":
+            keys[elem.get("id")] = (elem.get("for"), elem.get("attr.name"), elem.get("attr.type"))
+        elif tag in ("node", "edge"):
+            attrs = {}
+            for data in elem:
+                if not data.tag.endswith("data"):
+                    continue
+                name = keys.get(data.get("key"), (None, data.get("key")))[1]
+                attrs[name] = data.text
+            if tag == "node":
+                node_id = elem.get("id")
+                if keep is None or keep(attrs):
+                    index[node_id] = len(node_attrs)
+                    node_attrs.append(attrs)
+                else:
+                    rejected.add(node_id)
+            else:
+                source, target = elem.get("source"), elem.get("target")
+                if source in index and target in index:
+                    edges.append((index[source], index[target], attrs))
+                elif source not in rejected and target not in rejected:
+                    pending.append((source, target, attrs))
+            # Drop the consumed element (and its siblings) from the partial tree.
+            if graph_elem is not None:
+                graph_elem.clear()
+
+    for source, target, attrs in pending:
+        if source in index and target in index:
+            edges.append((index[source], index[target], attrs))
+
+    return _build_arrays(list(index), node_attrs, edges, keys, directed)
+
+
+def _build_arrays(node_ids, node_attrs, edges, keys, directed) -> GraphArrays:
+    n = len(node_ids)
+    node_keys = {name: attr_type for kind, name, attr_type in keys.values() if kind in ("node", "all")}
+    edge_keys = {name for kind, name, _ in keys.values() if kind in ("edge", "all")}
+    # Attributes written without a <key> declaration are kept as strings.
+    for attrs in node_attrs:
+        for name in attrs:
+            node_keys.setdefault(name, "string")
+
+    labels, numbers, points = {}, {}, {}
+    for name, attr_type in node_keys.items():
+        values = [a.get(name) for a in node_attrs]
+        if name in POINT_KEYS:
+            points[name] = np.array([parse_point(v) for v in values]).reshape(n, 3)
+        elif name == OUTLINE_KEY:
+            continue
+        elif attr_type in NUMERIC_TYPES:
+            numbers[name] = np.array([float(v) if v is not None else np.nan for v in values])
+        else:
+            labels[name] = encode_labels(values)
+
+    outlines = [parse_outline(a.get(OUTLINE_KEY)) for a in node_attrs]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(o) for o in outlines], out=offsets[1:])
+    coords = np.vstack(outlines) if outlines else np.zeros((0, 2))
+
+    edge_src = np.fromiter((e[0] for e in edges), dtype=np.int64, count=len(edges))
+    edge_dst = np.fromiter((e[1] for e in edges), dtype=np.int64, count=len(edges))
+    edge_labels = {name: encode_labels([e[2].get(name) for e in edges]) for name in edge_keys}
+
+    return GraphArrays(node_ids, labels, numbers, points, offsets, coords,
+                       edge_src, edge_dst, edge_labels, directed)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Stream a GraphML floorplan graph into typed arrays and print a summary."
+    )
+    parser.add_argument("file_path", type=str, help="Path to the GraphML file")
+    parser.add_argument("--types", nargs="*", default=None, help="Keep only these node types, e.g. room")
+    parser.add_argument("--apartment", type=str, default=None, help="Keep only this apartment")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    graph = read_graphml_arrays(args.file_path, keep=node_filter(args.types, args.apartment))
+    elapsed = time.perf_counter() - start
+
+    print(f"{graph.num_nodes} nodes, {graph.num_edges} edges in {elapsed * 1e3:.1f} ms")
+    if "type" in graph.labels:
+        codes, categories = graph.labels["type"]
+        for code, count in enumerate(np.bincount(codes, minlength=len(categories))):
+            print(f"  {categories[code]}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+import networkx as nx
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+
+import tracing
+from graphml_stream import parse_outline, parse_point
+
+
+UNASSIGNED = "(unassigned)"
+UNATTACHED = "(unattached)"
+
+
+class HNode:
+    """
+    One node of the building -> apartment -> room -> panel hierarchy.
+
+    `values` are the numeric attributes aggregated over the subtree, `label`
+    is the room or panel type and `counts` the room types below apartments
+    and buildings. The signature hashes these and the children's signatures,
+    so equal subtrees (e.g. repeated apartments) compare equal in O(1).
+    Positions are not part of the signature, only sizes and types.
+    """
+
+    __slots__ = ("level", "key", "label", "values", "counts", "children", "signature", "size")
+
+    def __init__(self, level: str, key: str, label: Optional[str], values: List[float],
+                 counts: Optional[Counter] = None, children: Optional[List["HNode"]] = None):
+        self.level = level
+        self.key = key
+        self.label = label
+        self.values = np.asarray(values, dtype=float)
+        self.counts = counts or Counter()
+        self.children = children or []
+        self.size = 1 + sum(child.size for child in self.children)
+        digest = hashlib.sha1(repr((level, label, np.round(self.values, 6).tolist(),
+                                    sorted(self.counts.items()))).encode())
+        for signature in sorted(child.signature for child in self.children):
+            digest.update(signature)
+        self.signature = digest.digest()
+
+
+class Difference(NamedTuple):
+    level: str
+    a: Optional[str]   # key in the first hierarchy (None if only in the second)
+    b: Optional[str]
+    distance: float
+
+
+class HierarchyComparison(NamedTuple):
+    distance: float
+    differences: List[Difference]
+    visited: int       # node pairs compared
+
+
+def _panel_node(node: str, attrs: dict) -> HNode:
+    start, end = parse_point(attrs.get("start_point")), parse_point(attrs.get("end_point"))
+    length = float(np.hypot(*(end[:2] - start[:2])))
+    if np.isnan(length):
+        length = 0.0
+    return HNode("panel", str(node), (attrs.get("panel_type") or "").strip(),
+                 [length, float(attrs.get("height") or 0.0), float(attrs.get("thickness") or 0.0)])
+
+
+def _room_node(key: str, room_type: str, outline: np.ndarray, panels: List[HNode]) -> HNode:
+    if len(outline) >= 3:
+        x, y = outline[:, 0], outline[:, 1]
+        area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+        perimeter = float(np.linalg.norm(np.diff(outline, axis=0, append=outline[:1]), axis=1).sum())
+    else:
+        area = perimeter = 0.0
+    wall_length = sum(p.values[0] for p in panels)
+    return HNode("room", key, room_type, [area, perimeter, len(panels), wall_length], children=panels)
+
+
+def _group_node(level: str, key: str, children: List[HNode]) -> HNode:
+    counts = Counter()
+    for child in children:
+        if child.level == "room":
+            counts[child.label] += 1
+        else:
+            counts.update(child.counts)
+    area = sum(c.values[0] for c in children)
+    panels = sum(c.values[2] for c in children)
+    values = ([area, len(children), panels] if level == "apartment"
+              else [area, len(children), sum(counts.values()), panels])
+    return HNode(level, key, None, values, counts, children)
+
+
+@tracing.traced("hierarchy.build")
+def build_hierarchy(G: nx.Graph, name: str = "building") -> HNode:
+    """
+    Build the hierarchy from a room/panel graph (GraphML schema or pipeline.build_design_graph).
+
+    Rooms are grouped by their 'apartment' attribute (rooms without one, like
+    the core, go to '(unassigned)'); panels go under the room they belong to,
+    or under an '(unattached)' room of their apartment.
+    """
+    rooms = {n: d for n, d in G.nodes(data=True) if d.get("type") == "room"}
+    room_panels: Dict[str, List[HNode]] = {n: [] for n in rooms}
+    loose: Dict[str, List[HNode]] = {}
+    for node, attrs in G.nodes(data=True):
+        if attrs.get("type") != "wall":
+            continue
+        owner = next((n for n in G.neighbors(node) if n in rooms), None)
+        panel = _panel_node(node, attrs)
+        if owner is not None:
+            room_panels[owner].append(panel)
+        else:
+            loose.setdefault(attrs.get("apartment") or UNASSIGNED, []).append(panel)
+
+    apartments: Dict[str, List[HNode]] = {}
+    for node, attrs in rooms.items():
+        apartments.setdefault(attrs.get("apartment") or UNASSIGNED, []).append(
+            _room_node(str(node), attrs.get("room_type", ""), parse_outline(attrs.get("coordinates")),
+                       room_panels[node]))
+    for apartment, panels in loose.items():
+        apartments.setdefault(apartment, []).append(_room_node(f"{apartment}/{UNATTACHED}", UNATTACHED,
+                                                               np.zeros((0, 2)), panels))
+
+    return _group_node("building", name, [_group_node("apartment", key, children)
+                                          for key, children in apartments.items()])
+
+
+def _features(nodes: List[HNode], labels: Dict[str, int], types: Dict[str, int]):
+    values = np.stack([n.values for n in nodes])
+    codes = np.array([labels.setdefault(n.label, len(labels)) if n.label is not None else -1 for n in nodes])
+    counts = np.zeros((len(nodes), len(types)))
+    for i, node in enumerate(nodes):
+        for room_type, k in node.counts.items():
+            counts[i, types[room_type]] = k
+    return values, codes, counts
+
+
+def distance_matrix(a: List[HNode], b: List[HNode]) -> np.ndarray:
+    """
+    (len(a), len(b)) distances in [0, 1] between nodes of the same level.
+
+    Averages the relative difference of each numeric attribute, a type
+    mismatch (rooms, panels) and the L1 difference of the room type counts
+    (apartments, buildings), all computed by broadcasting.
+    """
+    types = {t: k for k, t in enumerate(dict.fromkeys(t for n in a + b for t in n.counts))}
+    labels: Dict[str, int] = {}
+    values_a, codes_a, counts_a = _features(a, labels, types)
+    values_b, codes_b, counts_b = _features(b, labels, types)
+
+    scale = np.maximum(np.maximum(np.abs(values_a)[:, None], np.abs(values_b)[None, :]), 1e-9)
+    total = (np.abs(values_a[:, None] - values_b[None, :]) / scale).sum(axis=2)
+    terms = values_a.shape[1]
+    if codes_a[0] >= 0:
+        total += codes_a[:, None] != codes_b[None, :]
+        terms += 1
+    if types:
+        sums = counts_a.sum(axis=1)[:, None] + counts_b.sum(axis=1)[None, :]
+        total += cdist(counts_a, counts_b, "cityblock") / np.maximum(sums, 1.0)
+        terms += 1
+    return total / terms
+
+
+def _match(a: List[HNode], b: List[HNode]):
+    """Pair children: equal signatures first, then the rest by linear assignment on distance_matrix."""
+    pairs, rest_a = [], []
+    by_signature: Dict[bytes, List[HNode]] = {}
+    for node in b:
+        by_signature.setdefault(node.signature, []).append(node)
+    for node in a:
+        same = by_signature.get(node.signature)
+        if same:
+            pairs.append((node, same.pop(), 0.0))
+        else:
+            rest_a.append(node)
+    rest_b = [node for nodes in by_signature.values() for node in nodes]
+    if rest_a and rest_b:
+        cost = distance_matrix(rest_a, rest_b)
+        rows, cols = linear_sum_assignment(cost)
+        pairs += [(rest_a[i], rest_b[j], None) for i, j in zip(rows, cols)]
+        matched_a, matched_b = set(rows), set(cols)
+        rest_a = [n for i, n in enumerate(rest_a) if i not in matched_a]
+        rest_b = [n for j, n in enumerate(rest_b) if j not in matched_b]
+    return pairs, rest_a, rest_b
+
+
+@tracing.traced("hierarchy.compare")
+def compare_hierarchies(a: HNode, b: HNode, threshold: float = 0.0) -> HierarchyComparison:
+    """
+    Compare two hierarchies coarse-to-fine.
+
+    Equal subtrees (same signature) cost nothing. Otherwise the aggregated
+    attributes of the two nodes are compared; only if they differ by more
+    than `threshold` are the children matched and compared in turn, and the
+    node's distance becomes the mean over its children, counting unmatched
+    children as 1. The work therefore grows with the size of the differing
+    subtrees, not with the size of the buildings.
+
+    Args:
+        a (HNode): First hierarchy (see build_hierarchy).
+        b (HNode): Second hierarchy.
+        threshold (float): Distance up to which a subtree is not descended into. With 0,
+            only equal subtrees are skipped; e.g. 0.05 gives a coarse answer that stops
+            at the first level whose aggregates are close.
+
+    Returns:
+        HierarchyComparison: Overall distance, the differences where the descent
+        stopped (largest first) and the number of node pairs compared.
+    """
+    differences: List[Difference] = []
+    visited = 0
+
+    def visit(x: HNode, y: HNode, distance: Optional[float]) -> float:
+        nonlocal visited
+        visited += 1
+        if x.signature == y.signature:
+            return 0.0
+        if distance is None:
+            distance = float(distance_matrix([x], [y])[0, 0])
+        if distance <= threshold or not (x.children or y.children):
+            differences.append(Difference(x.level, x.key, y.key, distance))
+            return distance
+        pairs, only_a, only_b = _match(x.children, y.children)
+        for node in only_a:
+            differences.append(Difference(node.level, node.key, None, 1.0))
+        for node in only_b:
+            differences.append(Difference(node.level, None, node.key, 1.0))
+        # Pairs matched by signature are equal; they are not visited at all.
+        total = sum(visit(p, q, d) for p, q, d in pairs if d != 0.0) + len(only_a) + len(only_b)
+        return total / max(len(x.children), len(y.children))
+
+    distance = visit(a, b, None)
+    differences = [d for d in differences if d.distance > 0]
+    differences.sort(key=lambda d: -d.distance)
+    return HierarchyComparison(distance, differences, visited)
+
+
+def load_hierarchy(path: str) -> HNode:
+    """Hierarchy of a GraphML file or of a floorplan JSON (through pipeline.build_design_graph)."""
+    if path.endswith(".graphml"):
+        return build_hierarchy(nx.read_graphml(path, force_multigraph=True), path)
+    from floorplan_io import load_design
+    from pipeline import build_design_graph
+
+    return build_hierarchy(build_design_graph(load_design(path)), path)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare two designs coarse-to-fine over a building/apartment/room/panel hierarchy."
+    )
+    parser.add_argument("file_path_1", type=str, help="First GraphML or floorplan JSON file")
+    parser.add_argument("file_path_2", type=str, help="Second GraphML or floorplan JSON file")
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="Subtrees differing by at most this much are not descended into")
+    parser.add_argument("--top", type=int, default=20, help="Number of differences to print")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    a, b = load_hierarchy(args.file_path_1), load_hierarchy(args.file_path_2)
+    start = time.perf_counter()
+    result = compare_hierarchies(a, b, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    for difference in result.differences[:args.top]:
+        print(f"{difference.level:<10} {str(difference.a):<24} {str(difference.b):<24} {difference.distance:.3f}")
+    print(f"Distance {result.distance:.4f}: {result.visited} node pairs compared "
+          f"out of {a.size} x {b.size} nodes, in {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
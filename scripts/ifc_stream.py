@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import re
+import time
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from floorplan_io import load_design
+
+
+WALL_TYPES = ("IFCWALL", "IFCWALLSTANDARDCASE")
+SPACE_TYPES = ("IFCSPACE",)
+
+
+class Ref(NamedTuple):
+    """Reference to another entity, '#42' in the file."""
+    id: int
+
+
+class Enum(str):
+    """Enumeration value such as .AREA. (stored without the dots)."""
+
+
+class Typed(NamedTuple):
+    """Typed parameter such as IFCPLANEANGLEMEASURE(0.0174)."""
+    type: str
+    args: list
+
+
+_X2 = re.compile(r"\\X2\\([0-9A-F]+)\\X0\\")
+
+
+def _decode_string(raw: str) -> str:
+    text = raw.replace("''", "'")
+    return _X2.sub(lambda m: bytes.fromhex(m.group(1)).decode("utf-16-be"), text)
+
+
+def parse_parameters(text: str) -> list:
+    """
+    Parse the parameter list of a STEP record, e.g. "(#8,#7,#6)" or "('a',$,(1.,2.))".
+
+    $ and * become None, #n becomes Ref(n), .X. becomes Enum("X"), nested lists
+    become lists and typed values become Typed(type, args).
+    """
+    pos = 0
+    n = len(text)
+
+    def value():
+        nonlocal pos
+        while text[pos] in " \t\r\n":
+            pos += 1
+        c = text[pos]
+        if c == "(":
+            pos += 1
+            items = []
+            while True:
+                while text[pos] in " \t\r\n,":
+                    pos += 1
+                if text[pos] == ")":
+                    pos += 1
+                    return items
+                items.append(value())
+        if c == "'":
+            end = pos + 1
+            while True:
+                end = text.index("'", end)
+                if end + 1 < n and text[end + 1] == "'":
+                    end += 2
+                    continue
+                break
+            raw, pos = text[pos + 1:end], end + 1
+            return _decode_string(raw)
+        if c == "#":
+            end = pos + 1
+            while end < n and text[end].isdigit():
+                end += 1
+            ref, pos = Ref(int(text[pos + 1:end])), end
+            return ref
+        if c in "$*":
+            pos += 1
+            return None
+        if c == ".":
+            end = text.index(".", pos + 1)
+            enum, pos = Enum(text[pos + 1:end]), end + 1
+            return enum
+        end = pos
+        while end < n and text[end] not in ",()":
+            end += 1
+        token, pos = text[pos:end].strip(), end
+        if end < n and text[end] == "(":
+            return Typed(token.upper(), value())
+        try:
+            return int(token)
+        except ValueError:
+            return float(token)
+
+    return value()
+
+
+class StepIndex:
+    """
+    Byte-offset index of the entities of a STEP/IFC file.
+
+    The file is scanned once, line by line, to record where each '#id=TYPE(...);'
+    record starts and how long it is. Records are parsed on demand by seeking to
+    them, so memory grows with the number of entities (three integers each), not
+    with the size of the model.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self._file = open(path, "rb")
+        self.type_names: List[str] = []
+        ids, offsets, lengths, type_codes = array("q"), array("q"), array("l"), array("l")
+        type_lookup: Dict[str, int] = {}
+
+        start, in_string, in_data = None, False, False
+        offset = 0
+        for line in self._file:
+            line_start, offset = offset, offset + len(line)
+            if not in_data:
+                in_data = line.strip() == b"DATA;"
+                continue
+            if start is None:
+                stripped = line.lstrip()
+                if not stripped.startswith(b"#"):
+                    if stripped.startswith(b"ENDSEC;"):
+                        break
+                    continue
+                start = line_start + len(line) - len(stripped)
+            # '' escapes keep the quote parity, so counting quotes tracks strings.
+            in_string ^= line.count(b"'") % 2 == 1
+            if in_string or not line.rstrip().endswith(b";"):
+                continue
+
+            self._file.seek(start)
+            head = self._file.read(min(offset - start, 128)).decode("ascii", "replace")
+            self._file.seek(offset)
+            match = re.match(r"#(\d+)\s*=\s*([A-Za-z0-9_]+)", head)
+            if match:
+                name = match.group(2).upper()
+                code = type_lookup.get(name)
+                if code is None:
+                    code = type_lookup[name] = len(self.type_names)
+                    self.type_names.append(name)
+                ids.append(int(match.group(1)))
+                offsets.append(start)
+                lengths.append(offset - start)
+                type_codes.append(code)
+            start = None
+
+        order = np.argsort(np.frombuffer(ids, dtype=np.int64), kind="stable")
+        self.ids = np.frombuffer(ids, dtype=np.int64)[order]
+        self.offsets = np.frombuffer(offsets, dtype=np.int64)[order]
+        self.lengths = np.asarray(lengths, dtype=np.int64)[order]
+        self.type_codes = np.asarray(type_codes, dtype=np.int32)[order]
+        self._cached = lru_cache(maxsize=cache_size)(self._read)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, entity_id: int) -> int:
+        row = int(np.searchsorted(self.ids, entity_id))
+        if row == len(self.ids) or self.ids[row] != entity_id:
+            raise KeyError(f"#{entity_id} is not defined in {self.path}")
+        return row
+
+    def _read(self, entity_id: int) -> tuple:
+        row = self._row(entity_id)
+        self._file.seek(int(self.offsets[row]))
+        record = self._file.read(int(self.lengths[row])).decode("utf-8", "replace").strip()
+        body = record[record.index("(", record.index("=")):record.rindex(")") + 1]
+        return self.type_names[self.type_codes[row]], parse_parameters(body)
+
+    def type_of(self, entity_id: int) -> str:
+        return self.type_names[self.type_codes[self._row(entity_id)]]
+
+    def get(self, ref) -> tuple:
+        """
+        Return (TYPE, parameters) of an entity.
+
+        Args:
+            ref (Ref | int): Entity reference or id.
+        """
+        return self._cached(ref.id if isinstance(ref, Ref) else int(ref))
+
+    def ids_of_type(self, *type_names: str) -> np.ndarray:
+        """Ids of all entities of the given types, in file id order."""
+        codes = [self.type_names.index(t) for t in type_names if t in self.type_names]
+        return self.ids[np.isin(self.type_codes, codes)]
+
+
+def _axis_placement(index: StepIndex, ref) -> np.ndarray:
+    """4x4 matrix of an IFCAXIS2PLACEMENT3D (or 2D) entity."""
+    matrix = np.eye(4)
+    if ref is None:
+        return matrix
+    location, axis, ref_direction = (index.get(ref)[1] + [None, None])[:3]
+    origin = index.get(location)[1][0]
+    matrix[:len(origin), 3] = origin
+
+    z = np.array(index.get(axis)[1][0], dtype=float) if axis is not None else np.array([0., 0., 1.])
+    x = (np.array(index.get(ref_direction)[1][0], dtype=float)
+         if ref_direction is not None else np.array([1., 0., 0.]))
+    z = np.pad(z, (0, 3 - len(z)), constant_values=0) if len(z) < 3 else z
+    x = np.pad(x, (0, 3 - len(x))) if len(x) < 3 else x
+    z /= np.linalg.norm(z)
+    x = x - np.dot(x, z) * z
+    x /= np.linalg.norm(x)
+    matrix[:3, 0], matrix[:3, 1], matrix[:3, 2] = x, np.cross(z, x), z
+    return matrix
+
+
+class IfcModel:
+    """
+    Walls and spaces of an IFC file, resolved to world coordinates.
+
+    Only the entities a wall or space references are ever parsed; local
+    placements are resolved once and reused by every element that shares them.
+    """
+
+    def __init__(self, index: StepIndex):
+        self.index = index
+        self._placements: Dict[int, np.ndarray] = {}
+
+    def placement(self, ref) -> np.ndarray:
+        """World matrix of an IFCLOCALPLACEMENT, following PlacementRelTo."""
+        if ref is None:
+            return np.eye(4)
+        if ref.id not in self._placements:
+            entity_type, args = self.index.get(ref)
+            if entity_type != "IFCLOCALPLACEMENT":
+                # The reconstruction export points PlacementRelTo at the storey
+                # itself rather than at its placement; follow the product's own.
+                matrix = self.placement(args[5]) if len(args) > 5 else np.eye(4)
+            else:
+                matrix = self.placement(args[0]) @ _axis_placement(self.index, args[1])
+            self._placements[ref.id] = matrix
+        return self._placements[ref.id]
+
+    def _extrusions(self, representation) -> Iterator[list]:
+        if representation is None:
+            return
+        for shape in self.index.get(representation)[1][2] or []:
+            for item in self.index.get(shape)[1][3] or []:
+                if self.index.type_of(item.id) == "IFCEXTRUDEDAREASOLID":
+                    yield self.index.get(item)[1]
+
+    def _profile_points(self, profile) -> Optional[np.ndarray]:
+        profile_type, args = self.index.get(profile)
+        if profile_type == "IFCARBITRARYCLOSEDPROFILEDEF":
+            curve_type, curve_args = self.index.get(args[2])
+            if curve_type != "IFCPOLYLINE":
+                return None
+            points = [self.index.get(p)[1][0] for p in curve_args[0]]
+            return np.array([list(p[:2]) + [0.0] * (2 - len(p[:2])) for p in points], dtype=float)
+        if profile_type == "IFCRECTANGLEPROFILEDEF":
+            dx, dy = args[3] / 2, args[4] / 2
+            corners = np.array([[-dx, -dy, 0, 1], [dx, -dy, 0, 1], [dx, dy, 0, 1], [-dx, dy, 0, 1]])
+            corners = (_axis_placement(self.index, args[2]) @ corners.T).T
+            return np.vstack([corners[:, :2], corners[:1, :2]])
+        return None
+
+    def footprint(self, element_args: list) -> tuple:
+        """
+        Plan footprint and height of a wall or space.
+
+        Returns:
+            tuple: ((n, 2) world outline or None, extrusion height, local origin in world x/y).
+        """
+        world = self.placement(element_args[5])
+        origin = world[:2, 3]
+        for profile, position, direction, depth in self._extrusions(element_args[6]):
+            points = self._profile_points(profile)
+            if points is None:
+                continue
+            local = world @ _axis_placement(self.index, position)
+            homogeneous = np.c_[points, np.zeros(len(points)), np.ones(len(points))]
+            outline = (local @ homogeneous.T).T[:, :2]
+            dz = np.array(self.index.get(direction)[1][0], dtype=float)
+            height = float(depth) * abs((local[:3, :3] @ np.pad(dz, (0, 3 - len(dz))))[2])
+            return outline, height, origin
+        return None, 0.0, origin
+
+    def walls(self) -> Iterator[dict]:
+        """
+        Yield one record per IfcWall/IfcWallStandardCase.
+
+        The wall axis runs along the long side of the footprint's minimum
+        rotated rectangle, starting at the end nearest the wall's placement
+        origin; the short side is the thickness.
+        """
+        for entity_id in self.index.ids_of_type(*WALL_TYPES):
+            args = self.index.get(int(entity_id))[1]
+            outline, height, origin = self.footprint(args)
+            if outline is None or len(outline) < 3:
+                continue
+            rect = np.array(Polygon(outline).minimum_rotated_rectangle.exterior.coords)[:4]
+            edges = np.roll(rect, -1, axis=0) - rect
+            lengths = np.hypot(edges[:, 0], edges[:, 1])
+            short = int(np.argmin(lengths[:2]))
+            ends = np.array([rect[short] + edges[short] / 2, rect[short + 2] + edges[short + 2] / 2])
+            if np.linalg.norm(ends[1] - origin) < np.linalg.norm(ends[0] - origin):
+                ends = ends[::-1]
+            yield {
+                "global_id": args[0],
+                "name": args[2] or "",
+                "start": ends[0],
+                "end": ends[1],
+                "height": height,
+                "thickness": float(lengths[short]),
+            }
+
+    def spaces(self) -> Iterator[dict]:
+        """Yield one record per IfcSpace with its world outline."""
+        for entity_id in self.index.ids_of_type(*SPACE_TYPES):
+            args = self.index.get(int(entity_id))[1]
+            outline, _, _ = self.footprint(args)
+            if outline is None:
+                continue
+            yield {
+                "global_id": args[0],
+                "name": args[2] or "",
+                "long_name": args[7] if len(args) > 7 else None,
+                "outline": outline,
+            }
+
+
+def _split_wall_name(name: str) -> tuple:
+    """'Wall 0 | WAL_21_CNI_REN' -> ('0', 'WAL_21_CNI_REN')."""
+    label, _, panel_type = name.partition("|")
+    label = label.strip()
+    if label.lower().startswith("wall "):
+        label = label[5:].strip()
+    return label, panel_type.strip()
+
+
+def to_floorplan_dict(model: IfcModel, ndigits: int = 6) -> dict:
+    """
+    Map IFC walls and spaces onto the floorplan JSON layout ('panels' and 'spaces').
+
+    Walls named 'Wall <panel id> | <type>' (as written by the reconstruction
+    export) keep their panel id; other walls are keyed by GlobalId. Rooms and
+    apartments are not stored in the IFC and are left empty.
+    """
+    items = {}
+    for wall in model.walls():
+        panel_id, panel_type = _split_wall_name(wall["name"])
+        items[panel_id or wall["global_id"]] = {
+            "panel_type": panel_type,
+            "start_point": [round(float(v), ndigits) for v in wall["start"]] + [0],
+            "end_point": [round(float(v), ndigits) for v in wall["end"]] + [0],
+            "height": round(wall["height"], ndigits),
+            "thickness": round(wall["thickness"], ndigits),
+            "room": None,
+            "apartment": None,
+        }
+
+    spaces = {}
+    for space in model.spaces():
+        spaces[space["name"] or space["global_id"]] = {
+            "room_type": space["long_name"] or space["name"],
+            "coordinates": [{"x": round(float(x), ndigits), "y": round(float(y), ndigits), "z": 0}
+                            for x, y in space["outline"]],
+        }
+    return {"panels": {"attributes": {}, "items": items}, "spaces": spaces}
+
+
+def check_against_design(model: IfcModel, design, tolerance: float = 1e-3) -> List[str]:
+    """
+    Compare the walls of an IFC model with the panels of a floorplan Design.
+
+    Walls are matched to panels by id. A panel matches when its endpoints
+    agree (in either direction) and its height and thickness agree within tolerance.
+
+    Returns:
+        list: Human-readable mismatch messages; empty when the two agree.
+    """
+    panels = design.panels
+    rows = {panel_id: i for i, panel_id in enumerate(panels.ids)}
+    problems, seen = [], set()
+    for wall in model.walls():
+        panel_id, _ = _split_wall_name(wall["name"])
+        i = rows.get(panel_id)
+        if i is None:
+            problems.append(f"IFC wall '{wall['name']}' has no panel in the JSON")
+            continue
+        seen.add(panel_id)
+        start, end = panels.start[i, :2], panels.end[i, :2]
+        forward = max(np.abs(wall["start"] - start).max(), np.abs(wall["end"] - end).max())
+        backward = max(np.abs(wall["start"] - end).max(), np.abs(wall["end"] - start).max())
+        if min(forward, backward) > tolerance:
+            problems.append(f"Panel {panel_id}: endpoints differ by {min(forward, backward):.4f}")
+        if abs(wall["height"] - panels.height[i]) > tolerance:
+            problems.append(f"Panel {panel_id}: height {wall['height']:.3f} != {panels.height[i]:.3f}")
+        if abs(wall["thickness"] - panels.thickness[i]) > tolerance:
+            problems.append(f"Panel {panel_id}: thickness {wall['thickness']:.3f} "
+                            f"!= {panels.thickness[i]:.3f}")
+    for panel_id in panels.ids:
+        if panel_id not in seen:
+            problems.append(f"Panel {panel_id} has no wall in the IFC file")
+    return problems
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Stream walls and spaces out of an IFC file and map them onto the floorplan JSON."
+    )
+    parser.add_argument("ifc_path", type=str, help="Path to the IFC file")
+    parser.add_argument("--check", type=str, default=None,
+                        help="Floorplan JSON to cross-check the IFC walls against")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write the walls and spaces as floorplan JSON to this path")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    with StepIndex(args.ifc_path) as index:
+        model = IfcModel(index)
+        data = to_floorplan_dict(model)
+        elapsed = time.perf_counter() - start
+        print(f"{len(index)} entities, {len(data['panels']['items'])} walls, "
+              f"{len(data['spaces'])} spaces in {elapsed * 1e3:.1f} ms")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(data, f, indent=4)
+            print(f"Floorplan JSON saved to {args.output}")
+
+        if args.check:
+            problems = check_against_design(model, load_design(args.check), args.tolerance)
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} mismatches against {args.check}")
+
+
+if __name__ == "__main__":
+    main()
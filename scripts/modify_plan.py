@@ -2,11 +2,14 @@ import numpy as np
 from shapely.geometry import Polygon, box
 from shapely import affinity
 from typing import Dict, List, Any
-import matplotlib.pyplot as plt
-from descartes import PolygonPatch
+import argparse
 import json
 from shapely.geometry import Polygon, MultiPolygon
 from shapely.ops import unary_union
+import tracing
+from edit_log import EditLog
+from compact_plan import SpaceTable
+from floorplan_io import Design, load_design
 
 
 def compute_spaces_convex_hull_ratio(data, buffer_distance=0.001):
@@ -50,7 +53,8 @@ def compute_spaces_convex_hull_ratio(data, buffer_distance=0.001):
 
     try:
         # Create unified geometry
-        combined = unary_union(valid_polygons)
+        with tracing.span("unary_union", polygons=len(valid_polygons)):
+            combined = unary_union(valid_polygons)
         hull = combined.convex_hull
         
         if hull.is_empty:
@@ -78,18 +82,51 @@ class CorridorPrefab(PrefabPart):
         self.max_width = max_width
 
 class Room:
+    # Slots instead of a per-instance dict; the outline is kept as an (n, 2)
+    # array (usually a view into a SpaceTable buffer) and the shapely polygon
+    # is only built the first time .geometry is read.
+    __slots__ = ('id', 'type', 'apartment', 'prefab', '_coords', '_geometry')
+
     def __init__(self, room_id: str, data: Dict[str, Any]):
         self.id = room_id
         self.type = data['room_type']
         self.apartment = data['apartment']
-        self.geometry = self._create_geometry(data['coordinates'])
-        
-    def _create_geometry(self, coordinates: List[Dict]) -> Polygon:
-        # Convert JSON coordinates to Shapely Polygon
-        points = [(float(pt['x']), float(pt['y'])) for pt in coordinates]
-        return Polygon(points).buffer(0)  # Clean geometry
+        self.prefab = None
+        self._coords = self._create_coords(data['coordinates'])
+        self._geometry = None
+
+    @classmethod
+    def from_table(cls, table: SpaceTable, index: int) -> 'Room':
+        """Create a room backed by row `index` of a SpaceTable without copying coordinates"""
+        room = cls.__new__(cls)
+        room.id = table.ids[index]
+        room.type = table.room_type(index)
+        room.apartment = table.apartment(index)
+        room.prefab = None
+        room._coords = table.outline(index)
+        room._geometry = None
+        return room
+
+    @property
+    def geometry(self) -> Polygon:
+        if self._geometry is None:
+            self._geometry = self._create_geometry(self._coords)
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, value: Polygon):
+        self._geometry = value
+
+    def _create_coords(self, coordinates: List[Dict]) -> np.ndarray:
+        # Convert JSON coordinates to an (n, 2) array
+        return np.array([(float(pt['x']), float(pt['y'])) for pt in coordinates], dtype=float)
+
+    def _create_geometry(self, coords: np.ndarray) -> Polygon:
+        return Polygon(coords).buffer(0)  # Clean geometry
 
 class Apartment:
+    __slots__ = ('name', 'rooms')
+
     def __init__(self, name: str, rooms: List[Room]):
         self.name = name
         self.rooms = rooms
@@ -114,14 +151,18 @@ class PrefabPart:
         self.geometry = geometry
         self.max_area = max_area
 class PrefabOptimizer:
-    def __init__(self, prefabs: List[PrefabPart]):
+    def __init__(self, prefabs: List[PrefabPart], edit_log: EditLog = None):
         self.prefabs = {p.type: p for p in prefabs}
+        # Geometry changes and prefab assignments go through the log so search
+        # code can take a savepoint and roll back instead of copying apartments.
+        self.edit_log = edit_log if edit_log is not None else EditLog()
         self.relevant_types = set(self.prefabs.keys())
         self.placement_strategies = {
             'corridor': self._fit_corridor,
             'default': self._fit_standard_room
         }
 
+    @tracing.traced("optimize.hull_ratio")
     def _calculate_hull_ratio(self, apartment: Apartment) -> float:
         """Calculate convex hull ratio for relevant rooms in apartment"""
         relevant_rooms = [r for r in apartment.rooms 
@@ -139,7 +180,8 @@ class PrefabOptimizer:
             return 0.0
             
         try:
-            combined = unary_union(valid_polys)
+            with tracing.span("unary_union", polygons=len(valid_polys)):
+                combined = unary_union(valid_polys)
             hull = combined.convex_hull
             return total_area / hull.area if hull.area > 0 else 0.0
         except:
@@ -159,7 +201,8 @@ class PrefabOptimizer:
                 print(f"Skipping - below threshold {hull_ratio_threshold}")
                 continue
                 
-            self._optimize_apartment(apartment, iou_threshold)
+            with tracing.span("optimize.apartment", apartment=apartment.name):
+                self._optimize_apartment(apartment, iou_threshold)
 
     def _optimize_apartment(self, apartment: Apartment, iou_threshold: float):
         """Coordinate optimization for all relevant room types"""
@@ -191,7 +234,8 @@ class PrefabOptimizer:
         """Attempt multiple fitting strategies"""
         strategy = self.placement_strategies.get(prefab.type, 
                      self.placement_strategies['default'])
-        return strategy(room, prefab)
+        with tracing.span(f"optimize.{strategy.__name__.lstrip('_')}", room=room.id):
+            return strategy(room, prefab)
 
     def _fit_standard_room(self, room: Room, prefab: PrefabPart) -> bool:
         """Standard fitting process for most room types"""
@@ -205,7 +249,7 @@ class PrefabOptimizer:
         for strategy in strategies:
             candidate = strategy()
             if original.contains(candidate):
-                room.geometry = candidate
+                self._apply_fit(room, candidate, prefab)
                 return True
         return False
 
@@ -215,10 +259,15 @@ class PrefabOptimizer:
         scaled = self._scale_corridor(room.geometry, aligned)
         
         if room.geometry.contains(scaled):
-            room.geometry = scaled
+            self._apply_fit(room, scaled, prefab)
             return True
         return False
 
+    def _apply_fit(self, room: Room, geometry: Polygon, prefab: PrefabPart):
+        """Record a fitted geometry and its prefab in the edit log"""
+        self.edit_log.set(room, 'geometry', geometry)
+        self.edit_log.set(room, 'prefab', prefab)
+
     def _scaled_prefab(self, room_poly: Polygon, prefab: PrefabPart) -> Polygon:
         """Create safely scaled prefab"""
         scale = min(
@@ -253,14 +302,35 @@ class PrefabOptimizer:
 
     def load_from_json(self, json_path: str) -> List[Apartment]:
         """Load and validate apartment data from JSON"""
-        with open(json_path) as f:
-            data = json.load(f)
-            
+        try:
+            design = load_design(json_path)
+        except (KeyError, TypeError, ValueError) as e:
+            # A malformed space breaks the columnar load; go room by room so only it is skipped.
+            print(f"Loading {json_path} room by room: {e}")
+            with open(json_path) as f:
+                data = json.load(f)
+
+            apartments = {}
+            for room_id, room_data in data.get('spaces', {}).items():
+                if self._valid_room(room_data):
+                    self._add_to_apartments(apartments, room_id, room_data)
+
+            return [Apartment(name, rooms) for name, rooms in apartments.items()]
+        return self.load_from_design(design)
+
+    def load_from_design(self, design: Design) -> List[Apartment]:
+        """Build apartments from the spaces of an already loaded design"""
+        tracing.count("geometry.rooms", len(design.spaces))
+        table = design.spaces
+        valid_counts = table.vertex_counts() >= 3
+
         apartments = {}
-        for room_id, room_data in data.get('spaces', {}).items():
-            if self._valid_room(room_data):
-                self._add_to_apartments(apartments, room_id, room_data)
-                
+        for i in range(len(table)):
+            apt_name = table.apartment(i)
+            if apt_name in [None, 'UNASSIGNED'] or not valid_counts[i]:
+                continue
+            apartments.setdefault(apt_name, []).append(Room.from_table(table, i))
+
         return [Apartment(name, rooms) for name, rooms in apartments.items()]
 
     def _valid_room(self, data: dict) -> bool:
@@ -274,10 +344,22 @@ class PrefabOptimizer:
         if apt_name not in apartments:
             apartments[apt_name] = []
         try:
-            apartments[apt_name].append(Room(room_id, data))
+            room = Room(room_id, data)
+            room.geometry  # built now so a bad outline is reported here, not mid-optimization
+            apartments[apt_name].append(room)
         except Exception as e:
             print(f"Invalid room {room_id}: {str(e)}")
 
+    def assign_prefabs(self, apartments: List[Apartment], prefabs: Dict[str, PrefabPart]) -> int:
+        """Assign prefabs to rooms by room id (e.g. from correspondence.reference_prefabs) through the edit log"""
+        assigned = 0
+        for apartment in apartments:
+            for room in apartment.rooms:
+                if room.id in prefabs:
+                    self.edit_log.set(room, 'prefab', prefabs[room.id])
+                    assigned += 1
+        return assigned
+
 
 def fit_prefabricated(apartments: List[Apartment], prefabs: List[PrefabPart], iou_threshold=0.7):
     # Track used prefab area per type
@@ -382,24 +464,27 @@ def apply_prefab(apt: Apartment, prefab: PrefabPart, target_room: Polygon):
 
 
 
+ROOM_COLORS = {
+    'bathroom': '#a6cee3',
+    'kitchen': '#fdbf6f',
+    'corridor': '#cccccc',
+    'living_room': '#b2df8a',
+    'bedroom': '#cab2d6',
+    'core': '#ff0000'
+}
+
+
 def draw_floorplan(apartment: Apartment, title="Floor Plan"):
     """
     Draw the floorplan of an apartment, flipping the geometry along the x-axis
     so that the drawing appears upside down.
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(10, 10))
     ax.set_title(title)
     ax.set_aspect('equal')
     
-    colors = {
-        'bathroom': '#a6cee3',
-        'kitchen': '#fdbf6f',
-        'corridor': '#cccccc',
-        'living_room': '#b2df8a',
-        'bedroom': '#cab2d6',
-        'core': '#ff0000'
-    }
-    
     for room_type, geometries in apartment.floorplan.items():
         for i, geometry in enumerate(geometries):
             # Clean and validate geometry
@@ -417,7 +502,7 @@ def draw_floorplan(apartment: Apartment, title="Floor Plan"):
             
             try:
                 x, y = flipped_geom.exterior.xy
-                color = colors.get(room_type, '#888888')
+                color = ROOM_COLORS.get(room_type, '#888888')
                 ax.fill(x, y, fc=color, ec='black', alpha=0.7, label=room_type)
                 
                 centroid = flipped_geom.centroid
@@ -429,8 +514,17 @@ def draw_floorplan(apartment: Apartment, title="Floor Plan"):
                 continue
     
     plt.show()
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Fit kit-of-parts prefabs into the apartments of a floorplan."
+    )
+    parser.add_argument("json_path", type=str, help="Path to the floorplan JSON file")
+    return parser.parse_args()
+
+
 # Example usage
 if __name__ == "__main__":
+    args = parse_arguments()
 
     """
     # Sample prefabs
@@ -479,7 +573,7 @@ if __name__ == "__main__":
     optimizer = PrefabOptimizer([bathroom_prefab, kitchen_prefab, corridor_prefab])
     
     # Load apartments from JSON
-    apartments = optimizer.load_from_json("/Users/diego/Desktop/Escritorio_MacBook_Pro_de_Diego/hackathon/2025-AEC-Hackathon/json/GenericDesign_14012/14012.json")
+    apartments = optimizer.load_from_json(args.json_path)
     
     # Run optimization
     optimizer.optimize(apartments,
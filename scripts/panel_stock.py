@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import os
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import tracing
+from floorplan_io import Design, find_design_files, load_design
+
+
+# Stock panel lengths in metres used when no stock file is given.
+DEFAULT_STOCK_LENGTHS = (2.4, 3.0, 3.6, 4.2, 4.8, 6.0)
+
+
+class StockPanel(NamedTuple):
+    sku: str
+    length: float
+    thickness: Optional[float] = None     # None: available for every thickness
+    panel_types: Tuple[str, ...] = ()     # empty: available for every panel type
+
+
+class CuttingPlan(NamedTuple):
+    """Cutting plan of one group of panels, lengths in millimetres."""
+
+    patterns: Tuple[Tuple[int, Tuple[int, ...], int], ...]   # (stock length, pieces cut from it, times)
+    stock_used: int        # total length of the stock panels used
+    demand: int            # total length of the pieces
+    lower_bound: float     # lower bound on stock_used (LP with Farley's bound)
+    columns: int           # patterns generated by the LP
+
+    @property
+    def waste(self) -> int:
+        return self.stock_used - self.demand
+
+    def counts(self) -> Counter:
+        """Stock length -> number of stock panels used."""
+        counts = Counter()
+        for stock, _, times in self.patterns:
+            counts[stock] += times
+        return counts
+
+
+def load_stock(path: str) -> List[StockPanel]:
+    """
+    Load stock panels from JSON.
+
+    The file holds either a list of entries or an object with a "panels" list;
+    an entry has a "length" in metres and optionally "sku", "thickness" and
+    "panel_types" to restrict which panels it may be used for.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("panels", [])
+    return [StockPanel(str(entry.get("sku", f"PNL_{float(entry['length']):g}")), float(entry["length"]),
+                       float(entry["thickness"]) if entry.get("thickness") is not None else None,
+                       tuple(entry.get("panel_types", ())))
+            for entry in data]
+
+
+def _knapsack(weights: np.ndarray, values: np.ndarray, capacity: int):
+    """
+    Unbounded knapsack over integer weights, by DP on capacity.
+
+    Each item is split into binary multiples (1, 2, 4, ... copies) and every
+    multiple is a 0/1 item applied to the whole capacity array at once.
+
+    Returns:
+        tuple: (best (capacity + 1,) best value within each capacity, a function
+                that returns the item counts of the best packing for a capacity).
+    """
+    parts = []
+    for i, (w, v) in enumerate(zip(weights, values)):
+        if v <= 0 or w > capacity:
+            continue
+        copies, k = capacity // w, 1
+        while copies > 0:
+            take = min(k, copies)
+            parts.append((i, take, take * w, take * v))
+            copies -= take
+            k *= 2
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(parts), capacity + 1), dtype=bool)
+    for j, (_, _, w, v) in enumerate(parts):
+        candidate = best[:-w] + v
+        better = candidate > best[w:] + 1e-12
+        taken[j, w:] = better
+        best[w:] = np.where(better, candidate, best[w:])
+
+    def packing(c: int) -> np.ndarray:
+        counts = np.zeros(len(weights), dtype=np.int64)
+        for j in range(len(parts) - 1, -1, -1):
+            if taken[j, c]:
+                i, take, w, _ = parts[j]
+                counts[i] += take
+                c -= w
+        return counts
+
+    return best, packing
+
+
+def _first_fit_decreasing(lengths: np.ndarray, demand: np.ndarray, stocks: Tuple[int, ...]) -> List[tuple]:
+    """Pack pieces into the longest stock first-fit decreasing, then shrink each bin to the shortest stock that holds it."""
+    longest = stocks[-1]
+    bins: List[List[int]] = []
+    free = np.empty(int(demand.sum()), dtype=np.int64)
+    for i in np.argsort(-lengths, kind="stable"):
+        for _ in range(int(demand[i])):
+            fits = free[:len(bins)] >= lengths[i]
+            b = int(fits.argmax()) if len(bins) else 0
+            if not len(bins) or not fits[b]:
+                b = len(bins)
+                bins.append([])
+                free[b] = longest
+            bins[b].append(i)
+            free[b] -= lengths[i]
+    packed = []
+    for b, items in enumerate(bins):
+        used = longest - free[b]
+        packed.append((next(s for s in stocks if s >= used), tuple(sorted(items))))
+    return packed
+
+
+@lru_cache(maxsize=4096)
+def solve_cutting_stock(demand: Tuple[Tuple[int, int], ...], stocks: Tuple[int, ...],
+                        kerf: int = 0, max_iterations: int = 200, tolerance: float = 1e-3) -> CuttingPlan:
+    """
+    1D cutting stock with several stock lengths, by column generation.
+
+    The LP "cover every demand with the least total stock length" is solved
+    over a growing set of cutting patterns; each round prices new patterns
+    with one knapsack DP whose capacity array covers every stock length. The
+    LP solution is rounded down and the remaining pieces are packed first-fit
+    decreasing (or plain first-fit decreasing is kept if it uses less stock). Results are cached, so identical groups (e.g. repeated
+    apartments or buildings) are solved once.
+
+    Args:
+        demand (tuple): Sorted (piece length, count) pairs, in integer units (mm).
+        stocks (tuple): Sorted stock lengths in the same units.
+        kerf (int): Material lost per cut; added to every piece and to each stock.
+        max_iterations (int): Cap on column generation rounds.
+        tolerance (float): Stop once the LP is within this fraction of its lower bound.
+
+    Returns:
+        CuttingPlan: Patterns and totals (piece lengths without kerf).
+    """
+    from scipy.optimize import linprog
+
+    lengths = np.array([length for length, _ in demand], dtype=np.int64)
+    counts = np.array([count for _, count in demand], dtype=np.int64)
+    if not len(lengths):
+        return CuttingPlan((), 0, 0, 0.0, 0)
+    if lengths.max() > stocks[-1]:
+        raise ValueError(f"piece of {lengths.max()} is longer than the longest stock {stocks[-1]}")
+    weights = lengths + kerf
+    capacities = np.array(stocks, dtype=np.int64) + kerf
+
+    # Start from one homogeneous pattern per piece and stock, plus the
+    # first-fit decreasing packing, so the first LP is already close.
+    columns, costs = [], []
+    for i, w in enumerate(weights):
+        for stock, capacity in zip(stocks, capacities):
+            if capacity >= w:
+                column = np.zeros(len(lengths), dtype=np.int64)
+                column[i] = capacity // w
+                columns.append(column)
+                costs.append(stock)
+    packed = Counter(_first_fit_decreasing(weights, counts, tuple(int(c) for c in capacities)))
+    for capacity, items in packed:
+        columns.append(np.bincount(items, minlength=len(lengths)))
+        costs.append(capacity - kerf)
+
+    bound, result = 0.0, None
+    for _ in range(max_iterations):
+        result = linprog(costs, A_ub=-np.array(columns).T, b_ub=-counts, bounds=(0, None), method="highs")
+        duals = -result.ineqlin.marginals
+        best, packing = _knapsack(weights, duals, int(capacities[-1]))
+        # Farley's bound: no pattern is worth more than `gain` times its stock length.
+        gain = max(1.0, max(best[c] / s for s, c in zip(stocks, capacities)))
+        bound = max(bound, result.fun / gain)
+        if result.fun - bound <= tolerance * result.fun:
+            break
+        for stock, capacity in zip(stocks, capacities):
+            if stock - best[capacity] < -1e-6 * stock:
+                columns.append(packing(int(capacity)))
+                costs.append(stock)
+
+    x = np.floor(result.x + 1e-9).astype(np.int64)
+    patterns: Counter = Counter()
+    covered = np.zeros(len(lengths), dtype=np.int64)
+    for j in np.flatnonzero(x):
+        pieces = np.minimum(columns[j], np.maximum(counts - covered, 0))
+        if not pieces.any():
+            continue
+        times = int(x[j])
+        covered += columns[j] * times
+        # Pieces of a rounded-down pattern beyond the demand count as waste.
+        patterns[(costs[j], tuple(np.repeat(np.arange(len(lengths)), columns[j])))] += times
+    remaining = np.maximum(counts - covered, 0)
+    for capacity, items in _first_fit_decreasing(weights, remaining, tuple(int(c) for c in capacities)):
+        patterns[(capacity - kerf, items)] += 1
+    # On small groups rounding can lose to plain first-fit decreasing; keep the better one.
+    if sum(stock * times for (stock, _), times in patterns.items()) > sum(
+            (capacity - kerf) * times for (capacity, _), times in packed.items()):
+        patterns = Counter({(capacity - kerf, items): times for (capacity, items), times in packed.items()})
+
+    plan = tuple(sorted(((stock, tuple(int(lengths[i]) for i in items), times)
+                         for (stock, items), times in patterns.items()), reverse=True))
+    return CuttingPlan(plan, sum(stock * times for stock, _, times in plan), int(lengths @ counts),
+                       bound, len(columns))
+
+
+class GroupResult(NamedTuple):
+    panel_type: str
+    thickness: float
+    height: float
+    panels: int
+    pieces: int          # after splitting panels longer than the longest stock
+    joints: int          # extra joints introduced by that splitting
+    demand: float        # m
+    stock_used: float    # m
+    waste: float         # m
+    waste_ratio: float
+    lower_bound: float   # m
+    counts: Dict[float, int]
+
+
+def panel_groups(design: Design, resolution: float = 0.001) -> Dict[tuple, Counter]:
+    """
+    (panel_type, thickness, height) -> Counter of panel lengths in units of `resolution`.
+
+    Panels with missing endpoints or zero length are skipped.
+    """
+    panels = design.panels
+    lengths = np.rint(panels.lengths() / resolution)
+    valid = ~np.isnan(lengths) & (lengths > 0)
+    groups: Dict[tuple, Counter] = {}
+    keys = np.column_stack([panels.panel_type_codes, panels.thickness, panels.height])[valid]
+    for key, length in zip(map(tuple, keys), lengths[valid].astype(np.int64)):
+        groups.setdefault(key, Counter())[int(length)] += 1
+    return {(panels.panel_types[int(code)], float(thickness), float(height)): counter
+            for (code, thickness, height), counter in groups.items()}
+
+
+def _stock_for(stock: List[StockPanel], panel_type: str, thickness: float) -> List[StockPanel]:
+    return [s for s in stock
+            if (s.thickness is None or abs(s.thickness - thickness) < 1e-9)
+            and (not s.panel_types or panel_type in s.panel_types)]
+
+
+@tracing.traced("panel_stock.rationalize")
+def rationalize(design: Design, stock: List[StockPanel], kerf: float = 0.0,
+                resolution: float = 0.001) -> List[GroupResult]:
+    """
+    Cut the panels of a design from stock lengths, one cutting-stock problem per panel type, thickness and height.
+
+    Panels longer than the longest stock are made of full stock lengths plus
+    a remainder piece; each extra piece counts as a joint.
+
+    Args:
+        design (Design): Loaded design.
+        stock (list): Available StockPanel entries.
+        kerf (float): Saw kerf in metres.
+        resolution (float): Length unit of the solver in metres.
+
+    Returns:
+        list: One GroupResult per group (groups without usable stock are skipped with a message).
+    """
+    results = []
+    for (panel_type, thickness, height), lengths in sorted(panel_groups(design, resolution).items()):
+        available = _stock_for(stock, panel_type, thickness)
+        if not available:
+            print(f"No stock panels for {panel_type} {thickness:g} m; skipped")
+            continue
+        stocks = tuple(sorted({int(round(s.length / resolution)) for s in available}))
+        longest = stocks[-1]
+        demand, full, joints = Counter(), 0, 0
+        for length, count in lengths.items():
+            whole, rest = divmod(length, longest)
+            if rest == 0:
+                whole, rest = whole - 1, longest
+            full += whole * count
+            joints += whole * count
+            demand[rest] += count
+        plan = solve_cutting_stock(tuple(sorted(demand.items())), stocks, int(round(kerf / resolution)))
+        counts = Counter({s * resolution: n for s, n in plan.counts().items()})
+        counts[longest * resolution] += full
+        stock_used = (plan.stock_used + full * longest) * resolution
+        total = (plan.demand + full * longest) * resolution
+        results.append(GroupResult(
+            panel_type, thickness, height,
+            panels=sum(lengths.values()), pieces=sum(demand.values()) + full, joints=joints,
+            demand=total, stock_used=stock_used, waste=stock_used - total,
+            waste_ratio=(stock_used - total) / stock_used if stock_used else 0.0,
+            lower_bound=(plan.lower_bound + full * longest) * resolution,
+            counts=dict(sorted(counts.items()))))
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Cut the wall panels of each design from standard stock lengths and report panel counts and waste."
+    )
+    parser.add_argument("path", type=str, help="Floorplan JSON file, or folder searched recursively")
+    parser.add_argument("--stock", type=float, nargs="+", default=list(DEFAULT_STOCK_LENGTHS),
+                        help="Stock panel lengths in metres")
+    parser.add_argument("--stock-file", type=str, default=None,
+                        help="JSON stock catalog (overrides --stock); entries may be limited by thickness and panel type")
+    parser.add_argument("--kerf", type=float, default=0.0, help="Saw kerf in metres")
+    parser.add_argument("--output", type=str, default=None, help="CSV file for the per-group results")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    stock = (load_stock(args.stock_file) if args.stock_file
+             else [StockPanel(f"PNL_{length:g}", length) for length in args.stock])
+    paths = [args.path] if os.path.isfile(args.path) else find_design_files(args.path)
+
+    rows = []
+    for path in paths:
+        design = load_design(path)
+        start = time.perf_counter()
+        try:
+            results = rationalize(design, stock, args.kerf)
+        except ValueError as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        for r in results:
+            print(f"{os.path.basename(path):<30} {r.panel_type:<16} {r.thickness:5.2f} m  {r.panels:6d} panels  "
+                  f"{sum(r.counts.values()):6d} stock  waste {r.waste:8.2f} m ({r.waste_ratio:6.2%})  "
+                  f"LP bound {r.lower_bound:9.2f} m")
+            row = r._asdict()
+            row["counts"] = " ".join(f"{length:g}x{n}" for length, n in r.counts.items())
+            rows.append(dict(file=os.path.basename(path), **row))
+        used = sum(r.stock_used for r in results)
+        waste = sum(r.waste for r in results)
+        print(f"{os.path.basename(path)}: {sum(r.panels for r in results)} panels in {len(results)} groups, "
+              f"waste {waste:.2f} m of {used:.2f} m ({waste / used if used else 0:.2%}), {elapsed:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["file"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
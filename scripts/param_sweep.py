@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import shapely
+from shapely import affinity
+from shapely.geometry import MultiPolygon
+
+import tracing
+from compute_iou_isFabricable import hull_dimensions
+from floorplan_io import find_design_files, load_design
+from floorplan_search import _iou, default_prefabs
+from modify_plan import PrefabOptimizer
+
+
+# Defaults are the values used in the __main__ blocks of modify_plan.py and
+# compute_iou_isFabricable.py.
+DEFAULT_PARAMETERS = {
+    "hull_ratio_threshold": 0.55,
+    "iou_threshold": 0.75,
+    "transport_short": 3.2,
+    "transport_long": 13.6,
+}
+
+
+class SweepData(NamedTuple):
+    """
+    Everything the sweep needs from the corpus, computed once and shared read-only.
+
+    Per apartment: the hull ratio of its prefab-type rooms (as
+    PrefabOptimizer._calculate_hull_ratio) and the short/long side of their
+    hull (as compute_spaces_convex_hull_ratio). Per prefab-type room: its
+    area, the prefab aligned to it and the IoU of that prefab scaled to the
+    room's area, which is the placement whenever max_area does not cap it.
+    Per prefab type: its own max_area, the cap when the sweep leaves it alone.
+    """
+
+    files: List[str]
+    apartments: List[str]
+    hull_ratio: np.ndarray       # (a,)
+    hull_short: np.ndarray       # (a,)
+    hull_long: np.ndarray        # (a,)
+    room_apartment: np.ndarray   # (r,) apartment index of each room
+    room_type: np.ndarray        # (r,) index into prefab_types
+    room_area: np.ndarray        # (r,)
+    room_iou: np.ndarray         # (r,) IoU of the uncapped placement
+    rooms: np.ndarray            # (r,) room geometries
+    placements: np.ndarray       # (r,) aligned prefab scaled to the room area
+    prefab_types: List[str]
+    prefab_max_area: np.ndarray  # (t,) max_area of each prefab type
+
+
+def _capped_ious(rooms: np.ndarray, placements: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """
+    IoU of each room with its placement scaled about the centroid by `factors`
+    (as PrefabOptimizer._scaled_prefab), for all rooms at once.
+    """
+    coords, owner = shapely.get_coordinates(placements, return_index=True)
+    centres = shapely.get_coordinates(shapely.centroid(placements))[owner]
+    scaled = shapely.set_coordinates(shapely.transform(placements, lambda c: c),
+                                     centres + (coords - centres) * factors[owner, None])
+    intersection = shapely.area(shapely.intersection(rooms, scaled))
+    union = shapely.area(rooms) + shapely.area(scaled) - intersection
+    return np.where(union > 0, intersection / np.where(union > 0, union, 1.0), 0.0)
+
+
+@tracing.traced("sweep.precompute")
+def precompute(paths: List[str], prefabs=None) -> SweepData:
+    """Load every design once and compute the parameter-independent hulls and placements."""
+    optimizer = PrefabOptimizer(prefabs or default_prefabs())
+    prefab_types = sorted(optimizer.prefabs)
+    files, names, ratios, shorts, longs = [], [], [], [], []
+    room_apartment, room_type, room_area, room_iou, rooms, placements = [], [], [], [], [], []
+
+    for path in paths:
+        try:
+            design = load_design(path)
+        except (ValueError, OSError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        for apartment in optimizer.load_from_design(design):
+            relevant = [r for r in apartment.rooms if r.type in optimizer.relevant_types
+                        and r.geometry.is_valid and not r.geometry.is_empty]
+            hull = MultiPolygon([r.geometry for r in relevant if r.geometry.geom_type == "Polygon"]).convex_hull
+            short, long = hull_dimensions(hull) if hull.geom_type == "Polygon" else (np.inf, np.inf)
+            index = len(names)
+            files.append(os.path.basename(path))
+            names.append(apartment.name)
+            ratios.append(optimizer._calculate_hull_ratio(apartment))
+            shorts.append(short)
+            longs.append(long)
+
+            for room in relevant:
+                prefab = optimizer.prefabs[room.type]
+                area = room.geometry.area
+                aligned = optimizer._aligned_prefab(room.geometry, prefab.geometry)
+                factor = np.sqrt(area / prefab.geometry.area)
+                placement = affinity.scale(aligned, factor, factor, origin="centroid")
+                room_apartment.append(index)
+                room_type.append(prefab_types.index(room.type))
+                room_area.append(area)
+                room_iou.append(_iou(room.geometry, placement))
+                rooms.append(room.geometry)
+                placements.append(placement)
+
+    return SweepData(files, names, np.asarray(ratios, dtype=float), np.asarray(shorts, dtype=float),
+                     np.asarray(longs, dtype=float), np.asarray(room_apartment, dtype=np.int64),
+                     np.asarray(room_type, dtype=np.int64), np.asarray(room_area, dtype=float),
+                     np.asarray(room_iou, dtype=float), np.array(rooms, dtype=object),
+                     np.array(placements, dtype=object), prefab_types,
+                     np.array([optimizer.prefabs[t].max_area for t in prefab_types], dtype=float))
+
+
+def grid(values: Dict[str, List[float]]) -> List[dict]:
+    """Every combination of the given parameter values."""
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(values[n] for n in names))]
+
+
+def latin_hypercube(ranges: Dict[str, tuple], samples: int, seed: Optional[int] = None) -> List[dict]:
+    """`samples` combinations spread over the (low, high) range of each parameter."""
+    from scipy.stats import qmc
+
+    names = list(ranges)
+    low = np.array([ranges[n][0] for n in names], dtype=float)
+    high = np.array([ranges[n][-1] for n in names], dtype=float)
+    points = qmc.LatinHypercube(d=len(names), seed=seed).random(samples)
+    return [dict(zip(names, map(float, row))) for row in low + points * (high - low)]
+
+
+_data: Optional[SweepData] = None
+_capped: Dict[tuple, float] = {}
+
+
+def _init_worker(data: SweepData):
+    global _data
+    _data = data
+    _capped.clear()
+
+
+def evaluate(data: SweepData, params: dict, capped: Optional[Dict[tuple, float]] = None) -> dict:
+    """
+    Outcome of one parameter combination over the whole corpus.
+
+    An apartment is processed when its hull ratio reaches hull_ratio_threshold;
+    a room of a processed apartment takes its prefab when the IoU of the
+    placement reaches iou_threshold. The placement is the aligned prefab
+    scaled to the room's area, capped at max_area (parameters 'max_area_<type>',
+    defaulting to the prefab's own max_area); only capped placements need new
+    geometry, and their IoUs are cached per room and cap in `capped`.
+    """
+    capped = {} if capped is None else capped
+    p = dict(DEFAULT_PARAMETERS, **params)
+    processed = data.hull_ratio >= p["hull_ratio_threshold"]
+    transportable = (data.hull_short <= p["transport_short"]) & (data.hull_long <= p["transport_long"])
+
+    max_area = np.array([p.get(f"max_area_{t}", default)
+                         for t, default in zip(data.prefab_types, data.prefab_max_area)])[data.room_type]
+    iou = data.room_iou.copy()
+    over = np.flatnonzero(data.room_area > max_area)
+    missing = np.array([i for i in over if (i, max_area[i]) not in capped], dtype=np.int64)
+    if len(missing):
+        factors = np.sqrt(max_area[missing] / data.room_area[missing])
+        for i, value in zip(missing, _capped_ious(data.rooms[missing], data.placements[missing], factors)):
+            capped[(i, max_area[i])] = value
+    iou[over] = [capped[(i, max_area[i])] for i in over]
+    fitted = processed[data.room_apartment] & (iou >= p["iou_threshold"])
+    prefab_area = np.minimum(data.room_area, max_area)
+
+    row = {f"in:{name}": value for name, value in params.items()}
+    row.update({
+        "out:apartments": len(data.apartments),
+        "out:processed": int(processed.sum()),
+        "out:transportable": int(transportable.sum()),
+        "out:processed_transportable": int((processed & transportable).sum()),
+        "out:prefab_rooms": int(fitted.sum()),
+        "out:prefab_area": float(prefab_area[fitted].sum()),
+        "out:coverage": float(prefab_area[fitted].sum() / data.room_area.sum()) if len(iou) else 0.0,
+        "out:mean_iou": float(iou[fitted].mean()) if fitted.any() else 0.0,
+    })
+    for k, prefab_type in enumerate(data.prefab_types):
+        row[f"out:{prefab_type}_rooms"] = int((fitted & (data.room_type == k)).sum())
+    return row
+
+
+def _evaluate_chunk(combinations: List[dict]) -> List[dict]:
+    return [evaluate(_data, params, _capped) for params in combinations]
+
+
+def sweep(data: SweepData, combinations: List[dict], workers: Optional[int] = 1) -> List[dict]:
+    """
+    Evaluate every combination, in a process pool when workers != 1.
+
+    The precomputed data is sent once to each worker (through the pool
+    initializer), not with every combination.
+    """
+    if workers == 1 or len(combinations) < 2:
+        capped: Dict[tuple, float] = {}
+        return [evaluate(data, params, capped) for params in combinations]
+    workers = workers or os.cpu_count() or 1
+    size = max(1, -(-len(combinations) // (workers * 4)))
+    chunks = [combinations[i:i + size] for i in range(0, len(combinations), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        return [row for rows in pool.map(_evaluate_chunk, chunks) for row in rows]
+
+
+def _parameter_values(args) -> Dict[str, List[float]]:
+    values = {
+        "hull_ratio_threshold": args.hull_ratio,
+        "iou_threshold": args.iou,
+        "transport_short": args.transport_short,
+        "transport_long": args.transport_long,
+    }
+    for item in args.max_area or []:
+        prefab_type, _, numbers = item.partition("=")
+        values[f"max_area_{prefab_type}"] = [float(v) for v in numbers.split(",")]
+    return values
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Sweep the optimizer thresholds and prefab max areas over a grid or Latin hypercube."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--hull-ratio", type=float, nargs="+", default=[0.45, 0.55, 0.65],
+                        help="hull_ratio_threshold values (with --lhs: low high)")
+    parser.add_argument("--iou", type=float, nargs="+", default=[0.6, 0.7, 0.8],
+                        help="iou_threshold values (with --lhs: low high)")
+    parser.add_argument("--transport-short", type=float, nargs="+", default=[3.2],
+                        help="Short side of transport_thresholds (with --lhs: low high)")
+    parser.add_argument("--transport-long", type=float, nargs="+", default=[13.6],
+                        help="Long side of transport_thresholds (with --lhs: low high)")
+    parser.add_argument("--max-area", type=str, nargs="*", default=None,
+                        help="Prefab max_area values per type, e.g. bathroom=6,8,10 kitchen=12")
+    parser.add_argument("--lhs", type=int, default=None,
+                        help="Draw this many Latin hypercube samples between the first and last value "
+                             "of each parameter instead of the full grid")
+    parser.add_argument("--area-step", type=float, default=0.25,
+                        help="Round Latin hypercube max_area samples to this step in m² (0 to keep them exact)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", type=str, default="sweep_results.csv",
+                        help="Design Explorer CSV (in:/out: columns)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    values = _parameter_values(args)
+    if args.lhs:
+        combinations = latin_hypercube({n: (v[0], v[-1]) for n, v in values.items()}, args.lhs, args.seed)
+        if args.area_step:
+            # Capped placements are cached per room and cap; rounding the
+            # sampled caps lets samples share them.
+            for params in combinations:
+                for name in params:
+                    if name.startswith("max_area_"):
+                        params[name] = round(params[name] / args.area_step) * args.area_step
+    else:
+        combinations = grid(values)
+
+    start = time.perf_counter()
+    data = precompute(find_design_files(args.base_folder))
+    precomputed = time.perf_counter() - start
+    rows = sweep(data, combinations, args.workers)
+    elapsed = time.perf_counter() - start - precomputed
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["in:"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"{len(data.apartments)} apartments, {len(data.room_area)} prefab-type rooms precomputed in "
+          f"{precomputed:.2f} s; {len(rows)} combinations in {elapsed:.2f} s, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import dataclasses
+import hashlib
+import io
+import json
+import os
+import pickle
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+import tracing
+from compare_graphs import node_simrank_scores
+from compute_iou import compute_space_combinations_ratios_by_apartment
+from compute_iou_isFabricable import compute_spaces_convex_hull_ratio
+from csr_graph import CSRGraph
+from floorplan_io import DEFAULT_CACHE_DIR, Design, file_digest, find_design_files, load_design
+from floorplan_search import AnnealingOptimizer, default_prefabs
+from modify_plan import PrefabOptimizer
+
+
+# Stage outputs live next to the design cache, keyed by the stage key.
+PIPELINE_CACHE_DIR = os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "pipeline")
+
+# Dependency on a stage of the reference design instead of the design itself.
+REFERENCE = "reference:"
+
+
+class Stage(NamedTuple):
+    """
+    One step of the per-design pipeline.
+
+    Attributes:
+        name (str): Stage name, also used in dependency lists.
+        func (callable): func(design, inputs, params) -> picklable output, where
+            inputs maps each dependency name to its output.
+        deps (tuple): Stage names this stage reads; 'reference:<name>' reads the
+            stage output of the reference design.
+        params (tuple): Names of the run parameters that affect the output.
+        file_params (tuple): Parameters that are file paths; their contents are hashed.
+        version (int): Bump when the stage code changes its output.
+    """
+    name: str
+    func: Callable
+    deps: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+    file_params: Tuple[str, ...] = ()
+    version: int = 1
+
+
+def build_design_graph(design: Design) -> nx.MultiGraph:
+    """
+    Build the room/apartment/wall graph of a design, in the *_bom_updated.graphml schema.
+
+    Each panel is attached to the first room of its apartment and room type
+    whose outline contains both panel endpoints as vertices. Panels with the
+    same endpoints (the two faces of a shared wall) are linked as 'identical',
+    and unassigned core spaces are linked to every apartment.
+    """
+    G = nx.MultiGraph()
+    spaces, panels = design.spaces, design.panels
+    vertices, cores = {}, []
+    for i, space_id in enumerate(spaces.ids):
+        outline = spaces.outline(i)
+        room = f"room_{space_id}"
+        apartment = spaces.apartment(i)
+        attrs = {"type": "room", "room_type": spaces.room_type(i),
+                 "coordinates": ";".join(f"{x:g},{y:g}" for x, y in outline)}
+        if apartment is not None:
+            attrs["apartment"] = apartment
+        G.add_node(room, **attrs)
+        if apartment is None and spaces.room_type(i) == "core":
+            cores.append(room)
+        elif apartment not in (None, "UNASSIGNED"):
+            apartment_node = f"apartment_{design.apartments.index(apartment) + 1}"
+            if apartment_node not in G:
+                G.add_node(apartment_node, type="apartment", name=apartment)
+            G.add_edge(room, apartment_node, type="belongs_to")
+        key = (apartment, spaces.room_type(i))
+        vertices.setdefault(key, []).append((room, {tuple(np.round(p, 6)) for p in outline}))
+
+    for i, panel_id in enumerate(panels.ids):
+        attrs = {"type": "wall", "panel_type": panels.panel_type(i),
+                 "start_point": str([float(v) for v in panels.start[i]]),
+                 "end_point": str([float(v) for v in panels.end[i]]),
+                 "height": float(panels.height[i]), "thickness": float(panels.thickness[i])}
+        if panels.room(i) is not None:
+            attrs["room_type"] = panels.room(i)
+        if panels.apartment(i) is not None:
+            attrs["apartment"] = panels.apartment(i)
+        G.add_node(panel_id, **attrs)
+        ends = {tuple(np.round(panels.start[i, :2], 6)), tuple(np.round(panels.end[i, :2], 6))}
+        for room, outline in vertices.get((panels.apartment(i), panels.room(i)), []):
+            if ends <= outline:
+                G.add_edge(room, panel_id, type="belongs_to")
+                break
+
+    for core in cores:
+        for n, name in enumerate(design.apartments):
+            if f"apartment_{n + 1}" in G:
+                G.add_edge(core, f"apartment_{n + 1}", type="core_to_apartment")
+
+    faces = {}
+    for i, panel_id in enumerate(panels.ids):
+        ends = frozenset((tuple(np.round(panels.start[i, :2], 6)), tuple(np.round(panels.end[i, :2], 6))))
+        if ends in faces:
+            G.add_edge(faces[ends], panel_id, type="identical")
+        else:
+            faces[ends] = panel_id
+    return G
+
+
+def stage_graph(design: Design, inputs: dict, params: dict) -> nx.MultiGraph:
+    return build_design_graph(design)
+
+
+def stage_compare(design: Design, inputs: dict, params: dict) -> dict:
+    import netlsd
+
+    graph = CSRGraph.from_networkx(inputs["graph"])
+    reference = CSRGraph.from_networkx(inputs[REFERENCE + "graph"])
+    heat = netlsd.heat(graph.sparse_adjacency())
+    result = {
+        "nodes": len(graph),
+        "edges": graph.num_edges,
+        "netlsd_distance": float(netlsd.compare(heat, netlsd.heat(reference.sparse_adjacency()))),
+        "mean_simrank": float(np.mean(list(node_simrank_scores(graph).values()))) if len(graph) else 0.0,
+    }
+    if params.get("ged_timeout"):
+        # Exponential in graph size; the timeout returns the best distance found so far.
+        result["graph_edit_distance"] = nx.graph_edit_distance(
+            inputs["graph"], inputs[REFERENCE + "graph"], timeout=params["ged_timeout"])
+    return result
+
+
+def stage_hull_ratios(design: Design, inputs: dict, params: dict) -> dict:
+    return compute_space_combinations_ratios_by_apartment(design)
+
+
+def stage_transportability(design: Design, inputs: dict, params: dict) -> dict:
+    result = compute_spaces_convex_hull_ratio(design)
+    if not isinstance(result, tuple):
+        return {"ratio": float(result), "hull_area": 0.0, "transportable": False}
+    ratio, hull_area, transportable = result
+    return {"ratio": float(ratio), "hull_area": float(hull_area), "transportable": bool(transportable)}
+
+
+def stage_prefab(design: Design, inputs: dict, params: dict) -> List[dict]:
+    catalog = None
+    if params.get("catalog"):
+        from prefab_catalog import PrefabCatalog
+        catalog = PrefabCatalog.load(params["catalog"])
+        optimizer = PrefabOptimizer(catalog.parts())
+    else:
+        optimizer = PrefabOptimizer(default_prefabs())
+    search = AnnealingOptimizer(optimizer, catalog=catalog, seed=params.get("seed"))
+    results = search.optimize(optimizer.load_from_design(design), iterations=params["iterations"])
+    return [dataclasses.asdict(r) for r in results]
+
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in (
+    Stage("graph", stage_graph),
+    Stage("compare", stage_compare, deps=("graph", REFERENCE + "graph"), params=("ged_timeout",)),
+    Stage("hull_ratios", stage_hull_ratios),
+    Stage("transportability", stage_transportability),
+    Stage("prefab", stage_prefab, params=("iterations", "seed", "catalog"), file_params=("catalog",)),
+)}
+
+
+class Task(NamedTuple):
+    stage: str
+    design: str  # path of the design JSON
+
+
+class Pipeline:
+    """
+    Runs the stages of every design as one DAG with a content-addressed cache.
+
+    The key of a task hashes the stage name and version, the parameters the
+    stage uses (file parameters by content), the SHA-256 of the design file
+    and the keys of the tasks it depends on. A task whose key is already in
+    the cache is not rerun, so editing one design, or changing one stage's
+    parameters, only reruns the tasks downstream of that change.
+
+    Args:
+        designs (list): Design JSON paths.
+        reference (str): Design JSON the 'reference:' dependencies refer to.
+        params (dict): Run parameters shared by all stages.
+        stages (list): Stage names to run (their dependencies are added).
+        cache_dir (str): Folder of the stage output cache.
+    """
+
+    def __init__(self, designs: List[str], reference: str, params: dict,
+                 stages: Optional[List[str]] = None, cache_dir: Optional[str] = None):
+        self.designs = designs
+        self.reference = reference
+        self.params = params
+        self.cache_dir = cache_dir or PIPELINE_CACHE_DIR
+        self._digests: Dict[str, str] = {}
+        self.keys: Dict[Task, str] = {}
+        self.deps: Dict[Task, List[Task]] = {}
+        for design in designs:
+            for name in stages or list(STAGES):
+                self._add(Task(name, design))
+
+    def _digest(self, path: str) -> str:
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+
+    def _dep_task(self, dep: str, design: str) -> Task:
+        if dep.startswith(REFERENCE):
+            return Task(dep[len(REFERENCE):], self.reference)
+        return Task(dep, design)
+
+    def _add(self, task: Task) -> str:
+        if task in self.keys:
+            return self.keys[task]
+        stage = STAGES[task.stage]
+        deps = [self._dep_task(dep, task.design) for dep in stage.deps]
+        params = {}
+        for name in stage.params:
+            value = self.params.get(name)
+            params[name] = self._digest(value) if name in stage.file_params and value else value
+        payload = json.dumps([stage.name, stage.version, params, self._digest(task.design),
+                              [self._add(dep) for dep in deps]], sort_keys=True)
+        self.deps[task] = deps
+        self.keys[task] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self.keys[task]
+
+    def _cache_path(self, task: Task) -> str:
+        return os.path.join(self.cache_dir, f"{task.stage}-{self.keys[task]}.pkl")
+
+    def cached(self, task: Task) -> bool:
+        return os.path.exists(self._cache_path(task))
+
+    def load(self, task: Task):
+        with open(self._cache_path(task), "rb") as f:
+            return pickle.load(f)
+
+    def run(self, workers: Optional[int] = None, force: Tuple[str, ...] = ()) -> Dict[Task, str]:
+        """
+        Run every task whose output is not cached, in dependency order.
+
+        Independent tasks (in particular different designs) run in parallel
+        processes. Tasks of stages listed in force are rerun even when cached.
+
+        Returns:
+            dict: Task -> 'cached', 'ran' or an error message.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        status = {t: "cached" for t in self.keys if t.stage not in force and self.cached(t)}
+        pending = {t for t in self.keys if t not in status}
+        running = {}
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                for task in sorted(pending):
+                    dep_status = [status.get(d) for d in self.deps[task]]
+                    if any(s is not None and s not in ("cached", "ran") for s in dep_status):
+                        status[task] = "skipped: a dependency failed"
+                        pending.discard(task)
+                    elif all(s in ("cached", "ran") for s in dep_status):
+                        inputs = {dep: self._cache_path(d)
+                                  for dep, d in zip(STAGES[task.stage].deps, self.deps[task])}
+                        future = pool.submit(_run_task, task, self.params, inputs, self._cache_path(task))
+                        running[future] = task
+                        pending.discard(task)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        future.result()
+                        status[task] = "ran"
+                    except Exception as e:
+                        status[task] = f"error: {type(e).__name__}: {e}"
+        return status
+
+    def report(self) -> Dict[str, dict]:
+        """Design name -> stage -> output, for every cached task of this run."""
+        report: Dict[str, dict] = {}
+        for task in self.keys:
+            if task.design in self.designs and task.stage != "graph" and self.cached(task):
+                report.setdefault(os.path.basename(task.design), {})[task.stage] = self.load(task)
+        return report
+
+
+def store_report(pipeline: Pipeline, db_path: str):
+    """Upsert the cached stage outputs of a run into a results_store.ResultsStore."""
+    from results_store import ResultsStore
+
+    reference = os.path.basename(pipeline.reference)
+    params = pipeline.params
+    run = json.dumps({"iterations": params.get("iterations"), "seed": params.get("seed"),
+                      "catalog": os.path.basename(params["catalog"]) if params.get("catalog") else None},
+                     sort_keys=True)
+    with ResultsStore(db_path) as store:
+        for path in pipeline.designs:
+            file = os.path.basename(path)
+            store.design_id(file, path)
+            outputs = {stage: pipeline.load(Task(stage, path)) for stage in STAGES
+                       if stage != "graph" and Task(stage, path) in pipeline.keys
+                       and pipeline.cached(Task(stage, path))}
+            if "hull_ratios" in outputs:
+                store.add_apartment_ratios(file, outputs["hull_ratios"])
+            if "compare" in outputs:
+                store.add_similarity(file, reference, outputs["compare"])
+            if "prefab" in outputs:
+                store.add_search_results(file, outputs["prefab"], run)
+
+
+def _run_task(task: Task, params: dict, input_paths: Dict[str, str], output_path: str):
+    """Worker: load the design and dependency outputs, run the stage, write its output."""
+    stage = STAGES[task.stage]
+    with tracing.span(f"pipeline.{task.stage}", design=os.path.basename(task.design)):
+        design = load_design(task.design)
+        inputs = {}
+        for dep, path in input_paths.items():
+            with open(path, "rb") as f:
+                inputs[dep] = pickle.load(f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = stage.func(design, inputs, params)
+
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, output_path)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Run graph, comparison, IoU/fabricability and prefab stages for every design, "
+                    "rerunning only what changed."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--reference", type=str, required=True, help="Reference design JSON")
+    parser.add_argument("--stages", nargs="*", choices=list(STAGES), default=None)
+    parser.add_argument("--iterations", type=int, default=2000, help="Annealing iterations per apartment")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog", type=str, default=None, help="Prefab catalog JSON")
+    parser.add_argument("--ged-timeout", type=float, default=None,
+                        help="Also compute the graph edit distance, giving up after this many seconds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to rerun even when cached")
+    parser.add_argument("--cache-dir", type=str, default=None)
+    parser.add_argument("--output", type=str, default=None, help="Write all stage outputs to this JSON")
+    parser.add_argument("--db", type=str, default=None,
+                        help="SQLite results database to upsert the ratios, scores and search outcomes into")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    designs = [d for d in find_design_files(args.base_folder) if len(load_design(d).spaces)]
+    params = {"iterations": args.iterations, "seed": args.seed, "catalog": args.catalog,
+              "ged_timeout": args.ged_timeout}
+    pipeline = Pipeline(designs, args.reference, params, args.stages, args.cache_dir)
+    status = pipeline.run(args.workers, tuple(args.force))
+
+    for task in sorted(status):
+        print(f"{task.stage:<18} {os.path.relpath(task.design, args.base_folder):<50} {status[task]}")
+    ran = sum(s == "ran" for s in status.values())
+    print(f"{ran} tasks ran, {sum(s == 'cached' for s in status.values())} cached, "
+          f"{len(status) - ran - sum(s == 'cached' for s in status.values())} failed")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(pipeline.report(), f, indent=2, default=str)
+        print(f"Results saved to {args.output}")
+
+    if args.db:
+        store_report(pipeline, args.db)
+        print(f"Results stored in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set
+
+import networkx as nx
+import numpy as np
+from shapely.geometry import Polygon
+
+import tracing
+from floorplan_io import Design, load_design
+from graphml_stream import parse_outline, parse_point
+from pipeline import build_design_graph
+
+
+def _vertex(point: np.ndarray) -> tuple:
+    # Same rounding as build_design_graph, so both sides hash to equal keys.
+    return tuple(np.round(point[:2], 6))
+
+
+class _GridIndex:
+    """Uniform grid over bounding boxes; unlike shapely's STRtree it supports insert and remove."""
+
+    __slots__ = ("cell", "cells", "members")
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.cells: Dict[tuple, set] = defaultdict(set)
+        self.members: Dict[str, List[tuple]] = {}
+
+    def _cells(self, bounds) -> List[tuple]:
+        x0, y0, x1, y1 = (int(np.floor(b / self.cell)) for b in bounds)
+        return [(i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)]
+
+    def insert(self, key: str, bounds):
+        cells = self._cells(bounds)
+        for cell in cells:
+            self.cells[cell].add(key)
+        self.members[key] = cells
+
+    def remove(self, key: str):
+        for cell in self.members.pop(key, []):
+            self.cells[cell].discard(key)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def query(self, bounds) -> set:
+        found = set()
+        for cell in self._cells(bounds):
+            found |= self.cells.get(cell, set())
+        return found
+
+
+class PlanGraph:
+    """
+    Room/panel graph and room adjacency of a floorplan, kept up to date under edits.
+
+    Holds three views of the plan that apply() updates in place from a diff
+    of spaces and panels, touching only the records the diff reaches:
+
+        graph           nx.MultiGraph equal to pipeline.build_design_graph
+                        (the GraphML room/panel schema).
+        room_adjacency  room type -> adjacent room types, as computed by
+                        findAdj01a.compute_room_adjacency.
+        contacts        nx.Graph of rooms whose outlines share a boundary,
+                        with 'shared_length' and centroid 'distance' on each edge.
+
+    Panels are matched to rooms through a hash of outline vertices and rooms
+    to their neighbours through a uniform grid over outline bounds, so an
+    edit costs time proportional to the geometry around it rather than to
+    the size of the building. Apartment nodes keep the number they were
+    first given, also when apartments are added or removed later.
+    """
+
+    def __init__(self, design: Design, min_shared_length: float = 1e-6,
+                 cell_size: Optional[float] = None, data: Optional[dict] = None):
+        # The raw JSON, when given, supplies the stored records so they keep their original keys and values.
+        data = data if data is not None else design.to_dict()
+        self.min_shared_length = min_shared_length
+        self.graph = nx.MultiGraph()
+        self.contacts = nx.Graph()
+        self.spaces: Dict[str, dict] = {}
+        self.panels: Dict[str, dict] = {}
+
+        self._counter = count()
+        self._space_order: Dict[str, int] = {}
+        self._panel_order: Dict[str, int] = {}
+        self._apartment_numbers = {name: n + 1 for n, name in enumerate(design.apartments)}
+        self._apartment_rooms: Counter = Counter()
+        self._cores: Set[str] = set()
+        self._vertex_rooms: Dict[tuple, set] = defaultdict(set)
+        self._vertex_panels: Dict[tuple, set] = defaultdict(set)
+        self._panel_room: Dict[str, str] = {}
+        self._faces: Dict[frozenset, List[str]] = defaultdict(list)
+        self._groups: Dict[tuple, Counter] = defaultdict(Counter)
+        self._pairs: Counter = Counter()
+        self._polygons: Dict[str, Polygon] = {}
+
+        if cell_size is None:
+            outlines = (parse_outline(space.get("coordinates")) for space in data["spaces"].values())
+            spans = [np.ptp(outline, axis=0).max() for outline in outlines if len(outline)]
+            cell_size = float(np.median(spans)) if spans and np.median(spans) > 0 else 1.0
+        self._index = _GridIndex(cell_size)
+
+        with tracing.span("plan_graph.build", spaces=len(data["spaces"]),
+                          panels=len(data["panels"]["items"])):
+            self.apply({"spaces": data["spaces"], "panels": data["panels"]["items"]})
+
+    @classmethod
+    def from_json(cls, json_path: str, **kwargs) -> "PlanGraph":
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.setdefault("spaces", {})
+        data.setdefault("panels", {}).setdefault("items", {})
+        return cls(load_design(json_path), data=data, **kwargs)
+
+    @property
+    def room_adjacency(self) -> Dict[str, set]:
+        adjacency = defaultdict(set)
+        for room, other in self._pairs:
+            adjacency[room].add(other)
+        return adjacency
+
+    def to_design(self) -> Design:
+        """The current plan as a Design, e.g. to save it or to rebuild from scratch."""
+        return Design.from_dict({"spaces": self.spaces, "panels": {"items": self.panels}})
+
+    def apply(self, diff: dict) -> Set[str]:
+        """
+        Apply a diff of spaces and panels and update the graphs in place.
+
+        The diff mirrors the floorplan JSON: {"spaces": {id: record}, "panels": {id: record}}.
+        A record is merged into the stored one, so {"room_type": "kitchen"} re-types a
+        room and {"start_point": [...]} moves one end of a panel; None deletes the record.
+        Spaces are applied before panels.
+
+        Args:
+            diff (dict): Changed spaces and/or panels keyed by id.
+
+        Returns:
+            set: Nodes of `graph` that were added, removed, changed or gained/lost edges.
+        """
+        touched: Set[str] = set()
+        with tracing.span("plan_graph.apply"):
+            for space_id, record in diff.get("spaces", {}).items():
+                self._set_space(str(space_id), record, touched)
+            for panel_id, record in diff.get("panels", {}).items():
+                self._set_panel(str(panel_id), record, touched)
+        tracing.count("plan_graph.touched", len(touched))
+        return touched
+
+    # -- graph helpers --------------------------------------------------------
+
+    def _set_node(self, node: str, attrs: dict):
+        if node in self.graph:
+            self.graph.nodes[node].clear()
+            self.graph.nodes[node].update(attrs)
+        else:
+            self.graph.add_node(node, **attrs)
+
+    def _remove_edge(self, u: str, v: str, edge_type: str):
+        for key, data in list((self.graph.get_edge_data(u, v) or {}).items()):
+            if data.get("type") == edge_type:
+                self.graph.remove_edge(u, v, key)
+                return
+
+    def _apartment_node(self, name: str, touched: Set[str]) -> str:
+        number = self._apartment_numbers.setdefault(name, len(self._apartment_numbers) + 1)
+        node = f"apartment_{number}"
+        if node not in self.graph:
+            self.graph.add_node(node, type="apartment", name=name)
+            for core in self._cores:
+                self.graph.add_edge(core, node, type="core_to_apartment")
+                touched.add(core)
+        return node
+
+    # -- spaces ---------------------------------------------------------------
+
+    def _set_space(self, space_id: str, record: Optional[dict], touched: Set[str]):
+        old = self.spaces.get(space_id)
+        if record is None and old is None:
+            return
+        node = f"room_{space_id}"
+        touched.add(node)
+        panels = set()
+        if old is not None:
+            panels |= self._unindex_space(space_id, old, touched)
+        if record is None:
+            del self.spaces[space_id]
+            del self._space_order[space_id]
+            touched.update(self.graph.neighbors(node))
+            self.graph.remove_node(node)
+        else:
+            self.spaces[space_id] = {**old, **record} if old is not None else dict(record)
+            self._space_order.setdefault(space_id, next(self._counter))
+            panels |= self._index_space(space_id, self.spaces[space_id], touched)
+        for panel_id in panels:
+            self._link_panel(panel_id, touched)
+
+    def _index_space(self, space_id: str, space: dict, touched: Set[str]) -> set:
+        """Add a space to the graphs; returns the panels that may now belong to it."""
+        node = f"room_{space_id}"
+        room_type, apartment = space.get("room_type", ""), space.get("apartment")
+        outline = parse_outline(space.get("coordinates"))
+        attrs = {"type": "room", "room_type": room_type,
+                 "coordinates": ";".join(f"{x:g},{y:g}" for x, y in outline)}
+        if apartment is not None:
+            attrs["apartment"] = apartment
+        self._set_node(node, attrs)
+
+        if apartment is None and room_type == "core":
+            self._cores.add(node)
+            for number in self._apartment_numbers.values():
+                if f"apartment_{number}" in self.graph:
+                    self.graph.add_edge(node, f"apartment_{number}", type="core_to_apartment")
+        elif apartment not in (None, "UNASSIGNED"):
+            apartment_node = self._apartment_node(apartment, touched)
+            self.graph.add_edge(node, apartment_node, type="belongs_to")
+            self._apartment_rooms[apartment] += 1
+            touched.add(apartment_node)
+
+        panels = set()
+        for point in outline:
+            self._vertex_rooms[_vertex(point)].add(space_id)
+            panels |= self._vertex_panels.get(_vertex(point), set())
+
+        if len(outline) >= 3:
+            polygon = Polygon(outline)
+            self._polygons[space_id] = polygon
+            self.contacts.add_node(node)
+            centroid = np.array(polygon.centroid.coords[0])
+            for other in self._index.query(polygon.bounds):
+                neighbour = self._polygons[other]
+                if not polygon.intersects(neighbour):
+                    continue
+                shared = polygon.boundary.intersection(neighbour.boundary).length
+                if shared > self.min_shared_length:
+                    self.contacts.add_edge(node, f"room_{other}", shared_length=shared,
+                                           distance=float(np.hypot(*(centroid - neighbour.centroid.coords[0]))))
+            self._index.insert(space_id, polygon.bounds)
+        return panels
+
+    def _unindex_space(self, space_id: str, space: dict, touched: Set[str]) -> set:
+        """Remove a space from the graphs; returns the panels that may have belonged to it."""
+        node = f"room_{space_id}"
+        room_type, apartment = space.get("room_type", ""), space.get("apartment")
+        if node in self._cores:
+            self._cores.discard(node)
+            for apartment_node in [n for n in self.graph.neighbors(node) if n.startswith("apartment_")]:
+                self._remove_edge(node, apartment_node, "core_to_apartment")
+        elif apartment not in (None, "UNASSIGNED"):
+            apartment_node = f"apartment_{self._apartment_numbers[apartment]}"
+            self._remove_edge(node, apartment_node, "belongs_to")
+            touched.add(apartment_node)
+            self._apartment_rooms[apartment] -= 1
+            if not self._apartment_rooms[apartment]:
+                del self._apartment_rooms[apartment]
+                touched.update(self.graph.neighbors(apartment_node))
+                self.graph.remove_node(apartment_node)
+
+        panels = set()
+        for point in parse_outline(space.get("coordinates")):
+            rooms = self._vertex_rooms.get(_vertex(point))
+            if rooms is not None:
+                rooms.discard(space_id)
+                if not rooms:
+                    del self._vertex_rooms[_vertex(point)]
+            panels |= self._vertex_panels.get(_vertex(point), set())
+
+        if self._polygons.pop(space_id, None) is not None:
+            self._index.remove(space_id)
+            self.contacts.remove_node(node)
+        return panels
+
+    # -- panels ---------------------------------------------------------------
+
+    def _set_panel(self, panel_id: str, record: Optional[dict], touched: Set[str]):
+        old = self.panels.get(panel_id)
+        if record is None and old is None:
+            return
+        touched.add(panel_id)
+        if old is not None:
+            self._unindex_panel(panel_id, old, touched)
+        if record is None:
+            del self.panels[panel_id]
+            del self._panel_order[panel_id]
+            touched.update(self.graph.neighbors(panel_id))
+            self.graph.remove_node(panel_id)
+        else:
+            self.panels[panel_id] = {**old, **record} if old is not None else dict(record)
+            self._panel_order.setdefault(panel_id, next(self._counter))
+            self._index_panel(panel_id, self.panels[panel_id], touched)
+
+    def _endpoint_keys(self, panel: dict) -> List[tuple]:
+        """Keys of the shared-endpoint groups of findAdj01a.compute_room_adjacency."""
+        if panel.get("room") is None:
+            return []
+        keys = []
+        for end, name in enumerate(("start_point", "end_point")):
+            point = parse_point(panel.get(name))
+            if not np.isnan(point).any():
+                keys.append((end, panel.get("apartment"), tuple(point)))
+        return keys
+
+    def _face_key(self, panel: dict) -> Optional[frozenset]:
+        start, end = parse_point(panel.get("start_point")), parse_point(panel.get("end_point"))
+        if np.isnan(start[:2]).any() or np.isnan(end[:2]).any():
+            return None
+        return frozenset((_vertex(start), _vertex(end)))
+
+    def _face_edges(self, key: frozenset, add: bool, touched: Set[str]):
+        """Add or remove the 'identical' edges from the first panel of a face to the others."""
+        members = self._faces.get(key, [])
+        for other in members[1:]:
+            if add:
+                self.graph.add_edge(members[0], other, type="identical")
+            else:
+                self._remove_edge(members[0], other, "identical")
+        touched.update(members)
+
+    def _index_panel(self, panel_id: str, panel: dict, touched: Set[str]):
+        start, end = parse_point(panel.get("start_point")), parse_point(panel.get("end_point"))
+        attrs = {"type": "wall", "panel_type": panel.get("panel_type", ""),
+                 "start_point": str([float(v) for v in start]),
+                 "end_point": str([float(v) for v in end]),
+                 "height": float(panel.get("height") or 0.0),
+                 "thickness": float(panel.get("thickness") or 0.0)}
+        if panel.get("room") is not None:
+            attrs["room_type"] = panel["room"]
+        if panel.get("apartment") is not None:
+            attrs["apartment"] = panel["apartment"]
+        self._set_node(panel_id, attrs)
+
+        room = panel.get("room")
+        for key in self._endpoint_keys(panel):
+            group = self._groups[key]
+            if not group[room]:
+                for other in group:
+                    self._pairs[(room, other)] += 1
+                    self._pairs[(other, room)] += 1
+            group[room] += 1
+
+        for point in (start, end):
+            if not np.isnan(point[:2]).any():
+                self._vertex_panels[_vertex(point)].add(panel_id)
+
+        key = self._face_key(panel)
+        if key is not None:
+            self._face_edges(key, False, touched)
+            members = self._faces[key]
+            members.append(panel_id)
+            members.sort(key=self._panel_order.get)
+            self._face_edges(key, True, touched)
+
+        self._link_panel(panel_id, touched)
+
+    def _unindex_panel(self, panel_id: str, panel: dict, touched: Set[str]):
+        room = panel.get("room")
+        for key in self._endpoint_keys(panel):
+            group = self._groups[key]
+            group[room] -= 1
+            if not group[room]:
+                del group[room]
+                for other in group:
+                    for pair in ((room, other), (other, room)):
+                        self._pairs[pair] -= 1
+                        if not self._pairs[pair]:
+                            del self._pairs[pair]
+            if not group:
+                del self._groups[key]
+
+        for name in ("start_point", "end_point"):
+            point = parse_point(panel.get(name))
+            if np.isnan(point[:2]).any():
+                continue
+            vertex = _vertex(point)
+            panels = self._vertex_panels.get(vertex)
+            if panels is not None:
+                panels.discard(panel_id)
+                if not panels:
+                    del self._vertex_panels[vertex]
+
+        key = self._face_key(panel)
+        if key is not None:
+            self._face_edges(key, False, touched)
+            self._faces[key].remove(panel_id)
+            self._face_edges(key, True, touched)
+            if not self._faces[key]:
+                del self._faces[key]
+
+        room_node = self._panel_room.pop(panel_id, None)
+        if room_node is not None:
+            self._remove_edge(room_node, panel_id, "belongs_to")
+            touched.add(room_node)
+
+    def _link_panel(self, panel_id: str, touched: Set[str]):
+        """Attach a panel to the first room of its apartment and type with both ends as vertices."""
+        panel = self.panels[panel_id]
+        key = self._face_key(panel)
+        room = None
+        if key is not None:
+            candidates = set.intersection(*(self._vertex_rooms.get(v, set()) for v in key))
+            wanted = (panel.get("apartment"), panel.get("room"))
+            matches = [s for s in candidates
+                       if (self.spaces[s].get("apartment"), self.spaces[s].get("room_type", "")) == wanted]
+            if matches:
+                room = f"room_{min(matches, key=self._space_order.get)}"
+
+        current = self._panel_room.get(panel_id)
+        if room == current:
+            return
+        if current is not None:
+            self._remove_edge(current, panel_id, "belongs_to")
+            touched.update((current, panel_id))
+            del self._panel_room[panel_id]
+        if room is not None:
+            self.graph.add_edge(room, panel_id, type="belongs_to")
+            self._panel_room[panel_id] = room
+            touched.update((room, panel_id))
+
+
+def spaces_diff(rooms: Iterable) -> dict:
+    """
+    Diff for PlanGraph.apply() from modify_plan.Room objects whose geometry changed.
+
+    Lets the optimizer push its edits (e.g. after _apply_fit) into the graph
+    without rebuilding it. Rooms whose geometry is not a single polygon are skipped.
+    """
+    spaces = {}
+    for room in rooms:
+        if isinstance(room.geometry, Polygon):
+            spaces[room.id] = {
+                "room_type": room.type,
+                "coordinates": [{"x": float(x), "y": float(y), "z": 0}
+                                for x, y in room.geometry.exterior.coords],
+            }
+    return {"spaces": spaces}
+
+
+def graph_differences(G1, G2) -> List[str]:
+    """Describe the node attribute and typed edge differences between two room/panel graphs."""
+    problems = []
+    for node in set(G1) ^ set(G2):
+        problems.append(f"node {node} only in {'first' if node in G1 else 'second'} graph")
+    for node in set(G1) & set(G2):
+        if G1.nodes[node] != G2.nodes[node]:
+            problems.append(f"node {node}: {G1.nodes[node]} != {G2.nodes[node]}")
+
+    def typed_edges(G):
+        return Counter((frozenset((u, v)), d.get("type")) for u, v, d in G.edges(data=True))
+
+    edges_1, edges_2 = typed_edges(G1), typed_edges(G2)
+    for edge, n in ((edges_1 - edges_2) + (edges_2 - edges_1)).items():
+        problems.append(f"edge {sorted(edge[0])} ({edge[1]}) differs by {n}")
+    return problems
+
+
+def check_against_rebuild(plan: PlanGraph) -> List[str]:
+    """Rebuild graph and room adjacency from scratch and report where the incremental state differs."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "findAdjanencies_readandParseJson_EP"))
+    from findAdj01a import compute_room_adjacency
+
+    design = plan.to_design()
+    problems = graph_differences(plan.graph, build_design_graph(design))
+    rebuilt = compute_room_adjacency(design)
+    if dict(plan.room_adjacency) != dict(rebuilt):
+        problems.append("room_adjacency differs from compute_room_adjacency")
+    return problems
+
+
+def random_edit(plan: PlanGraph, rng: np.random.Generator, step: float = 0.1) -> dict:
+    """
+    A random single edit: move one panel end, re-type one room or shift one room vertex.
+
+    A plan without spaces always gets a panel edit; one without panels or
+    spaces gets an empty diff.
+    """
+    kind = rng.integers(3)
+    if not plan.spaces and not plan.panels:
+        return {}
+    if (kind == 0 or not plan.spaces) and plan.panels:
+        panel_id = list(plan.panels)[rng.integers(len(plan.panels))]
+        name = ("start_point", "end_point")[rng.integers(2)]
+        point = list(plan.panels[panel_id].get(name) or [0.0, 0.0, 0.0])
+        point[rng.integers(2)] += float(rng.choice([-step, step]))
+        return {"panels": {panel_id: {name: point}}}
+    space_id = list(plan.spaces)[rng.integers(len(plan.spaces))]
+    if kind == 1:
+        types = sorted({s.get("room_type", "") for s in plan.spaces.values()})
+        return {"spaces": {space_id: {"room_type": types[rng.integers(len(types))]}}}
+    coordinates = [dict(pt) for pt in plan.spaces[space_id].get("coordinates", [])]
+    if coordinates:
+        i = int(rng.integers(len(coordinates)))
+        coordinates[i]["x"] += float(rng.choice([-step, step]))
+    return {"spaces": {space_id: {"coordinates": coordinates}}}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Keep the room/panel graph and room adjacency of a floorplan up to date under edits."
+    )
+    parser.add_argument("json_path", type=str, help="Path to the floorplan JSON file")
+    parser.add_argument("--diff", type=str, nargs="*", default=[],
+                        help='Diff JSON files to apply in order, e.g. {"spaces": {"3": {"room_type": "kitchen"}}}')
+    parser.add_argument("--random-edits", type=int, default=0,
+                        help="Apply this many random edits and compare the time with full rebuilds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true",
+                        help="Verify the result against a rebuild from scratch")
+    parser.add_argument("--output", type=str, default=None, help="GraphML file for the updated graph")
+    parser.add_argument("--json-output", type=str, default=None,
+                        help="Floorplan JSON with the edits and a 'room_adjacency' key")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    plan = PlanGraph.from_json(args.json_path)
+    print(f"Built graph in {(time.perf_counter() - start) * 1e3:.1f} ms: "
+          f"{plan.graph.number_of_nodes()} nodes, {plan.graph.number_of_edges()} edges, "
+          f"{plan.contacts.number_of_edges()} room contacts")
+
+    for path in args.diff:
+        with open(path, "r", encoding="utf-8") as f:
+            touched = plan.apply(json.load(f))
+        print(f"{path}: {len(touched)} nodes touched")
+
+    if args.random_edits:
+        rng = np.random.default_rng(args.seed)
+        start = time.perf_counter()
+        for _ in range(args.random_edits):
+            plan.apply(random_edit(plan, rng))
+        incremental = (time.perf_counter() - start) / args.random_edits
+        start = time.perf_counter()
+        build_design_graph(plan.to_design())
+        rebuild = time.perf_counter() - start
+        print(f"{args.random_edits} random edits: {incremental * 1e3:.3f} ms per edit, "
+              f"full rebuild {rebuild * 1e3:.1f} ms ({rebuild / incremental:.0f}x)")
+
+    if args.check:
+        problems = check_against_rebuild(plan)
+        for problem in problems[:20]:
+            print(problem)
+        print(f"{len(problems)} differences from a rebuild")
+        if problems:
+            sys.exit(1)
+
+    if args.output:
+        nx.write_graphml(plan.graph, args.output)
+        print(f"Graph saved to {args.output}")
+    if args.json_output:
+        # The input JSON with the edited records, so unrelated keys and value types survive.
+        with open(args.json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["spaces"] = plan.spaces
+        data.setdefault("panels", {})["items"] = plan.panels
+        data["room_adjacency"] = {room: sorted(rooms) for room, rooms in plan.room_adjacency.items()}
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        print(f"Floorplan saved to {args.json_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from shapely.geometry import Polygon, box
+
+from modify_plan import CorridorPrefab, PrefabPart
+
+
+def footprint_dimensions(geom: Polygon) -> Tuple[float, float]:
+    """
+    Return the (length, width) of the minimum rotated rectangle of a geometry.
+
+    The length is always the longer side, so footprints can be compared
+    independently of their orientation.
+
+    Args:
+        geom (Polygon): Room or prefab geometry.
+
+    Returns:
+        tuple: (length, width) with length >= width.
+    """
+    mrr = geom.minimum_rotated_rectangle
+    if mrr.geom_type != "Polygon":
+        return 0.0, 0.0
+    coords = np.asarray(mrr.exterior.coords)
+    sides = np.hypot(*np.diff(coords[:3], axis=0).T)
+    return float(sides.max()), float(sides.min())
+
+
+def prefab_from_definition(definition: dict) -> PrefabPart:
+    """
+    Build a PrefabPart (or CorridorPrefab) from a catalog definition.
+
+    A definition carries a "type", a "max_area" and either a "footprint" given as
+    a list of [x, y] points or a rectangular "length"/"width" pair. Corridor
+    definitions additionally carry "max_length" and "max_width".
+
+    Args:
+        definition (dict): A single catalog entry.
+
+    Returns:
+        PrefabPart: The prefab described by the definition.
+    """
+    if "footprint" in definition:
+        geometry = Polygon([(float(x), float(y)) for x, y in definition["footprint"]])
+    else:
+        geometry = box(0, 0, float(definition["length"]), float(definition["width"]))
+
+    part_type = definition["type"].lower()
+    max_area = float(definition.get("max_area", geometry.area))
+    if part_type == "corridor":
+        length, width = footprint_dimensions(geometry)
+        part = CorridorPrefab(
+            geometry=geometry,
+            max_area=max_area,
+            max_length=float(definition.get("max_length", length)),
+            max_width=float(definition.get("max_width", width)),
+        )
+    else:
+        part = PrefabPart(part_type, geometry, max_area)
+    part.sku = definition.get("sku")
+    return part
+
+
+class _TypeIndex:
+    """Footprint index for the prefabs of a single room type, sorted by length."""
+
+    def __init__(self, parts: List[PrefabPart]):
+        dims = np.array([footprint_dimensions(p.geometry) for p in parts], dtype=float)
+        dims = dims.reshape(-1, 2)
+        order = np.argsort(dims[:, 0], kind="stable")
+        self.parts = [parts[i] for i in order]
+        self.lengths = dims[order, 0]
+        self.widths = dims[order, 1]
+        self.areas = np.array([p.geometry.area for p in self.parts], dtype=float)
+
+    def query(self, length: float, width: float, area: float) -> np.ndarray:
+        # Every prefab past this position is longer than the room, so only the
+        # prefix has to be filtered on width and area.
+        stop = np.searchsorted(self.lengths, length, side="right")
+        mask = (self.widths[:stop] <= width) & (self.areas[:stop] <= area)
+        return np.flatnonzero(mask)
+
+
+class PrefabCatalog:
+    """
+    Kit-of-parts catalog indexed by footprint dimensions.
+
+    Prefabs are grouped by room type and sorted by the length of their minimum
+    rotated rectangle. A fit query bisects on the room length and filters the
+    remaining prefix on width and area with a single vectorized comparison.
+    """
+
+    def __init__(self, parts: Iterable[PrefabPart], tolerance: float = 1e-6):
+        self.tolerance = tolerance
+        grouped: Dict[str, List[PrefabPart]] = {}
+        for part in parts:
+            grouped.setdefault(part.type, []).append(part)
+        self._indexes = {t: _TypeIndex(p) for t, p in grouped.items()}
+
+    @classmethod
+    def from_definitions(cls, definitions: Iterable[dict], **kwargs) -> "PrefabCatalog":
+        return cls([prefab_from_definition(d) for d in definitions], **kwargs)
+
+    @classmethod
+    def load(cls, json_path: str, **kwargs) -> "PrefabCatalog":
+        """
+        Load a catalog from a JSON file.
+
+        The file holds either a list of definitions or an object with a
+        "prefabs" list (see prefab_from_definition for the entry format).
+        """
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("prefabs", [])
+        return cls.from_definitions(data, **kwargs)
+
+    @property
+    def types(self) -> List[str]:
+        return sorted(self._indexes)
+
+    def __len__(self) -> int:
+        return sum(len(index.parts) for index in self._indexes.values())
+
+    def parts(self, room_type: Optional[str] = None) -> List[PrefabPart]:
+        if room_type is not None:
+            index = self._indexes.get(room_type)
+            return list(index.parts) if index else []
+        return [p for index in self._indexes.values() for p in index.parts]
+
+    def fitting_prefabs(self, room_geometry: Polygon,
+                        room_type: Optional[str] = None) -> List[PrefabPart]:
+        """
+        Return the prefabs whose footprint fits inside the room's minimum rotated rectangle.
+
+        Args:
+            room_geometry (Polygon): Room outline.
+            room_type (str): Restrict the query to one room type; all types if None.
+
+        Returns:
+            list: Matching prefabs, shortest first within each type.
+        """
+        length, width = footprint_dimensions(room_geometry)
+        return self.fitting_dimensions(length, width, room_geometry.area, room_type)
+
+    def fitting_dimensions(self, length: float, width: float,
+                           area: float = np.inf,
+                           room_type: Optional[str] = None) -> List[PrefabPart]:
+        """Same as fitting_prefabs, for a room already reduced to its footprint."""
+        if width > length:
+            length, width = width, length
+        tol = self.tolerance
+        if room_type is not None:
+            index = self._indexes.get(room_type)
+            indexes = [index] if index else []
+        else:
+            indexes = self._indexes.values()
+
+        matches = []
+        for index in indexes:
+            hits = index.query(length + tol, width + tol, area + tol)
+            matches.extend(index.parts[i] for i in hits)
+        return matches
+
+    def largest_fitting(self, room_geometry: Polygon, room_type: str) -> Optional[PrefabPart]:
+        """Return the fitting prefab of a room type with the largest footprint area."""
+        candidates = self.fitting_prefabs(room_geometry, room_type)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda p: p.geometry.area)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Query a kit-of-parts catalog for prefabs fitting a room footprint."
+    )
+    parser.add_argument("catalog", type=str, help="Path to the prefab catalog JSON")
+    parser.add_argument("length", type=float, help="Room length (m)")
+    parser.add_argument("width", type=float, help="Room width (m)")
+    parser.add_argument("--room-type", type=str, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    catalog = PrefabCatalog.load(args.catalog)
+
+    start = time.perf_counter()
+    matches = catalog.fitting_dimensions(args.length, args.width, room_type=args.room_type)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(matches)} of {len(catalog)} prefabs fit ({elapsed * 1e6:.1f} µs)")
+    for part in matches:
+        length, width = footprint_dimensions(part.geometry)
+        print(f"  {part.type:<10} {part.sku or '-':<16} {length:.2f} x {width:.2f}")
+
+
+if __name__ == "__main__":
+    main()
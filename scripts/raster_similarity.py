@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+import tracing
+from floorplan_io import Design, find_design_files, load_design
+
+
+# One occupancy channel per room type; every other type goes to the last channel.
+ROOM_CHANNELS = ("bathroom", "kitchen", "corridor", "living_room", "bedroom", "core", "other")
+
+
+class ApartmentLayout(NamedTuple):
+    file: str
+    apartment: str
+    outlines: List[np.ndarray]   # canonically aligned (n, 2) outlines
+    channels: np.ndarray         # channel index of each outline
+
+
+def canonical_outlines(outlines: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Rotate outlines so the principal axis of their vertices lies along x and centre their bounds on the origin.
+
+    The longer side ends up along x. Mirror images are handled when
+    comparing (see layout_iou), not here.
+    """
+    points = np.concatenate(outlines)
+    centre = points.mean(axis=0)
+    _, vectors = np.linalg.eigh(np.cov((points - centre).T))
+    axis = vectors[:, -1]
+    angle = np.arctan2(axis[1], axis[0])
+    rotation = np.array([[np.cos(-angle), -np.sin(-angle)], [np.sin(-angle), np.cos(-angle)]])
+    rotated = [(outline - centre) @ rotation.T for outline in outlines]
+    points = np.concatenate(rotated)
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    if hi[1] - lo[1] > hi[0] - lo[0]:
+        rotated = [outline[:, ::-1] * [1, -1] for outline in rotated]
+        points = np.concatenate(rotated)
+        lo, hi = points.min(axis=0), points.max(axis=0)
+    middle = (lo + hi) / 2
+    return [outline - middle for outline in rotated]
+
+
+def apartment_layouts(design: Design, file: Optional[str] = None) -> List[ApartmentLayout]:
+    """Canonically aligned room outlines of every apartment (core spaces without apartment are skipped)."""
+    table = design.spaces
+    valid = table.vertex_counts() >= 3
+    layouts = []
+    for name, indices in design.apartment_spaces().items():
+        indices = [i for i in indices if valid[i]]
+        if name in (None, "UNASSIGNED") or not indices:
+            continue
+        channels = np.array([ROOM_CHANNELS.index(t) if t in ROOM_CHANNELS else len(ROOM_CHANNELS) - 1
+                             for t in (table.room_type(i) for i in indices)], dtype=np.int64)
+        layouts.append(ApartmentLayout(file or design.name, name,
+                                       canonical_outlines([table.outline(i) for i in indices]), channels))
+    return layouts
+
+
+def grid_size(layouts: List[ApartmentLayout], cell: float) -> int:
+    """Smallest even grid side (in cells) that holds every layout."""
+    extent = max((np.abs(np.concatenate(layout.outlines)).max() for layout in layouts), default=0.0)
+    size = int(np.ceil(2 * extent / cell)) + 2
+    return size + size % 2
+
+
+def rasterize(layout: ApartmentLayout, cell: float, size: int) -> np.ndarray:
+    """
+    (channels, size, size) boolean occupancy grid of one layout, centred on the origin.
+
+    A cell is occupied when its centre lies inside a room of that channel;
+    only the cells within each room's bounds are tested.
+    """
+    grid = np.zeros((len(ROOM_CHANNELS), size, size), dtype=bool)
+    centres = (np.arange(size) - size / 2 + 0.5) * cell
+    for outline, channel in zip(layout.outlines, layout.channels):
+        polygon = Polygon(outline)
+        x0, y0, x1, y1 = polygon.bounds
+        cols = slice(max(0, int(np.floor(x0 / cell + size / 2))), min(size, int(np.ceil(x1 / cell + size / 2))))
+        rows = slice(max(0, int(np.floor(y0 / cell + size / 2))), min(size, int(np.ceil(y1 / cell + size / 2))))
+        x, y = np.meshgrid(centres[cols], centres[rows])
+        grid[channel, rows, cols] |= shapely.contains_xy(polygon, x, y)
+    return grid
+
+
+def _flips(grids: np.ndarray) -> np.ndarray:
+    """The four mirror images of (n, C, H, W) grids about their centre: (4, n, C, H, W)."""
+    return np.stack([grids, grids[..., ::-1], grids[..., ::-1, :], grids[..., ::-1, ::-1]])
+
+
+@tracing.traced("raster.layout_iou")
+def layout_iou(queries: np.ndarray, references: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-channel IoU between every query and every reference grid, after the best mirroring.
+
+    Intersections for a whole batch are one matrix product per channel and
+    mirror image. Channels empty in both grids are left out of the mean.
+
+    Args:
+        queries (np.ndarray): (n, C, H, W) boolean grids.
+        references (np.ndarray): (m, C, H, W) boolean grids.
+
+    Returns:
+        tuple: (scores (n, m) mean IoU over the channels present,
+                per_channel (n, m, C) IoU of the best mirror image, NaN where absent).
+    """
+    n, channels = queries.shape[:2]
+    q = queries.reshape(n, channels, -1).astype(np.float32)
+    q_counts = q.sum(axis=2)                                          # (n, C)
+
+    best_scores = np.full((n, len(references)), -1.0)
+    best_channels = np.full((n, len(references), channels), np.nan)
+    for mirrored in _flips(references):
+        r = mirrored.reshape(len(references), channels, -1).astype(np.float32)
+        r_counts = r.sum(axis=2)                                      # (m, C)
+        intersection = np.stack([q[:, c] @ r[:, c].T for c in range(channels)], axis=2)
+        union = q_counts[:, None, :] + r_counts[None, :, :] - intersection
+        present = union > 0
+        iou = np.where(present, intersection / np.where(present, union, 1.0), np.nan)
+        scores = np.nansum(iou, axis=2) / np.maximum(present.sum(axis=2), 1)
+        better = scores > best_scores
+        best_scores[better] = scores[better]
+        best_channels[better] = iou[better]
+    return best_scores, best_channels
+
+
+def layout_similarity(paths: List[str], reference_paths: List[str], cell: float = 0.25) -> List[dict]:
+    """
+    Compare every apartment of every design with the apartments of each reference design.
+
+    Returns:
+        list: One row per (file, apartment, reference) with the best-matching reference
+              apartment, its mean IoU ('layout_iou') and the per-room-type IoUs.
+    """
+    layouts = [layout for path in paths for layout in apartment_layouts(load_design(path), os.path.basename(path))]
+    reference_layouts = {path: apartment_layouts(load_design(path), os.path.basename(path))
+                         for path in reference_paths}
+    size = grid_size(layouts + [l for group in reference_layouts.values() for l in group], cell)
+    with tracing.span("raster.rasterize", apartments=len(layouts)):
+        grids = np.stack([rasterize(layout, cell, size) for layout in layouts]) if layouts else None
+
+    rows = []
+    for path, group in reference_layouts.items():
+        if grids is None or not group:
+            continue
+        scores, per_channel = layout_iou(grids, np.stack([rasterize(l, cell, size) for l in group]))
+        best = scores.argmax(axis=1)
+        for i, layout in enumerate(layouts):
+            row = {"file": layout.file, "apartment": layout.apartment,
+                   "reference": os.path.basename(path),
+                   "reference_apartment": group[best[i]].apartment,
+                   "layout_iou": float(scores[i, best[i]])}
+            for c, name in enumerate(ROOM_CHANNELS):
+                value = per_channel[i, best[i], c]
+                row[f"iou_{name}"] = "" if np.isnan(value) else float(value)
+            rows.append(row)
+    return rows
+
+
+def add_layout_column(ratios_csv: str, rows: List[dict], output_csv: str, reference: str):
+    """Copy a compute_iou ratios CSV (e.g. naive_ratios.csv) with a 'layout_iou' column for one reference."""
+    scores: Dict[tuple, float] = {(r["file"], r["apartment"]): r["layout_iou"]
+                                  for r in rows if r["reference"] == reference}
+    with open(ratios_csv, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames) + ["layout_iou"]
+        records = [dict(record, layout_iou=scores.get((record["file"], record["apartment"]), ""))
+                   for record in reader]
+    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare apartment layouts by per-room-type IoU of their occupancy grids."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--references", type=str, nargs="+", required=True,
+                        help="Reference design JSON files")
+    parser.add_argument("--cell", type=float, default=0.25, help="Grid cell size in metres")
+    parser.add_argument("--output", type=str, default=None, help="CSV file for the scores")
+    parser.add_argument("--ratios", type=str, default=None,
+                        help="compute_iou ratios CSV (e.g. naive_ratios.csv) to extend with a layout_iou column")
+    parser.add_argument("--ratios-output", type=str, default=None,
+                        help="Where to write the extended ratios CSV (default: <ratios>_layout.csv)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    start = time.perf_counter()
+    rows = layout_similarity(find_design_files(args.base_folder), args.references, args.cell)
+    elapsed = time.perf_counter() - start
+
+    for row in rows:
+        print(f"{row['file']:<40} {row['apartment']:<14} -> {row['reference']:<18} "
+              f"{row['reference_apartment']:<14} layout IoU {row['layout_iou']:.3f}")
+    print(f"{len(rows)} apartment comparisons in {elapsed:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["file", "apartment"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {args.output}")
+
+    if args.ratios:
+        output = args.ratios_output or os.path.splitext(args.ratios)[0] + "_layout.csv"
+        add_layout_column(args.ratios, rows, output, os.path.basename(args.references[0]))
+        print(f"Ratios with layout IoU against {os.path.basename(args.references[0])} saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
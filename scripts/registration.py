@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import tracing
+from floorplan_io import Design, find_design_files, load_design
+
+
+class Registration(NamedTuple):
+    """Rigid (optionally mirrored) 2D transform taking the generic walls onto the reference walls."""
+
+    matrix: np.ndarray      # 3x3 homogeneous transform
+    rotation: float         # degrees in (-180, 180], applied after mirroring
+    translation: Tuple[float, float]
+    mirrored: bool          # x is negated before rotating
+    residual: float         # RMS distance of the kept (trimmed) points to the nearest reference wall
+    inliers: float          # fraction of all points within inlier_distance of a reference wall
+    iterations: int
+
+
+def wall_segments(design: Design) -> np.ndarray:
+    """
+    (m, 2, 2) array of distinct wall segments in plan.
+
+    Both faces of a shared wall are stored as separate panels with the same
+    endpoints; they are kept once. Panels with missing or equal endpoints are skipped.
+    """
+    panels = design.panels
+    segments = np.stack([panels.start[:, :2], panels.end[:, :2]], axis=1)
+    valid = ~np.isnan(segments).any(axis=(1, 2)) & (panels.lengths() > 1e-9)
+    segments = segments[valid]
+    # Order the two ends so reversed duplicates compare equal, then drop duplicates.
+    flip = (segments[:, 0, 0] > segments[:, 1, 0]) | (
+        (segments[:, 0, 0] == segments[:, 1, 0]) & (segments[:, 0, 1] > segments[:, 1, 1]))
+    segments[flip] = segments[flip][:, ::-1]
+    _, first = np.unique(np.round(segments.reshape(-1, 4), 6), axis=0, return_index=True)
+    return segments[np.sort(first)]
+
+
+def sample_segments(segments: np.ndarray, spacing: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Points every `spacing` along each segment (both ends included).
+
+    Returns:
+        tuple: (points (k, 2), owner (k,)) where owner is the index of the segment of each point.
+    """
+    lengths = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+    counts = np.maximum(np.ceil(lengths / spacing).astype(np.int64), 1) + 1
+    owner = np.repeat(np.arange(len(segments)), counts)
+    starts = np.cumsum(counts) - counts
+    t = (np.arange(counts.sum()) - np.repeat(starts, counts)) / np.repeat(counts - 1, counts)
+    a, b = segments[owner, 0], segments[owner, 1]
+    return a + t[:, None] * (b - a), owner
+
+
+class SegmentIndex:
+    """
+    Nearest-segment queries over a set of wall segments.
+
+    A cKDTree over points sampled densely along the segments proposes the
+    `candidates` nearest segments; the exact point-to-segment projection then
+    picks the closest. Built once per reference and reused for every query.
+    """
+
+    __slots__ = ("segments", "tree", "owner", "candidates")
+
+    def __init__(self, segments: np.ndarray, spacing: float = 0.1, candidates: int = 4):
+        self.segments = segments
+        points, self.owner = sample_segments(segments, spacing)
+        self.tree = cKDTree(points)
+        self.candidates = min(candidates, len(points))
+
+    def nearest(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Closest point on any segment and its distance, for each of the (n, 2) points."""
+        _, idx = self.tree.query(points, k=self.candidates)
+        idx = idx.reshape(len(points), -1)
+        seg = self.segments[self.owner[idx]]                      # (n, k, 2, 2)
+        a, ab = seg[:, :, 0], seg[:, :, 1] - seg[:, :, 0]
+        t = np.einsum("nkd,nkd->nk", points[:, None] - a, ab) / np.maximum(
+            np.einsum("nkd,nkd->nk", ab, ab), 1e-12)
+        projected = a + np.clip(t, 0.0, 1.0)[..., None] * ab
+        distances = np.linalg.norm(points[:, None] - projected, axis=2)
+        best = distances.argmin(axis=1)
+        rows = np.arange(len(points))
+        return projected[rows, best], distances[rows, best]
+
+
+def _transform(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def _rigid_fit(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Least-squares rotation + translation (Kabsch, no reflection) mapping source onto target."""
+    mu_s, mu_t = source.mean(axis=0), target.mean(axis=0)
+    u, _, vt = np.linalg.svd((source - mu_s).T @ (target - mu_t))
+    d = np.sign(np.linalg.det(vt.T @ u.T)) or 1.0
+    rotation = vt.T @ np.diag([1.0, d]) @ u.T
+    matrix = np.eye(3)
+    matrix[:2, :2] = rotation
+    matrix[:2, 2] = mu_t - rotation @ mu_s
+    return matrix
+
+
+def _icp(points: np.ndarray, index: SegmentIndex, matrix: np.ndarray, iterations: int,
+         tolerance: float, trim: float):
+    residual, previous = np.inf, np.inf
+    for iteration in range(1, iterations + 1):
+        moved = _transform(matrix, points)
+        closest, distances = index.nearest(moved)
+        keep = distances <= np.quantile(distances, trim)
+        matrix = _rigid_fit(moved[keep], closest[keep]) @ matrix
+        residual = float(np.sqrt(np.mean(distances[keep] ** 2)))
+        if previous - residual < tolerance:
+            break
+        previous = residual
+    _, distances = index.nearest(_transform(matrix, points))
+    keep = distances <= np.quantile(distances, trim)
+    return matrix, float(np.sqrt(np.mean(distances[keep] ** 2))), distances, iteration
+
+
+def dominant_direction(segments: np.ndarray) -> float:
+    """
+    Length-weighted mean wall direction modulo 90°, in radians in [0, pi/2).
+
+    Plans are mostly rectilinear, so the directions are averaged on the
+    circle after multiplying them by 4, which maps walls at right angles
+    to each other onto the same value.
+    """
+    d = segments[:, 1] - segments[:, 0]
+    lengths = np.hypot(d[:, 0], d[:, 1])
+    angles = 4 * np.arctan2(d[:, 1], d[:, 0])
+    return float(np.arctan2((lengths * np.sin(angles)).sum(), (lengths * np.cos(angles)).sum()) / 4 % (np.pi / 2))
+
+
+@tracing.traced("registration.register")
+def register(source: np.ndarray, target, spacing: float = 0.25, iterations: int = 50,
+             tolerance: float = 1e-6, trim: float = 0.9, inlier_distance: float = 0.1,
+             angles: Tuple[float, ...] = (0.0, 90.0, 180.0, 270.0),
+             mirror: bool = True, coarse_iterations: int = 8, align: bool = True) -> Registration:
+    """
+    Align wall segments of one plan to the walls of another with trimmed ICP.
+
+    Points sampled along the source walls are matched to the nearest target
+    wall, and the rigid transform is re-estimated from the closest
+    `trim` fraction of matches until the residual stops improving. The
+    loop is started from the centroid alignment at each of `angles`, with
+    and without mirroring; the start with the lowest residual after
+    `coarse_iterations` is refined further.
+
+    With `align`, the angles are taken relative to the rotation that lines
+    up the dominant wall directions of the two plans (modulo 90°), so any
+    rotation of the source is covered. ICP only converges within about
+    ±25° of a start: without `align`, or for plans with no dominant wall
+    direction (e.g. many diagonal walls), a source rotated further than
+    that from every start ends in a wrong local minimum.
+
+    Args:
+        source (np.ndarray): (m, 2, 2) wall segments to move (see wall_segments).
+        target (np.ndarray or SegmentIndex): Wall segments to align to, or a prebuilt index.
+        spacing (float): Distance between the points sampled on the source walls.
+        iterations (int): Maximum ICP iterations per start.
+        tolerance (float): Stop when the residual improves by less than this.
+        trim (float): Fraction of the closest matches used to fit each step.
+        inlier_distance (float): Distance counted as a match for Registration.inliers.
+        angles (tuple): Initial rotations in degrees.
+        align (bool): Offset the initial rotations by the dominant wall direction difference.
+        mirror (bool): Also try the mirrored source.
+        coarse_iterations (int): Iterations given to every start before picking one.
+
+    Returns:
+        Registration: The best transform found.
+    """
+    index = target if isinstance(target, SegmentIndex) else SegmentIndex(target)
+    if not len(source) or not len(index.segments):
+        raise ValueError("both plans need at least one wall segment")
+    points, _ = sample_segments(source, spacing)
+    source_centre = points.mean(axis=0)
+    target_centre = index.tree.data.mean(axis=0)
+
+    # Every start gets a few iterations; only the best one is refined to convergence.
+    starts = []
+    source_direction = dominant_direction(source) if align else 0.0
+    target_direction = dominant_direction(index.segments) if align else 0.0
+    for mirrored in ((False, True) if mirror else (False,)):
+        flip = np.diag([-1.0 if mirrored else 1.0, 1.0, 1.0])
+        # Mirroring in x turns a wall direction a into -a.
+        offset = target_direction - (-source_direction if mirrored else source_direction)
+        for angle in angles:
+            theta = offset + np.radians(angle)
+            start = np.eye(3)
+            start[:2, :2] = [[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]]
+            start[:2, 2] = target_centre - start[:2, :2] @ (flip[:2, :2] @ source_centre)
+            matrix, residual, _, used = _icp(points, index, start @ flip, min(coarse_iterations, iterations),
+                                             tolerance, trim)
+            starts.append((residual, used, matrix, mirrored))
+    _, coarse_used, matrix, mirrored = min(starts, key=lambda s: s[0])
+    matrix, residual, distances, used = _icp(points, index, matrix, iterations, tolerance, trim)
+
+    linear = matrix[:2, :2] @ np.diag([-1.0 if mirrored else 1.0, 1.0])
+    return Registration(
+        matrix=matrix,
+        rotation=float(np.degrees(np.arctan2(linear[1, 0], linear[0, 0]))),
+        translation=(float(matrix[0, 2]), float(matrix[1, 2])),
+        mirrored=mirrored,
+        residual=residual,
+        inliers=float(np.mean(distances <= inlier_distance)),
+        iterations=coarse_used + used,
+    )
+
+
+def register_designs(generic: Design, reference: Design, **kwargs) -> Registration:
+    return register(wall_segments(generic), wall_segments(reference), **kwargs)
+
+
+_references: List[Tuple[str, SegmentIndex]] = []
+
+
+def _init_worker(reference_paths: List[str]):
+    global _references
+    _references = [(path, SegmentIndex(wall_segments(load_design(path)))) for path in reference_paths]
+
+
+def _register_file(path: str) -> List[dict]:
+    segments = wall_segments(load_design(path))
+    rows = []
+    for reference_path, index in _references:
+        start = time.perf_counter()
+        try:
+            result = register(segments, index)
+        except ValueError as e:
+            print(f"Skipping {path} against {reference_path}: {e}")
+            continue
+        rows.append({
+            "file": os.path.basename(path),
+            "reference": os.path.basename(reference_path),
+            "rotation": round(result.rotation, 3),
+            "tx": result.translation[0],
+            "ty": result.translation[1],
+            "mirrored": result.mirrored,
+            "residual": result.residual,
+            "inliers": result.inliers,
+            "iterations": result.iterations,
+            "ms": (time.perf_counter() - start) * 1e3,
+        })
+    return rows
+
+
+def register_corpus(paths: List[str], reference_paths: List[str],
+                    workers: Optional[int] = 1) -> List[dict]:
+    """Register every design against every reference; reference indexes are built once per worker."""
+    if workers == 1:
+        _init_worker(reference_paths)
+        return [row for path in paths for row in _register_file(path)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(reference_paths,)) as pool:
+        return [row for rows in pool.map(_register_file, paths) for row in rows]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Register the walls of every design against the reference designs (ICP with mirroring)."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for floorplan JSON files")
+    parser.add_argument("--references", type=str, nargs="+", required=True,
+                        help="Reference design JSON files")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", type=str, default=None, help="CSV file for the transforms and residuals")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    paths = find_design_files(args.base_folder)
+    start = time.perf_counter()
+    rows = register_corpus(paths, args.references, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for row in rows:
+        print(f"{row['file']:<40} -> {row['reference']:<18} rot {row['rotation']:7.2f}"
+              f"{' mirrored' if row['mirrored'] else '         '} residual {row['residual']:.3f} "
+              f"inliers {row['inliers']:.2f}")
+    print(f"{len(rows)} registrations in {elapsed:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["file", "reference"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
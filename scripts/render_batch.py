@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+# Figures are created without pyplot, so rendering never touches the global
+# backend or opens a window; savefig goes through the Agg canvas.
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection, PolyCollection
+
+from compact_plan import SpaceTable
+from floorplan_io import find_design_files, load_design
+from graphml_stream import parse_outline, parse_point
+from modify_plan import ROOM_COLORS
+
+
+def node_positions(G) -> Dict:
+    """
+    Place graph nodes at their floorplan coordinates.
+
+    Room nodes sit at the mean of their outline vertices, wall nodes at the
+    midpoint of their start and end points, and any other node (e.g.
+    apartments) at the mean position of its placed neighbours.
+
+    Args:
+        G (networkx.Graph): Graph read from one of the *_bom_updated.graphml files.
+
+    Returns:
+        dict: Mapping node -> (x, y). Nodes without any geometry are omitted.
+    """
+    pos = {}
+    for node, data in G.nodes(data=True):
+        outline = parse_outline(data.get("coordinates"))
+        if len(outline):
+            pos[node] = tuple(outline[:-1].mean(axis=0) if len(outline) > 1 else outline[0])
+            continue
+        start, end = parse_point(data.get("start_point"))[:2], parse_point(data.get("end_point"))[:2]
+        if not np.isnan(start).any() and not np.isnan(end).any():
+            pos[node] = tuple((start + end) / 2)
+
+    for node in G.nodes():
+        if node not in pos:
+            placed = [pos[n] for n in G.neighbors(node) if n in pos]
+            if placed:
+                pos[node] = tuple(np.mean(placed, axis=0))
+    return pos
+
+
+def render_floorplan(table: SpaceTable, output_path: str, title: str = "",
+                     flip: bool = True, labels: bool = True, dpi: int = 100):
+    """
+    Render all spaces of a floorplan to an image file.
+
+    One PolyCollection is drawn per room type instead of one fill call per room.
+    Like draw_floorplan, the y axis is flipped by default.
+
+    Args:
+        table (SpaceTable): Spaces of the floorplan.
+        output_path (str): Destination; the format follows the extension (.png, .svg, ...).
+        title (str): Figure title.
+        flip (bool): Mirror the plan along the x axis.
+        labels (bool): Write the room type and area at each room centroid.
+        dpi (int): Raster resolution.
+    """
+    sign = np.array([1.0, -1.0 if flip else 1.0])
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
+    ax.set_title(title)
+    ax.set_aspect("equal")
+
+    counts = table.vertex_counts()
+    for code, room_type in enumerate(table.room_types):
+        members = np.flatnonzero((table.room_type_codes == code) & (counts >= 3))
+        if not len(members):
+            continue
+        outlines = [table.outline(i) * sign for i in members]
+        ax.add_collection(PolyCollection(
+            outlines, facecolors=ROOM_COLORS.get(room_type, "#888888"),
+            edgecolors="black", alpha=0.7, label=room_type,
+        ))
+
+    if labels:
+        areas = table.areas()
+        for i in np.flatnonzero(counts >= 3):
+            centroid = table.outline(i)[:-1].mean(axis=0) * sign
+            ax.text(centroid[0], centroid[1], f"{table.room_type(i)}\n{areas[i]:.1f}m²",
+                    ha="center", va="center", fontsize=8)
+
+    ax.autoscale_view()
+    fig.savefig(output_path, dpi=dpi)
+
+
+def render_graph(G, output_path: str, title: str = "", flip: bool = True, dpi: int = 100):
+    """
+    Render a floorplan graph with nodes at their floorplan coordinates.
+
+    Args:
+        G (networkx.Graph): Graph to draw.
+        output_path (str): Destination image path.
+        title (str): Figure title.
+        flip (bool): Mirror the plan along the x axis, matching render_floorplan.
+        dpi (int): Raster resolution.
+    """
+    pos = node_positions(G)
+    sign = np.array([1.0, -1.0 if flip else 1.0])
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
+    ax.set_title(title)
+    ax.set_aspect("equal")
+
+    segments = [(np.multiply(pos[u], sign), np.multiply(pos[v], sign))
+                for u, v in G.edges() if u in pos and v in pos]
+    ax.add_collection(LineCollection(segments, colors="gray", linewidths=0.5))
+
+    nodes = [n for n in G.nodes() if n in pos]
+    xy = np.array([pos[n] for n in nodes]).reshape(-1, 2) * sign
+    colors = [ROOM_COLORS.get(G.nodes[n].get("room_type"), "#888888")
+              if G.nodes[n].get("type") == "room" else "#333333" for n in nodes]
+    sizes = [120 if G.nodes[n].get("type") in ("room", "apartment") else 15 for n in nodes]
+    ax.scatter(xy[:, 0], xy[:, 1], c=colors, s=sizes, zorder=2)
+
+    ax.autoscale_view()
+    fig.savefig(output_path, dpi=dpi)
+
+
+def _output_path(source: str, output_dir: str, fmt: str, base_folder: Optional[str] = None) -> str:
+    # Folders below base_folder become part of the name, so equal file names do not collide.
+    relative = os.path.relpath(source, base_folder) if base_folder else os.path.basename(source)
+    stem = os.path.splitext(relative)[0].replace(os.sep, "__")
+    return os.path.join(output_dir, f"{stem}.{fmt}")
+
+
+def render_file(source: str, output_dir: str, fmt: str = "png", base_folder: Optional[str] = None,
+                **kwargs) -> str:
+    """
+    Render a floorplan JSON or a GraphML file into output_dir.
+
+    The image is named after the source's path relative to base_folder
+    (e.g. GenericDesign_12005__12005.png), or after its file name alone.
+
+    Returns:
+        str: Path of the written image.
+    """
+    output_path = _output_path(source, output_dir, fmt, base_folder)
+    title = os.path.basename(source)
+    if source.endswith(".graphml"):
+        render_graph(nx.read_graphml(source), output_path, title=title, **kwargs)
+    else:
+        render_floorplan(load_design(source).spaces, output_path, title=title, **kwargs)
+    return output_path
+
+
+def find_sources(base_folder: str, graphs: bool = False) -> List[str]:
+    """
+    Collect the floorplan JSON files (and optionally GraphML files) under base_folder.
+
+    JSON files without a 'spaces' key, such as prefab catalogs, and designs
+    with no spaces (nothing to draw) are skipped.
+    """
+    sources = []
+    for path in find_design_files(base_folder):
+        try:
+            if not len(load_design(path).spaces):
+                continue
+        except (ValueError, OSError):
+            pass  # Left in, so render_corpus reports the error.
+        sources.append(path)
+    if graphs:
+        for root, _, files in os.walk(base_folder):
+            sources.extend(os.path.join(root, f) for f in sorted(files) if f.endswith(".graphml"))
+    return sources
+
+
+def render_corpus(sources: List[str], output_dir: str, fmt: str = "png",
+                  workers: Optional[int] = None, base_folder: Optional[str] = None,
+                  **kwargs) -> List[Tuple[str, str]]:
+    """
+    Render many files in parallel, one process per worker.
+
+    Images are named by render_file, relative to base_folder when given.
+
+    Returns:
+        list: (source, output path or error message) pairs, in completion order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_file, s, output_dir, fmt, base_folder, **kwargs): s for s in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                results.append((source, future.result()))
+            except Exception as e:
+                results.append((source, f"Error: {e}"))
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Render floorplans and floorplan graphs to image files without a display."
+    )
+    parser.add_argument("base_folder", type=str, help="Folder searched recursively for JSON/GraphML")
+    parser.add_argument("output_dir", type=str, help="Folder for the rendered images")
+    parser.add_argument("--format", choices=["png", "svg"], default="png")
+    parser.add_argument("--graphs", action="store_true", help="Also render GraphML files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-labels", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    sources = find_sources(args.base_folder, graphs=args.graphs)
+    kwargs = {}
+    if args.no_labels:
+        kwargs["labels"] = False
+
+    # Graph renders do not take labels; split the batches so kwargs stay valid.
+    floorplans = [s for s in sources if not s.endswith(".graphml")]
+    graphs = [s for s in sources if s.endswith(".graphml")]
+    results = render_corpus(floorplans, args.output_dir, args.format, args.workers, args.base_folder, **kwargs)
+    results += render_corpus(graphs, args.output_dir, args.format, args.workers, args.base_folder)
+
+    for source, output in results:
+        print(f"{source} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
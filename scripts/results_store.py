@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import dataclasses
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from floorplan_io import Design, file_digest
+
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS designs (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    path TEXT,
+    sha256 TEXT,
+    rooms INTEGER,
+    panels INTEGER
+);
+CREATE TABLE IF NOT EXISTS apartments (
+    id INTEGER PRIMARY KEY,
+    design_id INTEGER NOT NULL REFERENCES designs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    UNIQUE (design_id, name)
+);
+CREATE TABLE IF NOT EXISTS ratios (
+    apartment_id INTEGER NOT NULL REFERENCES apartments (id) ON DELETE CASCADE,
+    combination TEXT NOT NULL,
+    weighted INTEGER NOT NULL,
+    ratio REAL,
+    rooms_number INTEGER,
+    hull_area REAL,
+    total_area REAL,
+    UNIQUE (apartment_id, combination, weighted)
+);
+CREATE INDEX IF NOT EXISTS ratios_by_combination ON ratios (combination, weighted, ratio);
+CREATE TABLE IF NOT EXISTS similarity (
+    design_id INTEGER NOT NULL REFERENCES designs (id) ON DELETE CASCADE,
+    reference TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    UNIQUE (design_id, reference, metric)
+);
+CREATE INDEX IF NOT EXISTS similarity_by_metric ON similarity (reference, metric, value);
+CREATE TABLE IF NOT EXISTS search_results (
+    apartment_id INTEGER NOT NULL REFERENCES apartments (id) ON DELETE CASCADE,
+    run TEXT NOT NULL,
+    initial_score REAL,
+    best_score REAL,
+    iterations INTEGER,
+    accepted INTEGER,
+    elapsed REAL,
+    assignments TEXT,
+    UNIQUE (apartment_id, run)
+);
+CREATE INDEX IF NOT EXISTS search_results_by_score ON search_results (run, best_score);
+
+-- Same columns as the CSVs written by compute_iou.save_records_to_csv.
+CREATE VIEW IF NOT EXISTS ratio_records AS
+SELECT d.file AS file, a.name AS apartment, r.combination AS combination, r.ratio AS ratio,
+       r.rooms_number AS rooms_number, r.hull_area AS hull_area, r.total_area AS total_area,
+       r.weighted AS weighted
+FROM ratios r
+JOIN apartments a ON a.id = r.apartment_id
+JOIN designs d ON d.id = a.design_id
+ORDER BY r.rowid;
+"""
+
+RATIO_FIELDS = ["file", "apartment", "combination", "ratio", "rooms_number", "hull_area", "total_area"]
+
+
+class ResultsStore:
+    """
+    SQLite store of hull ratios, similarity scores and optimizer outcomes.
+
+    Rows are upserted, so rerunning an analysis replaces its earlier results
+    instead of appending duplicates. Writes are grouped into transactions of
+    `batch_size` rows. Design and apartment ids are cached per connection.
+
+    Args:
+        path (str): Database file, created if missing (':memory:' for a throwaway store).
+        batch_size (int): Rows written per transaction by the bulk methods.
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{path} has schema version {version}, newer than {SCHEMA_VERSION}")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._designs: Dict[str, int] = {}
+        self._apartments: Dict[tuple, int] = {}
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _write(self, sql: str, rows: Iterable[Sequence]) -> int:
+        """executemany in transactions of batch_size rows; returns the number of rows written."""
+        written, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                with self.connection:
+                    self.connection.executemany(sql, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            with self.connection:
+                self.connection.executemany(sql, batch)
+            written += len(batch)
+        return written
+
+    def design_id(self, file: str, path: Optional[str] = None, design: Optional[Design] = None) -> int:
+        """
+        Id of a design by file name, adding or updating it.
+
+        With `path` the file's SHA-256 is stored; with `design` its room and panel counts.
+        """
+        if file in self._designs and path is None and design is None:
+            return self._designs[file]
+        with self.connection:
+            self.connection.execute("INSERT INTO designs (file) VALUES (?) ON CONFLICT (file) DO NOTHING", (file,))
+            if path is not None:
+                self.connection.execute("UPDATE designs SET path = ?, sha256 = ? WHERE file = ?",
+                                        (path, file_digest(path), file))
+            if design is not None:
+                self.connection.execute("UPDATE designs SET rooms = ?, panels = ? WHERE file = ?",
+                                        (len(design.spaces), len(design.panels), file))
+        self._designs[file] = self.connection.execute(
+            "SELECT id FROM designs WHERE file = ?", (file,)).fetchone()[0]
+        return self._designs[file]
+
+    def apartment_ids(self, pairs: Iterable[tuple]) -> Dict[tuple, int]:
+        """Ids of (file, apartment) pairs, adding the missing ones in one transaction."""
+        pairs = set(pairs)
+        missing = [(self.design_id(file), name) for file, name in pairs if (file, name) not in self._apartments]
+        file_of = {design: file for file, design in self._designs.items()}
+        if missing:
+            self._write("INSERT INTO apartments (design_id, name) VALUES (?, ?) "
+                        "ON CONFLICT (design_id, name) DO NOTHING", missing)
+            for design, name in missing:
+                self._apartments[(file_of[design], name)] = self.connection.execute(
+                    "SELECT id FROM apartments WHERE design_id = ? AND name = ?", (design, name)).fetchone()[0]
+        return {pair: self._apartments[pair] for pair in pairs}
+
+    def add_ratio_records(self, records: List[dict], weighted: bool = False) -> int:
+        """
+        Upsert records as produced by compute_iou.process_json_file.
+
+        Args:
+            records (list): Dicts with the RATIO_FIELDS keys.
+            weighted (bool): Whether the ratios were computed with weight_flag.
+
+        Returns:
+            int: Number of records written.
+        """
+        ids = self.apartment_ids((r["file"], r["apartment"]) for r in records)
+        return self._write(
+            "INSERT INTO ratios (apartment_id, combination, weighted, ratio, rooms_number, hull_area, total_area) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (apartment_id, combination, weighted) DO UPDATE SET "
+            "ratio = excluded.ratio, rooms_number = excluded.rooms_number, "
+            "hull_area = excluded.hull_area, total_area = excluded.total_area",
+            ((ids[(r["file"], r["apartment"])], r["combination"], int(weighted), float(r["ratio"]),
+              int(r["rooms_number"]), float(r["hull_area"]), float(r["total_area"])) for r in records))
+
+    def add_apartment_ratios(self, file: str, results: Dict[str, dict], weighted: bool = False) -> int:
+        """Upsert the output of compute_iou.compute_space_combinations_ratios_by_apartment for one design."""
+        return self.add_ratio_records(
+            [{"file": file, "apartment": apartment, "combination": combination, "ratio": ratio,
+              "rooms_number": rooms_number, "hull_area": hull_area, "total_area": total_area}
+             for apartment, combos in results.items()
+             for combination, (ratio, rooms_number, hull_area, total_area) in combos.items()],
+            weighted)
+
+    def add_similarity(self, file: str, reference: str, metrics: Dict[str, float]) -> int:
+        """Upsert similarity scores of one design against one reference (numeric metrics only)."""
+        design = self.design_id(file)
+        return self._write(
+            "INSERT INTO similarity (design_id, reference, metric, value) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (design_id, reference, metric) DO UPDATE SET value = excluded.value",
+            ((design, reference, metric, float(value)) for metric, value in metrics.items()
+             if isinstance(value, (int, float)) and not isinstance(value, bool)))
+
+    def add_search_results(self, file: str, results: list, run: str = "") -> int:
+        """
+        Upsert floorplan_search.SearchResult outcomes (or their asdict form) of one design.
+
+        Args:
+            file (str): Design file name.
+            results (list): One result per apartment.
+            run (str): Label of the run (e.g. its parameters); results of other runs are kept.
+        """
+        results = [r if isinstance(r, dict) else dataclasses.asdict(r) for r in results]
+        ids = self.apartment_ids((file, r["apartment"]) for r in results)
+        return self._write(
+            "INSERT INTO search_results (apartment_id, run, initial_score, best_score, iterations, accepted, "
+            "elapsed, assignments) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (apartment_id, run) DO UPDATE SET "
+            "initial_score = excluded.initial_score, best_score = excluded.best_score, "
+            "iterations = excluded.iterations, accepted = excluded.accepted, elapsed = excluded.elapsed, "
+            "assignments = excluded.assignments",
+            ((ids[(file, r["apartment"])], run, float(r["initial_score"]), float(r["best_score"]),
+              int(r["iterations"]), int(r["accepted"]), float(r["elapsed"]), json.dumps(r["assignments"]))
+             for r in results))
+
+    def ratio_records(self, file: Optional[str] = None, apartment: Optional[str] = None,
+                      combination: Optional[str] = None, weighted: bool = False,
+                      min_ratio: Optional[float] = None, max_ratio: Optional[float] = None) -> List[dict]:
+        """Ratio records matching every filter given, in insertion order, as RATIO_FIELDS dicts."""
+        clauses, values = ["weighted = ?"], [int(weighted)]
+        for column, op, value in (("file", "=", file), ("apartment", "=", apartment),
+                                  ("combination", "=", combination),
+                                  ("ratio", ">=", min_ratio), ("ratio", "<=", max_ratio)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                values.append(value)
+        rows = self.connection.execute(
+            f"SELECT {', '.join(RATIO_FIELDS)} FROM ratio_records WHERE {' AND '.join(clauses)}", values)
+        return [dict(row) for row in rows]
+
+    def export_csv(self, csv_path: str, weighted: bool = False, **filters) -> int:
+        """Write ratio records in the naive_ratios.csv / weighted_ratios.csv format."""
+        records = self.ratio_records(weighted=weighted, **filters)
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RATIO_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        return len(records)
+
+    def export_design_explorer(self, csv_path: str, weighted: bool = False, run: Optional[str] = None) -> int:
+        """
+        Write one row per apartment in Design Explorer's format.
+
+        Inputs are the file and apartment ('in:' columns); outputs are the ratio of
+        every combination, the design's similarity scores and, if `run` is given,
+        that run's best search score ('out:' columns). 'img' is <file stem>.png,
+        as in SimilarityAnalysis_results.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows: Dict[tuple, dict] = {}
+        combinations: Dict[str, None] = {}
+        for record in self.ratio_records(weighted=weighted):
+            combinations[f"out:{record['combination']}"] = None
+            key = (record["file"], record["apartment"])
+            row = rows.setdefault(key, {"in:file": record["file"], "in:apartment": record["apartment"]})
+            row[f"out:{record['combination']}"] = record["ratio"]
+        by_file: Dict[str, List[dict]] = {}
+        for (file, _), row in rows.items():
+            by_file.setdefault(file, []).append(row)
+        for file, reference, metric, value in self.connection.execute(
+                "SELECT d.file, s.reference, s.metric, s.value FROM similarity s "
+                "JOIN designs d ON d.id = s.design_id ORDER BY s.rowid"):
+            for row in by_file.get(file, ()):
+                row[f"out:{metric} ({reference})"] = value
+        if run is not None:
+            for file, apartment, score in self.connection.execute(
+                    "SELECT d.file, a.name, r.best_score FROM search_results r "
+                    "JOIN apartments a ON a.id = r.apartment_id JOIN designs d ON d.id = a.design_id "
+                    "WHERE r.run = ?", (run,)):
+                if (file, apartment) in rows:
+                    rows[(file, apartment)]["out:best_score"] = score
+        for row in rows.values():
+            row["img"] = os.path.splitext(row["in:file"])[0] + ".png"
+
+        fieldnames = ["in:file", "in:apartment", *combinations]
+        fieldnames += dict.fromkeys(k for row in rows.values() for k in row
+                                    if k.startswith("out:") and k not in combinations)
+        fieldnames.append("img")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+            writer.writeheader()
+            writer.writerows(rows.values())
+        return len(rows)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Import, query and export hull ratio results kept in a SQLite database."
+    )
+    parser.add_argument("db_path", type=str, help="SQLite database (created if missing)")
+    parser.add_argument("--import-csv", type=str, nargs="*", default=[],
+                        help="compute_iou ratio CSVs (e.g. naive_ratios.csv) to upsert")
+    parser.add_argument("--weighted", action="store_true",
+                        help="The imported CSVs hold weighted ratios / query and export weighted ratios")
+    parser.add_argument("--apartment", type=str, default=None)
+    parser.add_argument("--combination", type=str, default=None, help="e.g. bathroom,kitchen")
+    parser.add_argument("--min-ratio", type=float, default=None)
+    parser.add_argument("--max-ratio", type=float, default=None)
+    parser.add_argument("--export-csv", type=str, default=None, help="Write the matching records to this CSV")
+    parser.add_argument("--design-explorer", type=str, default=None,
+                        help="Write a Design Explorer CSV of all apartments")
+    parser.add_argument("--run", type=str, default=None, help="Search run to include in the Design Explorer CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    with ResultsStore(args.db_path) as store:
+        for path in args.import_csv:
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                count = store.add_ratio_records(list(csv.DictReader(f)), args.weighted)
+            print(f"Imported {count} records from {path}")
+
+        filters = {"apartment": args.apartment, "combination": args.combination,
+                   "min_ratio": args.min_ratio, "max_ratio": args.max_ratio}
+        if args.export_csv:
+            count = store.export_csv(args.export_csv, args.weighted, **filters)
+            print(f"Saved {count} records to {args.export_csv}")
+        elif not args.design_explorer:
+            for record in store.ratio_records(weighted=args.weighted, **filters):
+                print(f"{record['file']:<30} {record['apartment']:<14} {record['combination']:<26} "
+                      f"{record['ratio']:.4f}")
+
+        if args.design_explorer:
+            count = store.export_design_explorer(args.design_explorer, args.weighted, args.run)
+            print(f"Saved {count} apartments to {args.design_explorer}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import netlsd
+import networkx as nx
+import numpy as np
+from shapely.geometry import Polygon
+
+from compute_iou_isFabricable import compute_spaces_convex_hull_ratio
+from csr_graph import CSRGraph
+from floorplan_io import Design, load_design
+from pipeline import build_design_graph
+
+
+MAX_BODY = 64 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class Reference:
+    """A reference design kept in memory with its graph and NetLSD heat signature."""
+
+    __slots__ = ("name", "design", "graph", "signature")
+
+    def __init__(self, name: str, design: Optional[Design], graph: nx.MultiGraph):
+        self.name = name
+        self.design = design
+        self.graph = graph
+        self.signature = netlsd.heat(CSRGraph.from_networkx(graph).sparse_adjacency())
+
+    @classmethod
+    def load(cls, path: str) -> "Reference":
+        """Load a reference from a floorplan JSON or a GraphML file."""
+        if path.endswith(".graphml"):
+            return cls(os.path.basename(path), None, nx.read_graphml(path, force_multigraph=True))
+        design = load_design(path)
+        return cls(design.name, design, build_design_graph(design))
+
+
+# Worker-process state, filled once by _init_worker so requests only ship the query.
+_signatures: Dict[str, np.ndarray] = {}
+_catalog = None
+
+
+def _init_worker(signatures: Dict[str, np.ndarray], catalog_path: Optional[str]):
+    global _signatures, _catalog
+    _signatures = signatures
+    if catalog_path:
+        from prefab_catalog import PrefabCatalog
+        _catalog = PrefabCatalog.load(catalog_path)
+
+
+def _query_graph(payload: dict):
+    """Return (design or None, graph) for a request payload."""
+    if "graphml" in payload:
+        return None, nx.read_graphml(io.BytesIO(payload["graphml"].encode("utf-8")), force_multigraph=True)
+    if "graphml_path" in payload:
+        return None, nx.read_graphml(payload["graphml_path"], force_multigraph=True)
+    if "design" in payload:
+        data = payload["design"]
+        if not isinstance(data, dict):
+            raise ValueError("'design' must be a floorplan JSON object")
+        if not isinstance(data.get("spaces", {}), dict) or not isinstance(data.get("panels", {}), dict):
+            raise ValueError("'design' needs 'spaces' and 'panels' objects")
+        design = Design.from_dict(data)
+    elif "json_path" in payload:
+        design = load_design(payload["json_path"])
+    else:
+        raise ValueError("expected one of 'design', 'json_path', 'graphml' or 'graphml_path'")
+    return design, build_design_graph(design)
+
+
+def _finite(value: float) -> Optional[float]:
+    """JSON has no NaN or Infinity; such values are sent as null."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def compare_payload(payload: dict) -> dict:
+    """
+    Compare one floorplan with every warm reference (runs in a worker process).
+
+    Returns NetLSD distances to each reference, sorted closest first (null, e.g.
+    for an empty graph, last), and for JSON inputs the transportability check
+    and the catalog prefabs fitting each room.
+    """
+    start = time.perf_counter()
+    design, graph = _query_graph(payload)
+    signature = netlsd.heat(CSRGraph.from_networkx(graph).sparse_adjacency())
+    distances = sorted(((name, _finite(netlsd.compare(signature, ref)))
+                        for name, ref in _signatures.items()),
+                       key=lambda item: (item[1] is None, item[1] or 0.0))
+    result = {
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "references": [{"name": name, "netlsd_distance": d} for name, d in distances],
+    }
+
+    if design is not None:
+        ratio = compute_spaces_convex_hull_ratio(design)
+        if isinstance(ratio, tuple):
+            result["hull_ratio"], result["hull_area"], result["transportable"] = (
+                _finite(ratio[0]), _finite(ratio[1]), bool(ratio[2]))
+        if _catalog is not None:
+            fits = {}
+            table = design.spaces
+            for i, space_id in enumerate(table.ids):
+                if len(table.outline(i)) >= 3:
+                    parts = _catalog.fitting_prefabs(Polygon(table.outline(i)), table.room_type(i))
+                    fits[space_id] = [getattr(p, "sku", None) or p.type for p in parts]
+            result["fitting_prefabs"] = fits
+
+    result["elapsed_ms"] = (time.perf_counter() - start) * 1e3
+    return result
+
+
+class SimilarityService:
+    """
+    asyncio HTTP service answering comparison requests against warm references.
+
+    Routes:
+        GET  /health      -> {"status": "ok", ...}
+        GET  /references  -> names and graph sizes of the loaded references
+        POST /compare     -> body {"design": {...}} | {"json_path": ...} |
+                             {"graphml": "<graphml ...>"} | {"graphml_path": ...}
+
+    Parsing, signatures and geometry run in a process pool whose workers
+    receive the reference signatures and the catalog once, at start-up.
+    """
+
+    def __init__(self, references: List[Reference], catalog_path: Optional[str] = None,
+                 workers: Optional[int] = None):
+        self.references = references
+        self.catalog_path = catalog_path
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=({r.name: r.signature for r in references}, catalog_path))
+        self.requests = 0
+
+    async def compare(self, payload: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, compare_payload, payload)
+
+    async def route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "references": len(self.references), "requests": self.requests}
+        if method == "GET" and path == "/references":
+            return 200, [{"name": r.name, "nodes": r.graph.number_of_nodes(),
+                          "edges": r.graph.number_of_edges()} for r in self.references]
+        if method == "POST" and path == "/compare":
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError as e:
+                return 400, {"error": f"invalid JSON: {e}"}
+            if not isinstance(payload, dict):
+                return 400, {"error": "expected a JSON object"}
+            try:
+                return 200, await self.compare(payload)
+            except ET.ParseError as e:
+                return 400, {"error": f"invalid GraphML: {e}"}
+            except (ValueError, KeyError, OSError, TypeError, AttributeError) as e:
+                return 400, {"error": f"{type(e).__name__}: {e}"}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    status, response = 400, {"error": "malformed request line or headers"}
+                    keep_alive = False
+                else:
+                    if length > MAX_BODY:
+                        status, response = 413, {"error": "request body too large"}
+                        keep_alive = False
+                    else:
+                        body = await reader.readexactly(length) if length else b""
+                        self.requests += 1
+                        try:
+                            status, response = await self.route(method, path, body)
+                        except Exception as e:
+                            status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+                        keep_alive = headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(response).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                             .encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            print(f"Listening on unix:{socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Serve floorplan comparisons against reference designs kept warm in memory."
+    )
+    parser.add_argument("references", nargs="+", help="Reference design JSON or GraphML files")
+    parser.add_argument("--catalog", type=str, default=None, help="Prefab catalog JSON")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    references = [Reference.load(path) for path in args.references]
+    print(f"Loaded {len(references)} references")
+    service = SimilarityService(references, args.catalog, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
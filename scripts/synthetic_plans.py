@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+import argparse
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+
+# Room type frequencies of the designs in json/ (a typical apartment has
+# three bedrooms, two bathrooms, a living room, a kitchen and a corridor).
+DEFAULT_ROOM_MIX = {
+    "bedroom": 3.0,
+    "bathroom": 2.0,
+    "living_room": 1.0,
+    "kitchen": 1.0,
+    "corridor": 1.0,
+}
+WALL_TYPES = ("WAL_21", "WAL_24", "WAL_25", "WAL_26", "WAL_31", "WAL_33")
+
+# Same key ids as the *_bom_updated.graphml exports.
+GRAPHML_KEYS = (
+    ("d10", "edge", "type", "string"),
+    ("d9", "node", "thickness", "double"),
+    ("d8", "node", "height", "double"),
+    ("d7", "node", "end_point", "string"),
+    ("d6", "node", "start_point", "string"),
+    ("d5", "node", "panel_type", "string"),
+    ("d4", "node", "name", "string"),
+    ("d3", "node", "coordinates", "string"),
+    ("d2", "node", "apartment", "string"),
+    ("d1", "node", "room_type", "string"),
+    ("d0", "node", "type", "string"),
+)
+
+
+@dataclass
+class PlanSpec:
+    """
+    Parameters of a synthetic building.
+
+    Attributes:
+        floors (int): Number of storeys; floor f sits at z = f * floor_height.
+        apartments_per_floor (int): Apartments placed side by side on each floor.
+        rooms_per_apartment (int): Rooms each apartment is split into.
+        room_mix (dict): Room type -> relative frequency.
+        seed (int): Seed of the random generator; equal specs give equal buildings.
+        core (bool): Add one unassigned 'core' space per floor, as in the real designs.
+        room_area (float): Mean room area in m².
+        min_side (float): Smallest room side in m.
+        floor_height (float): Storey and wall height in m.
+        thickness (float): Wall thickness in m.
+    """
+    floors: int = 1
+    apartments_per_floor: int = 4
+    rooms_per_apartment: int = 8
+    room_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_ROOM_MIX))
+    seed: int = 0
+    core: bool = True
+    room_area: float = 12.0
+    min_side: float = 1.5
+    floor_height: float = 3.0
+    thickness: float = 0.2
+
+    @property
+    def num_apartments(self) -> int:
+        return self.floors * self.apartments_per_floor
+
+
+class SyntheticRoom(NamedTuple):
+    space_id: str
+    room_type: str
+    apartment: Optional[str]
+    outline: np.ndarray  # closed (n, 3) loop, first point repeated at the end
+
+
+class SyntheticPanel(NamedTuple):
+    panel_id: str
+    panel_type: str
+    start: tuple
+    end: tuple
+    room: str
+    apartment: Optional[str]
+    space_id: str
+
+
+def _split_rectangle(rng: np.random.Generator, rect: tuple, count: int, min_side: float) -> List[tuple]:
+    """Guillotine-split a rectangle (x0, y0, x1, y1) into up to count rooms."""
+    rooms = [rect]
+    while len(rooms) < count:
+        # Split the largest room across its longer side.
+        areas = [(r[2] - r[0]) * (r[3] - r[1]) for r in rooms]
+        x0, y0, x1, y1 = rooms.pop(int(np.argmax(areas)))
+        horizontal = (x1 - x0) >= (y1 - y0)
+        length = (x1 - x0) if horizontal else (y1 - y0)
+        if length < 2 * min_side:
+            rooms.append((x0, y0, x1, y1))
+            break
+        cut = round(float(rng.uniform(max(0.35, min_side / length), min(0.65, 1 - min_side / length)))
+                    * length, 2)
+        if horizontal:
+            rooms += [(x0, y0, x0 + cut, y1), (x0 + cut, y0, x1, y1)]
+        else:
+            rooms += [(x0, y0, x1, y0 + cut), (x0, y0 + cut, x1, y1)]
+    return rooms
+
+
+def _outline(rect: tuple, z: float) -> np.ndarray:
+    x0, y0, x1, y1 = (round(v, 2) for v in rect)
+    return np.array([[x0, y0, z], [x0, y1, z], [x1, y1, z], [x1, y0, z], [x0, y0, z]])
+
+
+def iter_rooms(spec: PlanSpec) -> Iterator[SyntheticRoom]:
+    """
+    Yield the spaces of the building one at a time.
+
+    Memory use does not depend on the building size, so this can feed
+    buildings with millions of panels straight into a file.
+    """
+    rng = np.random.default_rng(spec.seed)
+    types = list(spec.room_mix)
+    weights = np.array([spec.room_mix[t] for t in types], dtype=float)
+    weights /= weights.sum()
+
+    space_id = 0
+    apartment_no = 0
+    for floor in range(spec.floors):
+        z = floor * spec.floor_height
+        x = 0.0
+        if spec.core:
+            width, depth = round(float(rng.uniform(4.0, 6.0)), 2), round(float(rng.uniform(6.0, 9.0)), 2)
+            yield SyntheticRoom(str(space_id), "core", None, _outline((x, 0.0, x + width, depth), z))
+            space_id += 1
+            x += width
+
+        for _ in range(spec.apartments_per_floor):
+            apartment_no += 1
+            apartment = f"Apartment {apartment_no}"
+            area = spec.rooms_per_apartment * spec.room_area * float(rng.uniform(0.8, 1.2))
+            depth = round(float(np.sqrt(area / rng.uniform(1.0, 1.6))), 2)
+            width = round(area / depth, 2)
+            rects = _split_rectangle(rng, (x, 0.0, x + width, depth),
+                                     spec.rooms_per_apartment, spec.min_side)
+            # Larger rooms come first so living rooms and bedrooms get the space.
+            rects.sort(key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True)
+            room_types = rng.choice(len(types), size=len(rects), p=weights)
+            for rect, code in zip(rects, sorted(room_types, key=lambda c: -weights[c])):
+                yield SyntheticRoom(str(space_id), types[code], apartment, _outline(rect, z))
+                space_id += 1
+            x += width
+
+
+def iter_panels(spec: PlanSpec) -> Iterator[SyntheticPanel]:
+    """Yield one wall panel per outline edge of every room, numbered from 0."""
+    rng = np.random.default_rng((spec.seed, 1))
+    panel_id = 0
+    for room in iter_rooms(spec):
+        for start, end in zip(room.outline[:-1], room.outline[1:]):
+            yield SyntheticPanel(str(panel_id), WALL_TYPES[rng.integers(len(WALL_TYPES))],
+                                 tuple(float(v) for v in start), tuple(float(v) for v in end),
+                                 room.room_type, room.apartment, room.space_id)
+            panel_id += 1
+
+
+def _panel_dict(panel: SyntheticPanel, spec: PlanSpec) -> dict:
+    record = {
+        "panel_type": panel.panel_type,
+        "start_point": list(panel.start),
+        "end_point": list(panel.end),
+        "height": spec.floor_height,
+        "thickness": spec.thickness,
+        "room": panel.room,
+    }
+    if panel.apartment is not None:
+        record["apartment"] = panel.apartment
+    return record
+
+
+def _space_dict(room: SyntheticRoom) -> dict:
+    record = {"room_type": room.room_type}
+    if room.apartment is not None:
+        record["apartment"] = room.apartment
+    record["coordinates"] = [{"x": float(x), "y": float(y), "z": float(z)} for x, y, z in room.outline]
+    return record
+
+
+def generate_design(spec: PlanSpec) -> dict:
+    """Build the floorplan JSON ('panels' and 'spaces') in memory."""
+    return {
+        "panels": {"attributes": {},
+                   "items": {p.panel_id: _panel_dict(p, spec) for p in iter_panels(spec)}},
+        "spaces": {r.space_id: _space_dict(r) for r in iter_rooms(spec)},
+    }
+
+
+def write_json(spec: PlanSpec, out: TextIO):
+    """
+    Stream the floorplan JSON to an open text file.
+
+    Panels and spaces are written one record at a time; the generator is
+    simply run twice (once per section), which is cheap because it is seeded.
+    """
+    out.write('{"panels": {"attributes": {}, "items": {')
+    for i, panel in enumerate(iter_panels(spec)):
+        out.write(f'{", " if i else ""}{json.dumps(panel.panel_id)}: {json.dumps(_panel_dict(panel, spec))}')
+    out.write('}}, "spaces": {')
+    for i, room in enumerate(iter_rooms(spec)):
+        out.write(f'{", " if i else ""}{json.dumps(room.space_id)}: {json.dumps(_space_dict(room))}')
+    out.write('}}\n')
+
+
+def _point(values) -> str:
+    return "[" + ", ".join(f"{v:g}" for v in values) + "]"
+
+
+def _node(out: TextIO, node_id: str, attrs: list):
+    out.write(f"    <node id={quoteattr(node_id)}>\n")
+    for key, value in attrs:
+        out.write(f'      <data key="{key}">{escape(str(value))}</data>\n')
+    out.write("    </node>\n")
+
+
+def _edge(out: TextIO, source: str, target: str, edge_type: str = "belongs_to"):
+    out.write(f"    <edge source={quoteattr(source)} target={quoteattr(target)}>\n"
+              f'      <data key="d10">{edge_type}</data>\n    </edge>\n')
+
+
+def write_graphml(spec: PlanSpec, out: TextIO):
+    """
+    Stream the matching room/apartment/wall graph in the *_bom_updated.graphml schema.
+
+    Room nodes are 'room_<space id>', apartment nodes 'apartment_<n>', and wall
+    nodes use the JSON panel id; every room is linked to its apartment and walls.
+    """
+    out.write("<?xml version='1.0' encoding='utf-8'?>\n"
+              '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+              'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+              'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+    for key_id, kind, name, attr_type in GRAPHML_KEYS:
+        out.write(f'  <key id="{key_id}" for="{kind}" attr.name="{name}" attr.type="{attr_type}" />\n')
+    out.write('  <graph edgedefault="undirected">\n')
+
+    apartments = set()
+    panels = iter_panels(spec)
+    panel = next(panels, None)
+    for room in iter_rooms(spec):
+        room_node = f"room_{room.space_id}"
+        coordinates = ";".join(f"{x:g},{y:g}" for x, y, _ in room.outline)
+        attrs = [("d0", "room"), ("d1", room.room_type)]
+        if room.apartment is not None:
+            attrs.append(("d2", room.apartment))
+        _node(out, room_node, attrs + [("d3", coordinates)])
+
+        if room.apartment is not None:
+            apartment_node = "apartment_" + room.apartment.split()[-1]
+            if room.apartment not in apartments:
+                apartments.add(room.apartment)
+                _node(out, apartment_node, [("d0", "apartment"), ("d4", room.apartment)])
+            _edge(out, room_node, apartment_node)
+
+        while panel is not None and panel.space_id == room.space_id:
+            attrs = [("d0", "wall"), ("d5", panel.panel_type), ("d6", _point(panel.start)),
+                     ("d7", _point(panel.end)), ("d8", spec.floor_height), ("d9", spec.thickness),
+                     ("d1", panel.room)]
+            if panel.apartment is not None:
+                attrs.append(("d2", panel.apartment))
+            _node(out, panel.panel_id, attrs)
+            _edge(out, room_node, panel.panel_id)
+            panel = next(panels, None)
+
+    out.write("  </graph>\n</graphml>\n")
+
+
+def generate_graph(spec: PlanSpec):
+    """Return the synthetic graph as networkx would read it from the GraphML file."""
+    import networkx as nx
+
+    buffer = io.StringIO()
+    write_graphml(spec, buffer)
+    return nx.read_graphml(io.BytesIO(buffer.getvalue().encode("utf-8")), force_multigraph=True)
+
+
+def _parse_mix(values: Optional[List[str]]) -> Dict[str, float]:
+    if not values:
+        return dict(DEFAULT_ROOM_MIX)
+    mix = {}
+    for item in values:
+        name, _, weight = item.partition("=")
+        mix[name] = float(weight or 1.0)
+    return mix
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Generate a seeded synthetic floorplan (JSON and GraphML) for scale testing."
+    )
+    parser.add_argument("output", type=str, help="Output path without extension, e.g. synthetic/plan_1k")
+    parser.add_argument("--floors", type=int, default=1)
+    parser.add_argument("--apartments", type=int, default=4, help="Apartments per floor")
+    parser.add_argument("--rooms", type=int, default=8, help="Rooms per apartment")
+    parser.add_argument("--mix", nargs="*", default=None,
+                        help="Room type mix, e.g. bedroom=3 bathroom=2 kitchen=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-core", action="store_true", help="Do not add a core space per floor")
+    parser.add_argument("--no-graphml", action="store_true", help="Write the JSON only")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    spec = PlanSpec(floors=args.floors, apartments_per_floor=args.apartments,
+                    rooms_per_apartment=args.rooms, room_mix=_parse_mix(args.mix),
+                    seed=args.seed, core=not args.no_core)
+
+    with open(f"{args.output}.json", "w", encoding="utf-8") as f:
+        write_json(spec, f)
+    print(f"Floorplan JSON saved to {args.output}.json")
+    if not args.no_graphml:
+        with open(f"{args.output}.graphml", "w", encoding="utf-8") as f:
+            write_graphml(spec, f)
+        print(f"Graph saved to {args.output}.graphml")
+
+
+if __name__ == "__main__":
+    main()
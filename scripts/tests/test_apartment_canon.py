@@ -0,0 +1,63 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from apartment_canon import ApartmentMemo, transportability_by_apartment
+from compute_iou_isFabricable import compute_spaces_convex_hull_ratio
+from floorplan_io import Design
+
+DESIGN = os.path.join(os.path.dirname(__file__), "..", "..", "json", "GenericDesign_14012", "14012.json")
+
+
+def _rotated(data: dict, degrees: float) -> dict:
+    theta = np.radians(degrees)
+    c, s = np.cos(theta), np.sin(theta)
+    spaces = {}
+    for space_id, space in data["spaces"].items():
+        coordinates = [dict(pt, x=c * pt["x"] - s * pt["y"], y=s * pt["x"] + c * pt["y"])
+                       for pt in space.get("coordinates", [])]
+        spaces[space_id] = dict(space, coordinates=coordinates)
+    return {"spaces": spaces, "panels": {"items": {}}}
+
+
+def _expected(data: dict) -> dict:
+    """compute_spaces_convex_hull_ratio on each apartment's spaces alone."""
+    by_apartment = {}
+    for space_id, space in data["spaces"].items():
+        apartment = space.get("apartment")
+        by_apartment.setdefault(apartment if apartment is not None else "Unknown", {})[space_id] = space
+    expected = {}
+    for apartment, spaces in by_apartment.items():
+        result = compute_spaces_convex_hull_ratio({"spaces": spaces})
+        if isinstance(result, tuple):
+            expected[apartment] = result
+    return expected
+
+
+@pytest.mark.parametrize("degrees", [0.0, 37.0, 90.0, 135.0])
+def test_transportability_matches_original_per_apartment(degrees):
+    with open(DESIGN, "r", encoding="utf-8") as f:
+        data = _rotated(json.load(f), degrees)
+    memo = ApartmentMemo(None)
+    # Twice, so the second pass reads every apartment from the memo.
+    for _ in range(2):
+        results = transportability_by_apartment(Design.from_dict(data), memo)
+        expected = _expected(data)
+        assert set(results) == set(expected)
+        for apartment, (ratio, hull_area, transportable) in expected.items():
+            assert results[apartment][0] == pytest.approx(ratio)
+            assert results[apartment][1] == pytest.approx(hull_area)
+            assert results[apartment][2] == transportable
+    assert memo.hits
+
+
+def test_prefabs_key_with_and_without_sku():
+    from apartment_canon import _prefabs_key
+    from prefab_catalog import prefab_from_definition
+
+    outline = [[0, 0], [2, 0], [2, 3], [0, 3]]
+    parts = [prefab_from_definition({"type": "bathroom", "footprint": outline, "max_area": 8.0}),
+             prefab_from_definition({"type": "bathroom", "footprint": outline, "max_area": 8.0, "sku": "B-1"})]
+    assert _prefabs_key(parts) == _prefabs_key(parts[::-1])
@@ -0,0 +1,31 @@
+import numpy as np
+
+from compact_plan import SpaceTable
+
+
+def _square(size):
+    return [{"x": 0.0, "y": 0.0, "z": 0.0}, {"x": size, "y": 0.0, "z": 0.0},
+            {"x": size, "y": size, "z": 0.0}, {"x": 0.0, "y": size, "z": 0.0}]
+
+
+def test_areas_with_empty_space_in_the_middle():
+    table = SpaceTable.from_spaces({
+        "a": {"coordinates": _square(1.0)},
+        "b": {"coordinates": []},
+        "c": {"coordinates": _square(2.0)},
+    })
+    np.testing.assert_allclose(table.areas(), [1.0, 0.0, 4.0])
+
+
+def test_areas_with_empty_space_at_the_end():
+    table = SpaceTable.from_spaces({
+        "a": {"coordinates": _square(1.0)},
+        "c": {"coordinates": _square(2.0)},
+        "b": {},
+    })
+    np.testing.assert_allclose(table.areas(), [1.0, 4.0, 0.0])
+
+
+def test_areas_without_vertices():
+    assert SpaceTable.from_spaces({"b": {}}).areas().tolist() == [0.0]
+    assert SpaceTable.from_spaces({}).areas().tolist() == []
@@ -0,0 +1,19 @@
+import numpy as np
+
+from graphml_stream import parse_outline, parse_point
+
+
+def test_parse_point_graphml_and_json_forms():
+    np.testing.assert_array_equal(parse_point("[1.5, 2, 0]"), [1.5, 2.0, 0.0])
+    np.testing.assert_array_equal(parse_point([1.5, 2, 0]), [1.5, 2.0, 0.0])
+    np.testing.assert_array_equal(parse_point("[1.5, x]"), [1.5, np.nan, np.nan])
+    assert np.isnan(parse_point(None)).all() and np.isnan(parse_point("[]")).all()
+
+
+def test_parse_outline_graphml_and_json_forms():
+    expected = [[0.0, 0.0], [2.0, 0.0], [2.0, 1.0]]
+    np.testing.assert_array_equal(parse_outline("0,0;2,0;2,1"), expected)
+    np.testing.assert_array_equal(parse_outline([{"x": 0, "y": 0, "z": 0}, {"x": 2, "y": 0}, {"x": 2, "y": 1}]),
+                                  expected)
+    assert parse_outline(None).shape == (0, 2)
+    assert parse_outline("0,0;oops").shape == (0, 2)
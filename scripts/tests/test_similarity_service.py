@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+import pytest
+
+from similarity_service import SimilarityService
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = SimilarityService([], workers=1)
+    yield service
+    service.close()
+
+
+@pytest.mark.parametrize("payload", [
+    {"graphml": "<not xml"},
+    {"design": [1, 2]},
+    {"design": {"spaces": "x"}},
+    {"design": {"spaces": {}, "panels": [1]}},
+    {"design": {"spaces": {"1": "x"}}},
+    [1, 2],
+    {},
+])
+def test_malformed_payload_is_bad_request(service, payload):
+    status, response = asyncio.run(service.route("POST", "/compare", json.dumps(payload).encode()))
+    assert status == 400
+    assert "error" in response
+
+
+def test_empty_design_gives_valid_json(service):
+    status, response = asyncio.run(service.route(
+        "POST", "/compare", json.dumps({"design": {"spaces": {}, "panels": {"items": {}}}}).encode()))
+    assert status == 200
+    json.dumps(response, allow_nan=False)
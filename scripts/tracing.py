@@ -0,0 +1,257 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+
+# Set FLOORPLAN_TRACE=<path.json> to trace any script: tracing starts on
+# import and the Chrome trace is written (and a summary printed) at exit.
+# FLOORPLAN_TRACE_MEMORY=1 adds per-span peak memory and
+# FLOORPLAN_PROFILE=<path.prof> captures a cProfile of the whole run.
+TRACE_ENV = "FLOORPLAN_TRACE"
+MEMORY_ENV = "FLOORPLAN_TRACE_MEMORY"
+PROFILE_ENV = "FLOORPLAN_PROFILE"
+
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start", "child_time", "mem_start", "peak_floor")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.child_time = 0
+        self.peak_floor = 0
+        if self.tracer.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() would lose the enclosing span's peak, so keep it on the parent.
+            if stack:
+                stack[-1].peak_floor = max(stack[-1].peak_floor, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        stack = self.tracer._stack()
+        stack.pop()
+        duration = end - self.start
+        peak = None
+        if self.tracer.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak_floor)
+            if stack:
+                stack[-1].peak_floor = max(stack[-1].peak_floor, peak)
+            peak -= self.mem_start
+        if stack:
+            stack[-1].child_time += duration
+        self.tracer._record(self.name, self.start, duration, duration - self.child_time,
+                            peak, len(stack), self.args)
+        return False
+
+
+class Tracer:
+    """
+    Collects nested spans and counters for one run.
+
+    Attributes:
+        memory (bool): Record the peak traced allocation of every span (slow).
+        events (list): Finished spans as (name, start_ns, duration_ns, self_ns,
+            peak_bytes, depth, thread id, args).
+        counters (dict): Counter name -> total.
+    """
+
+    def __init__(self, memory: bool = False, profile: bool = False):
+        self.memory = memory
+        self.events: List[tuple] = []
+        self.counters: Dict[str, float] = {}
+        self._counter_events: List[tuple] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.origin = time.perf_counter_ns()
+        self.profiler = cProfile.Profile() if profile else None
+        self.owns_tracemalloc = False
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, start, duration, self_time, peak, depth, args):
+        with self._lock:
+            self.events.append((name, start, duration, self_time, peak, depth,
+                                threading.get_ident(), args))
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self._counter_events.append((name, time.perf_counter_ns(), total))
+
+    def chrome_trace(self) -> dict:
+        """Events in the Chrome trace format (load in chrome://tracing or Perfetto)."""
+        pid = os.getpid()
+        trace = []
+        for name, start, duration, self_time, peak, _, tid, args in self.events:
+            event_args = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()}
+            if peak is not None:
+                event_args["peak_bytes"] = peak
+            trace.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                          "ts": (start - self.origin) / 1e3, "dur": duration / 1e3,
+                          "args": event_args})
+        for name, ts, total in self._counter_events:
+            trace.append({"name": name, "ph": "C", "pid": pid,
+                          "ts": (ts - self.origin) / 1e3, "args": {name: total}})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def summary_rows(self) -> List[dict]:
+        """Per span name: calls, total/self/mean/max time in seconds and peak bytes."""
+        rows: Dict[str, dict] = {}
+        for name, _, duration, self_time, peak, _, _, _ in self.events:
+            row = rows.setdefault(name, {"name": name, "calls": 0, "total": 0.0, "self": 0.0,
+                                         "max": 0.0, "peak_bytes": None})
+            row["calls"] += 1
+            row["total"] += duration / 1e9
+            row["self"] += self_time / 1e9
+            row["max"] = max(row["max"], duration / 1e9)
+            if peak is not None:
+                row["peak_bytes"] = max(row["peak_bytes"] or 0, peak)
+        for row in rows.values():
+            row["mean"] = row["total"] / row["calls"]
+        return sorted(rows.values(), key=lambda r: r["total"], reverse=True)
+
+    def summary(self) -> str:
+        lines = [f"{'span':<40} {'calls':>7} {'total ms':>11} {'self ms':>11} "
+                 f"{'mean ms':>10} {'max ms':>10} {'peak MB':>9}"]
+        for row in self.summary_rows():
+            peak = f"{row['peak_bytes'] / 1e6:9.2f}" if row["peak_bytes"] is not None else f"{'-':>9}"
+            lines.append(f"{row['name']:<40} {row['calls']:>7} {row['total'] * 1e3:>11.2f} "
+                         f"{row['self'] * 1e3:>11.2f} {row['mean'] * 1e3:>10.3f} "
+                         f"{row['max'] * 1e3:>10.2f} {peak}")
+        for name, total in sorted(self.counters.items()):
+            lines.append(f"{'# ' + name:<40} {total:>7g}")
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(memory: bool = False, profile: bool = False) -> Tracer:
+    """
+    Start collecting spans and counters (replacing any previous run).
+
+    Args:
+        memory (bool): Also record per-span peak memory with tracemalloc.
+        profile (bool): Also run cProfile until disable() is called.
+
+    Returns:
+        Tracer: The active tracer.
+    """
+    global _tracer
+    disable()
+    _tracer = Tracer(memory=memory, profile=profile)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracer.owns_tracemalloc = True
+    if _tracer.profiler is not None:
+        _tracer.profiler.enable()
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """Stop tracing and return the finished tracer, if any."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        if tracer.profiler is not None:
+            tracer.profiler.disable()
+        if tracer.owns_tracemalloc:
+            tracemalloc.stop()
+    return tracer
+
+
+def active() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args):
+    """
+    Context manager timing a block under `name`; spans nest.
+
+    While tracing is disabled this returns a shared no-op object, so the
+    cost is a function call and a global lookup.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, args)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator recording every call of a function as a span (default name: module.qualname)."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1):
+    """Add value to a named counter (no-op while tracing is disabled)."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def write_chrome_trace(path: str, tracer: Optional[Tracer] = None):
+    tracer = tracer or _tracer
+    with open(path, "w") as f:
+        json.dump(tracer.chrome_trace(), f)
+
+
+def _write_at_exit(trace_path: str, profile_path: Optional[str]):
+    tracer = disable()
+    if tracer is None:
+        return
+    write_chrome_trace(trace_path, tracer)
+    print(tracer.summary())
+    print(f"Trace saved to {trace_path}")
+    if profile_path and tracer.profiler is not None:
+        tracer.profiler.dump_stats(profile_path)
+        print(f"Profile saved to {profile_path}")
+
+
+if os.environ.get(TRACE_ENV):
+    enable(memory=os.environ.get(MEMORY_ENV) == "1", profile=bool(os.environ.get(PROFILE_ENV)))
+    atexit.register(_write_at_exit, os.environ[TRACE_ENV], os.environ.get(PROFILE_ENV))